@@ -1,22 +1,59 @@
+import sys
+import json
 import click
 from pathlib import Path
-import markdown
 
-from rmotr_curriculum_tools import io, utils
+from rmotr_curriculum_tools import (
+    io, utils, atomic, exceptions, filesystems, search, runner, snippets,
+    links, stats as stats_module, build as build_module,
+    export as export_module, dump as dump_module, catalog as catalog_module,
+    duplicates, events)
 from rmotr_curriculum_tools.models import READING, ASSIGNMENT
 
 
 @click.group()
-def rmotr_curriculum_tools():
-    pass
+@click.option('--durability', default=atomic.NONE,
+              envvar='RMOTR_CURRICULUM_DURABILITY',
+              type=click.Choice(atomic.DURABILITY_POLICIES),
+              help="When written files are synced to disk")
+@click.option('--dry-run', is_flag=True, default=False,
+              help="Print what would be written instead of writing it")
+@click.option('--event-log', type=click.Path(dir_okay=False),
+              envvar='RMOTR_CURRICULUM_EVENT_LOG',
+              help="Append the changes made to courses to this file")
+@click.pass_context
+def rmotr_curriculum_tools(ctx, durability, dry_run, event_log):
+    atomic.set_durability(durability)
+    if event_log:
+        log = events.subscribe(events.EventLog(event_log))
+        ctx.call_on_close(lambda: events.unsubscribe(log))
+    if dry_run:
+        filesystem = filesystems.MemoryFilesystem(
+            base=filesystems.DiskFilesystem())
+        filesystems.set_filesystem(filesystem)
+        ctx.call_on_close(lambda: echo_operations(filesystem.operations))
+
+
+def echo_operations(operations):
+    for operation in operations:
+        click.echo('{} {}'.format(operation[0], ' -> '.join(
+            str(path) for path in operation[1:])))
+
+
+templates_option = click.option(
+    '--templates', 'templates_path', default=None,
+    envvar='RMOTR_CURRICULUM_TEMPLATES',
+    type=click.Path(exists=True, file_okay=False),
+    help="Directory with unit/, reading/ and assignment/ templates")
 
 
 @rmotr_curriculum_tools.command()
 @click.argument('path_to_course', type=click.Path(exists=True))
 @click.argument('name', type=str)
 @click.option('-o', '--order', default=None, type=int)
-def create_unit(path_to_course, name, order):
-    io.add_unit_to_course(path_to_course, name, order)
+@templates_option
+def create_unit(path_to_course, name, order, templates_path):
+    io.add_unit_to_course(path_to_course, name, order, templates_path)
 
 
 @rmotr_curriculum_tools.command()
@@ -25,36 +62,340 @@ def create_unit(path_to_course, name, order):
 @click.option('-o', '--order', default=None, type=int)
 @click.option('-t', '--type',
               type=click.Choice([READING, ASSIGNMENT]), required=True)
-def create_lesson(path_to_unit, name, type, order):
-    io.add_lesson_to_unit(path_to_unit, name, type, order)
+@templates_option
+def create_lesson(path_to_unit, name, type, order, templates_path):
+    io.add_lesson_to_unit(path_to_unit, name, type, order, templates_path)
 
 
 @rmotr_curriculum_tools.command()
 @click.argument('path_to_unit', type=click.Path(exists=True))
-def remove_unit(path_to_unit):
-    io.remove_unit_from_directory(path_to_unit)
+@click.option('--purge', is_flag=True, default=False,
+              help="Empty the course trash after removing")
+def remove_unit(path_to_unit, purge):
+    io.remove_unit_from_directory(path_to_unit, purge)
 
 
 @rmotr_curriculum_tools.command()
 @click.argument('path_to_lesson', type=click.Path(exists=True))
-def remove_lesson(path_to_lesson):
-    io.remove_lesson_from_directory(path_to_lesson)
+@click.option('--purge', is_flag=True, default=False,
+              help="Empty the course trash after removing")
+def remove_lesson(path_to_lesson, purge):
+    io.remove_lesson_from_directory(path_to_lesson, purge)
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path_to_course', type=click.Path(exists=True))
+def gc(path_to_course):
+    """Permanently delete removed units and lessons"""
+    io.purge_trash(path_to_course)
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path_to_unit', type=click.Path(exists=True))
+@click.argument('path_to_course', type=click.Path(exists=True))
+@click.option('-o', '--order', default=None, type=int)
+def move_unit(path_to_unit, path_to_course, order):
+    io.move_unit_to_course(path_to_unit, path_to_course, order)
 
 
 @rmotr_curriculum_tools.command()
 @click.argument('path_to_lesson', type=click.Path(exists=True))
+@click.argument('path_to_unit', type=click.Path(exists=True))
+@click.option('-o', '--order', default=None, type=int)
+def move_lesson(path_to_lesson, path_to_unit, order):
+    io.move_lesson_to_unit(path_to_lesson, path_to_unit, order)
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path', type=click.Path(exists=True, file_okay=False))
+@click.argument('children', nargs=-1)
+@click.option('--compact', is_flag=True, default=False,
+              help="Only close numbering gaps")
+def reorder(path, children, compact):
+    """Renumber the units of a course or the lessons of a unit"""
+    if not children and not compact:
+        raise click.BadArgumentUsage(
+            "List the new order (slugs or uuids) or use --compact")
+    try:
+        renames = io.reorder_children(path, children)
+    except exceptions.InvalidOrderException as e:
+        raise click.BadArgumentUsage(str(e))
+    for source_path, target_path in renames:
+        click.echo('{} -> {}'.format(source_path.name, target_path.name))
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path_to_lesson', type=click.Path())
 def count_words(path_to_lesson):
     """Count words ignoring code"""
     path = Path(path_to_lesson)
-    if not path.exists() or not path.is_file():
+    filesystem = filesystems.get_filesystem()
+    if not filesystem.is_file(path):
         raise click.BadArgumentUsage("The path should be a markdown file")
-    with path.open('r') as fp:
-        content = fp.read()
-    word_count = utils.count_words(
-        markdown.markdown(content, extensions=['gfm']))
+    content = filesystem.read_text(path)
+    word_count = utils.count_words(utils.render_markdown(content))
     click.echo("Word count: {}".format(
         click.style(str(word_count), fg='green')))
 
 
+@rmotr_curriculum_tools.command('search')
+@click.argument('query', type=str)
+@click.argument('paths_to_courses', nargs=-1, type=click.Path(exists=True))
+@click.option('-i', '--index', 'index_path', type=click.Path(),
+              default=search.DEFAULT_INDEX_PATH)
+@click.option('-f', '--fuzzy', is_flag=True, default=False,
+              help="Match lesson and unit names approximately")
+def search_lessons(query, paths_to_courses, index_path, fuzzy):
+    """Search lessons, updating the index for the given courses first"""
+    index = search.SearchIndex.load(index_path)
+    if paths_to_courses:
+        for path_to_course in paths_to_courses:
+            index.update_course(path_to_course)
+        index.save()
+
+    if fuzzy:
+        results = index.fuzzy_search(query)
+    else:
+        results = index.search(query)
+
+    for result in results:
+        click.echo("{} / {} / {}  {}".format(
+            result['course'], result['unit'],
+            click.style(result['name'], fg='green'), result['path']))
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path_to_course', type=click.Path(exists=True))
+@click.argument('output_path', type=click.Path(file_okay=False))
+@click.option('-j', '--jobs', default=None, type=int,
+              help="Number of rendering processes")
+def build(path_to_course, output_path, jobs):
+    """Render a course as static HTML"""
+    try:
+        rendered, reused = build_module.build_course(
+            path_to_course, output_path, processes=jobs)
+    except exceptions.OutputDirectoryNotEmptyException as e:
+        raise click.BadArgumentUsage(str(e))
+    click.echo("Rendered {} lessons, reused {}".format(
+        click.style(str(rendered), fg='green'), reused))
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path_to_course', type=click.Path(exists=True))
+@click.option('-f', '--format', 'output_format', default='table',
+              type=click.Choice(sorted(stats_module.WRITERS)))
+@click.option('-j', '--jobs', default=None, type=int,
+              help="Number of processes")
+def stats(path_to_course, output_format, jobs):
+    """Per lesson, unit and course statistics"""
+    records = stats_module.iter_course_stats(path_to_course, processes=jobs)
+    stats_module.WRITERS[output_format](
+        records, click.get_text_stream('stdout'))
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path_to_course', type=click.Path(exists=True))
+@click.option('-j', '--jobs', default=None, type=int,
+              help="Number of worker processes")
+@click.option('-t', '--timeout', default=runner.DEFAULT_TIMEOUT, type=int,
+              help="Seconds allowed per lesson")
+@click.option('-m', '--memory-limit', default=None, type=int,
+              help="Megabytes of memory allowed per worker")
+@click.option('-f', '--format', 'output_format', default='json',
+              type=click.Choice(sorted(runner.REPORT_WRITERS)))
+def check_solutions(path_to_course, jobs, timeout, memory_limit,
+                    output_format):
+    """Run assignment tests against their solutions"""
+    results = runner.check_course_solutions(
+        path_to_course, processes=jobs, timeout=timeout,
+        memory_limit=memory_limit)
+    runner.REPORT_WRITERS[output_format](
+        results, click.get_text_stream('stdout'))
+    if any(result['status'] != runner.PASSED for result in results):
+        raise SystemExit(1)
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path_to_lesson', type=click.Path(exists=True))
+@click.argument('path_to_submissions',
+                type=click.Path(exists=True, file_okay=False))
+@click.option('-j', '--jobs', default=None, type=int,
+              help="Number of worker processes")
+@click.option('-t', '--timeout', default=runner.DEFAULT_TIMEOUT, type=int,
+              help="Seconds allowed per submission")
+@click.option('-m', '--memory-limit', default=None, type=int,
+              help="Megabytes of memory allowed per worker")
+def grade(path_to_lesson, path_to_submissions, jobs, timeout, memory_limit):
+    """Run an assignment's tests against every submission (JSON lines)"""
+    results = runner.iter_graded_submissions(
+        path_to_lesson, path_to_submissions, processes=jobs,
+        timeout=timeout, memory_limit=memory_limit)
+    for result in results:
+        click.echo(json.dumps(result, sort_keys=True))
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path_to_course', type=click.Path(exists=True))
+@click.option('-r', '--run-doctests', is_flag=True, default=False,
+              help="Also run snippets written as interactive sessions")
+@click.option('-c', '--cache', 'cache_path', type=click.Path(),
+              default=snippets.DEFAULT_CACHE_PATH)
+@click.option('-j', '--jobs', default=None, type=int,
+              help="Number of worker processes")
+@click.option('-t', '--timeout', default=runner.DEFAULT_TIMEOUT, type=int,
+              help="Seconds allowed per snippet")
+@click.option('-m', '--memory-limit', default=None, type=int,
+              help="Megabytes of memory allowed per worker")
+def check_snippets(path_to_course, run_doctests, cache_path, jobs, timeout,
+                   memory_limit):
+    """Check Python code blocks in lesson READMEs"""
+    results = snippets.check_course_snippets(
+        path_to_course, run_doctests=run_doctests, cache_path=cache_path,
+        processes=jobs, timeout=timeout, memory_limit=memory_limit)
+    broken = [result for result in results
+              if result['status'] != snippets.OK]
+    for result in broken:
+        click.echo("{}:{} {}\n{}".format(
+            result['path'], result['line'],
+            click.style(result['status'], fg='red'), result['message']))
+    click.echo("{} snippets checked, {} broken".format(
+        len(results), click.style(str(len(broken)),
+                                  fg=(broken and 'red') or 'green')))
+    if broken:
+        raise SystemExit(1)
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path_to_course', type=click.Path(exists=True))
+@click.option('--fix', is_flag=True, default=False,
+              help="Rewrite links to units and lessons that were renamed")
+def check_links(path_to_course, fix):
+    """Check relative links and images in lesson READMEs"""
+    broken = links.check_course_links(path_to_course, fix=fix)
+    for link in broken:
+        click.echo("{}:{} {}".format(
+            link['path'], link['line'], click.style(link['target'], fg='red')))
+    if broken:
+        raise SystemExit(1)
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path_to_course', type=click.Path(exists=True))
+@click.argument('output_path', type=click.Path(dir_okay=False))
+@click.option('-j', '--jobs', default=None, type=int,
+              help="Number of compressing processes")
+def export(path_to_course, output_path, jobs):
+    """Package the curriculum files of a course in a .tar(.gz)"""
+    count = export_module.export_course(
+        path_to_course, output_path, processes=jobs)
+    click.echo("Exported {} files to {}".format(
+        click.style(str(count), fg='green'), output_path))
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('path_to_course', type=click.Path(exists=True))
+@click.option('-f', '--fields', default=None,
+              help="Comma separated fields: {}".format(
+                  ','.join(dump_module.FIELDS)))
+def dump(path_to_course, fields):
+    """Stream one JSON object per lesson (JSON Lines)"""
+    try:
+        fields = dump_module.get_fields(fields and fields.split(','))
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--fields')
+    records = dump_module.iter_lesson_records(path_to_course, fields)
+    dump_module.write_json_lines(records, click.get_text_stream('stdout'))
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('paths_to_courses', nargs=-1, required=True,
+                type=click.Path(exists=True))
+@click.option('-c', '--catalog', 'catalog_path', type=click.Path(),
+              default=catalog_module.DEFAULT_CATALOG_PATH)
+def sync_catalog(paths_to_courses, catalog_path):
+    """Update the catalog with the lessons of some courses"""
+    catalog = catalog_module.Catalog(catalog_path)
+    try:
+        for path_to_course in paths_to_courses:
+            updated, removed, skipped = catalog.sync_course(path_to_course)
+            for path in skipped:
+                click.echo("{}: no .rmotr, skipped".format(
+                    click.style(str(path), fg='red')))
+            click.echo("{}: {} rows updated, {} removed".format(
+                path_to_course, click.style(str(updated), fg='green'),
+                removed))
+    finally:
+        catalog.close()
+
+
+@rmotr_curriculum_tools.command()
+@click.option('-c', '--catalog', 'catalog_path', type=click.Path(),
+              default=catalog_module.DEFAULT_CATALOG_PATH)
+@click.option('--track', default=None)
+@click.option('--type', 'lesson_type', default=None,
+              type=click.Choice([READING, ASSIGNMENT]))
+@click.option('--min-words', default=None, type=int)
+@click.option('--max-words', default=None, type=int)
+@click.option('--course', default=None, help="Course uuid or name")
+@click.option('--lesson', 'lesson_uuid', default=None, help="Lesson uuid")
+def query(catalog_path, track, lesson_type, min_words, max_words, course,
+          lesson_uuid):
+    """Print the catalog lessons that match (JSON Lines)"""
+    catalog = catalog_module.Catalog(catalog_path)
+    try:
+        lessons = catalog.query_lessons(
+            track=track, lesson_type=lesson_type, min_words=min_words,
+            max_words=max_words, course=course, uuid=lesson_uuid)
+    finally:
+        catalog.close()
+    dump_module.write_json_lines(lessons, click.get_text_stream('stdout'))
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('paths_to_courses', nargs=-1, required=True,
+                type=click.Path(exists=True))
+@click.option('-t', '--threshold', default=duplicates.DEFAULT_THRESHOLD,
+              type=float,
+              help="Lowest README similarity reported")
+@click.option('-j', '--jobs', default=None, type=int,
+              help="Number of processes")
+def find_duplicates(paths_to_courses, threshold, jobs):
+    """Find lessons with near duplicate READMEs across courses"""
+    clusters = duplicates.find_duplicates(
+        paths_to_courses, threshold=threshold, processes=jobs)
+    for cluster in clusters:
+        click.echo(click.style(
+            "{:.2f} similar".format(cluster['similarity']), fg='yellow'))
+        for lesson in cluster['lessons']:
+            click.echo("  {} / {} / {}  {}".format(
+                lesson['course'], lesson['unit'],
+                click.style(lesson['name'], fg='green'), lesson['path']))
+
+
+@rmotr_curriculum_tools.command()
+@click.argument('paths_to_courses', nargs=-1, required=True,
+                type=click.Path(exists=True, file_okay=False))
+@click.option('--host', default=None, help="127.0.0.1 by default")
+@click.option('-p', '--port', default=None, type=int,
+              help="8765 by default")
+@click.option('--poll-interval', default=None, type=float,
+              help="Seconds between checks for changes (2 by default)")
+def serve_http(paths_to_courses, host, port, poll_interval):
+    """Serve courses, units and lessons as JSON over HTTP"""
+    # The server is built on asyncio, the other commands still run on
+    # older Pythons
+    if sys.version_info < (3, 7):
+        raise click.UsageError("serve_http needs Python 3.7 or later")
+    from rmotr_curriculum_tools import server
+
+    host = host or server.DEFAULT_HOST
+    port = (port is None and server.DEFAULT_PORT) or port
+    poll_interval = ((poll_interval is None and
+                      server.DEFAULT_POLL_INTERVAL) or poll_interval)
+    click.echo("Serving {} courses on http://{}:{}/courses".format(
+        len(paths_to_courses), host, port))
+    server.serve(paths_to_courses, host, port, poll_interval)
+
+
 if __name__ == '__main__':
     rmotr_curriculum_tools()
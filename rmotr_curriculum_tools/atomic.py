@@ -0,0 +1,145 @@
+from __future__ import unicode_literals
+
+import os
+import uuid
+import threading
+import contextlib
+
+# Durability policies: NONE leaves flushing to the OS, FSYNC syncs every
+# file (and its directory) as it's written, BATCH syncs everything
+# written inside a batch() once, when the outermost batch exits.
+NONE = 'none'
+FSYNC = 'fsync'
+BATCH = 'batch'
+DURABILITY_POLICIES = [NONE, FSYNC, BATCH]
+
+_replace = getattr(os, 'replace', os.rename)
+_local = threading.local()
+_durability = NONE
+
+
+def set_durability(policy):
+    global _durability
+    if policy not in DURABILITY_POLICIES:
+        raise ValueError('{} is not a valid durability policy'.format(policy))
+    _durability = policy
+
+
+def get_durability():
+    return _durability
+
+
+def fsync_path(path):
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def syncfs(path):
+    """Flush the whole filesystem containing `path` with one syscall.
+    Returns False where syncfs(2) isn't available."""
+    try:
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        libc_syncfs = libc.syncfs
+    except (ImportError, OSError, AttributeError):
+        return False
+
+    fd = os.open(str(path), os.O_RDONLY)
+    try:
+        return libc_syncfs(fd) == 0
+    finally:
+        os.close(fd)
+
+
+class Batch(object):
+    def __init__(self):
+        self.file_paths = set()
+        self.directory_paths = set()
+
+    def commit(self):
+        if not self.file_paths and not self.directory_paths:
+            return
+        # Everything written by a command lives in the same filesystem,
+        # so a single syncfs covers it. Otherwise sync one by one.
+        any_directory = next(iter(self.directory_paths))
+        if not syncfs(any_directory):
+            for path in self.file_paths | self.directory_paths:
+                if os.path.exists(str(path)):
+                    fsync_path(path)
+        self.file_paths.clear()
+        self.directory_paths.clear()
+
+
+def _current_batch():
+    return getattr(_local, 'batch', None)
+
+
+@contextlib.contextmanager
+def batch():
+    """Group writes so the BATCH policy syncs them all at once on exit.
+    Nested batches join the outermost one."""
+    current = _current_batch()
+    if current is not None:
+        yield current
+        return
+
+    _local.batch = Batch()
+    try:
+        yield _local.batch
+        if get_durability() == BATCH:
+            _local.batch.commit()
+    finally:
+        _local.batch = None
+
+
+def _make_durable(file_path=None, directory_paths=()):
+    policy = get_durability()
+    current = _current_batch()
+    if policy == BATCH and current is not None:
+        if file_path is not None:
+            current.file_paths.add(file_path)
+        current.directory_paths.update(directory_paths)
+    elif policy in [FSYNC, BATCH]:
+        for directory_path in directory_paths:
+            fsync_path(directory_path)
+
+
+def write_file(file_path, content, mode='w'):
+    """Write the file under a temporary name and rename it into place,
+    so readers see either the old or the new content, never a part."""
+    temp_path = file_path.with_name('.{}.{}.tmp'.format(
+        file_path.name, uuid.uuid4().hex))
+    policy = get_durability()
+    sync_now = (policy == FSYNC or
+                (policy == BATCH and _current_batch() is None))
+    try:
+        with temp_path.open(mode) as fp:
+            fp.write(content)
+            if sync_now:
+                fp.flush()
+                os.fsync(fp.fileno())
+        _replace(str(temp_path), str(file_path))
+    except BaseException:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+
+    _make_durable(file_path, [file_path.parent])
+    return file_path
+
+
+def rename(source_path, target_path):
+    source_path.rename(target_path)
+    _make_durable(directory_paths=set(
+        [source_path.parent, target_path.parent]))
+    return target_path
+
+
+def make_directory(directory_path):
+    directory_path.mkdir()
+    _make_durable(directory_paths=[directory_path.parent])
+    return directory_path
@@ -0,0 +1,184 @@
+from __future__ import unicode_literals
+
+import json
+import hashlib
+import multiprocessing
+from pathlib import Path
+from xml.sax.saxutils import escape
+
+from . import io
+from . import utils
+from . import exceptions
+from .filesystems import get_filesystem
+
+MANIFEST_FILE_NAME = '.build-manifest.json'
+INDEX_FILE_NAME = 'index.html'
+
+PAGE_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>{title}</title>
+</head>
+<body>
+{body}
+</body>
+</html>
+"""
+
+
+def content_hash(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update((part or '').encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def render_page(title, body):
+    return PAGE_TEMPLATE.format(title=escape(title), body=body)
+
+
+def _render_links(links):
+    return '<ol>\n{}\n</ol>'.format('\n'.join(
+        '<li><a href="{}">{}</a></li>'.format(escape(href), escape(text))
+        for href, text in links
+    ))
+
+
+def render_course_index(course):
+    body = '<h1>{}</h1>\n{}'.format(escape(course.name), _render_links(
+        ('{}/{}'.format(unit.directory_path.name, INDEX_FILE_NAME), unit.name)
+        for unit in course.iter_units()
+    ))
+    return render_page(course.name, body)
+
+
+def render_unit_index(unit):
+    body = '<p><a href="../{}">{}</a></p>\n<h1>{}</h1>\n{}'.format(
+        INDEX_FILE_NAME, escape(unit.course.name), escape(unit.name),
+        _render_links(
+            ('{}.html'.format(lesson.directory_path.name), lesson.name)
+            for lesson in unit.iter_lessons()
+        ))
+    return render_page(unit.name, body)
+
+
+def _render_lesson(job):
+    renderer, title, readme_content = job
+    return render_page(title, renderer(readme_content or ''))
+
+
+def _read_manifest(output_directory_path):
+    """The manifest of the previous build, with the hash and page of
+    every lesson and every file it wrote. The output directory can only
+    be new, empty or a previous build."""
+    filesystem = get_filesystem()
+    manifest_path = output_directory_path / MANIFEST_FILE_NAME
+    if filesystem.exists(manifest_path):
+        return json.loads(filesystem.read_text(manifest_path))
+    if (filesystem.is_dir(output_directory_path) and
+            filesystem.iterdir(output_directory_path)):
+        raise exceptions.OutputDirectoryNotEmptyException(
+            '{} is not empty and has no {}'.format(
+                output_directory_path, MANIFEST_FILE_NAME))
+    return {}
+
+
+def _remove_stale_file(output_directory_path, relative_path):
+    filesystem = get_filesystem()
+    if relative_path.is_absolute() or '..' in relative_path.parts:
+        return
+    file_path = output_directory_path / relative_path
+    if filesystem.is_file(file_path):
+        filesystem.remove(file_path)
+    # Unit directories are removed with their last page
+    directory_path = file_path.parent
+    if (directory_path != output_directory_path and
+            filesystem.is_dir(directory_path) and
+            not filesystem.iterdir(directory_path)):
+        filesystem.remove_tree(directory_path)
+
+
+def _write_manifest(output_directory_path, lessons, files):
+    _write_file(output_directory_path / MANIFEST_FILE_NAME, json.dumps({
+        'lessons': lessons,
+        'files': sorted(files)
+    }, indent=2, sort_keys=True))
+
+
+def _write_file(file_path, content):
+    filesystem = get_filesystem()
+    if not filesystem.exists(file_path.parent):
+        filesystem.make_directory(file_path.parent, parents=True)
+    filesystem.write_file(file_path, content)
+
+
+def build_course(course_directory_path, output_directory_path,
+                 renderer=utils.render_markdown, processes=None):
+    """Render a course as static HTML. Lessons whose content hash didn't
+    change since the previous build are reused instead of rendered.
+    Only files listed in the previous build's manifest are ever removed.
+    Returns the number of rendered and reused lessons."""
+    if not isinstance(output_directory_path, Path):
+        output_directory_path = Path(output_directory_path)
+
+    filesystem = get_filesystem()
+    course = io.read_course_from_path(course_directory_path)
+    manifest = _read_manifest(output_directory_path)
+    lessons = manifest.get('lessons', {})
+
+    new_manifest = {}
+    to_render = []
+    pages = {}
+    for unit in course.iter_units():
+        pages[Path(unit.directory_path.name, INDEX_FILE_NAME)] = (
+            render_unit_index(unit))
+        for lesson in unit.iter_lessons():
+            relative_path = Path(
+                unit.directory_path.name,
+                '{}.html'.format(lesson.directory_path.name))
+            digest = content_hash(lesson.name, lesson.readme_content)
+            new_manifest[lesson.uuid] = {
+                'hash': digest,
+                'path': relative_path.as_posix()
+            }
+
+            previous = lessons.get(lesson.uuid)
+            previous_path = previous and (
+                output_directory_path / previous['path'])
+            if (previous and previous['hash'] == digest and
+                    filesystem.exists(previous_path)):
+                if previous['path'] != relative_path.as_posix():
+                    pages[relative_path] = filesystem.read_text(
+                        previous_path)
+                continue
+            to_render.append((relative_path, lesson))
+    pages[Path(INDEX_FILE_NAME)] = render_course_index(course)
+
+    if to_render:
+        jobs = [(renderer, lesson.name, lesson.readme_content)
+                for _, lesson in to_render]
+        pool = multiprocessing.Pool(processes)
+        try:
+            rendered = pool.map(_render_lesson, jobs)
+        finally:
+            pool.close()
+            pool.join()
+        for (relative_path, _), page in zip(to_render, rendered):
+            pages[relative_path] = page
+
+    files = set(path.as_posix() for path in pages)
+    files.update(entry['path'] for entry in new_manifest.values())
+    previous_files = set(manifest.get('files', []))
+    # Every file is listed before it's written, so an interrupted build
+    # can still be cleaned up (its lessons are all rendered again)
+    _write_manifest(output_directory_path, {}, files | previous_files)
+    for relative_path, page in pages.items():
+        _write_file(output_directory_path / relative_path, page)
+
+    for relative_path in sorted(previous_files - files):
+        _remove_stale_file(output_directory_path, Path(relative_path))
+    _write_manifest(output_directory_path, new_manifest, files)
+
+    return len(to_render), len(new_manifest) - len(to_render)
@@ -0,0 +1,259 @@
+from __future__ import unicode_literals
+
+import os
+import hashlib
+import sqlite3
+
+from . import io
+from . import utils
+from . import stats
+from .models import Unit
+from .filesystems import get_filesystem
+
+DEFAULT_CATALOG_PATH = os.path.join(
+    os.path.expanduser('~'), '.rmotr_curriculum_tools', 'catalog.sqlite3')
+
+# Bumped when the tables change. Catalogs are a cache of the courses,
+# older units and lessons tables are dropped and synced again.
+SCHEMA_VERSION = 2
+
+# Units and lessons are keyed by path: the same one (with the same
+# uuid) can be copied into several courses.
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    uuid TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    track TEXT,
+    path TEXT NOT NULL,
+    dot_rmotr_sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS units (
+    uuid TEXT NOT NULL,
+    course_uuid TEXT NOT NULL,
+    name TEXT NOT NULL,
+    "order" INTEGER NOT NULL,
+    slug TEXT NOT NULL,
+    path TEXT PRIMARY KEY,
+    dot_rmotr_sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS lessons (
+    uuid TEXT NOT NULL,
+    course_uuid TEXT NOT NULL,
+    unit_uuid TEXT NOT NULL,
+    name TEXT NOT NULL,
+    "order" INTEGER NOT NULL,
+    type TEXT NOT NULL,
+    slug TEXT NOT NULL,
+    path TEXT PRIMARY KEY,
+    words INTEGER NOT NULL,
+    readme_size INTEGER NOT NULL,
+    dot_rmotr_sha1 TEXT NOT NULL,
+    readme_sha1 TEXT
+);
+CREATE INDEX IF NOT EXISTS courses_track ON courses (track);
+CREATE INDEX IF NOT EXISTS units_course ON units (course_uuid, uuid);
+CREATE INDEX IF NOT EXISTS lessons_course ON lessons (course_uuid);
+CREATE INDEX IF NOT EXISTS lessons_unit ON lessons (unit_uuid);
+CREATE INDEX IF NOT EXISTS lessons_uuid ON lessons (uuid);
+CREATE INDEX IF NOT EXISTS lessons_type_words ON lessons (type, words);
+"""
+
+LESSON_FIELDS = ['course_uuid', 'course', 'track', 'unit_uuid', 'unit',
+                 'uuid', 'name', 'order', 'type', 'slug', 'path', 'words',
+                 'readme_size', 'readme_sha1']
+
+LESSONS_QUERY = """
+SELECT lessons.course_uuid, courses.name AS course, courses.track,
+       lessons.unit_uuid, units.name AS unit, lessons.uuid, lessons.name,
+       lessons."order", lessons.type, lessons.slug, lessons.path,
+       lessons.words, lessons.readme_size, lessons.readme_sha1
+FROM lessons
+JOIN units ON units.course_uuid = lessons.course_uuid
+    AND units.uuid = lessons.unit_uuid
+JOIN courses ON courses.uuid = lessons.course_uuid
+"""
+
+
+def _sha1(content):
+    return hashlib.sha1(content).hexdigest()
+
+
+def _read_file(file_path):
+    filesystem = get_filesystem()
+    if not filesystem.is_file(file_path):
+        return None
+    return filesystem.read_bytes(file_path)
+
+
+class Catalog(object):
+    """Course, unit and lesson metadata in a SQLite database, for
+    queries across courses"""
+    def __init__(self, catalog_path=DEFAULT_CATALOG_PATH):
+        self.catalog_path = catalog_path
+        self.connection = self._connect(catalog_path)
+        self.connection.row_factory = sqlite3.Row
+        with self.connection:
+            version = self.connection.execute(
+                'PRAGMA user_version').fetchone()[0]
+            if version < SCHEMA_VERSION:
+                self.connection.executescript(
+                    'DROP TABLE IF EXISTS units; '
+                    'DROP TABLE IF EXISTS lessons;')
+            self.connection.executescript(SCHEMA)
+            self.connection.execute(
+                'PRAGMA user_version = {}'.format(SCHEMA_VERSION))
+
+    @staticmethod
+    def _connect(catalog_path):
+        if get_filesystem().in_memory:
+            # Dry runs sync a copy of the catalog
+            connection = sqlite3.connect(':memory:')
+            if os.path.exists(catalog_path):
+                source = sqlite3.connect(catalog_path)
+                source.backup(connection)
+                source.close()
+            return connection
+
+        directory = os.path.dirname(catalog_path)
+        if directory and not os.path.isdir(directory):
+            os.makedirs(directory)
+        connection = sqlite3.connect(catalog_path)
+        # Readers don't wait for a sync to finish
+        connection.execute('PRAGMA journal_mode=WAL')
+        return connection
+
+    def close(self):
+        self.connection.close()
+
+    def _existing(self, table, course_uuid, *columns):
+        rows = self.connection.execute(
+            'SELECT path, uuid, {} FROM {} WHERE course_uuid = ?'.format(
+                ', '.join(columns), table), [course_uuid])
+        return dict((row[0], tuple(row)[1:]) for row in rows)
+
+    def _sync_unit(self, course, unit_path, existing):
+        dot_rmotr = _read_file(unit_path / io.DOT_RMOTR_FILE_NAME)
+        if dot_rmotr is None:
+            return None, False
+        digest = _sha1(dot_rmotr)
+        previous = existing.pop(str(unit_path), None)
+        if previous is not None and previous[1] == digest:
+            return previous[0], False
+
+        unit = io.read_unit(course, unit_path, with_lessons=False)
+        self.connection.execute(
+            'INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?, ?, ?, ?)',
+            [unit.uuid, course.uuid, unit.name, unit.order,
+             io.get_directory_slug(unit_path), str(unit_path), digest])
+        return unit.uuid, True
+
+    def _sync_lesson(self, unit, lesson_path, existing, renderer,
+                     force=False):
+        dot_rmotr = _read_file(lesson_path / io.DOT_RMOTR_FILE_NAME)
+        if dot_rmotr is None:
+            return None
+        readme = _read_file(lesson_path / io.README_FILE_NAME)
+        digests = (_sha1(dot_rmotr),
+                   (readme is not None and _sha1(readme)) or None)
+        previous = existing.pop(str(lesson_path), None)
+        if not force and previous is not None and previous[1:] == digests:
+            return False
+
+        lesson = io.read_lesson(unit, lesson_path, with_readme=False)
+        readme = (readme or b'').decode('utf-8')
+        words = (readme and stats.compute_readme_stats(
+            renderer(readme))['words']) or 0
+        self.connection.execute(
+            'INSERT OR REPLACE INTO lessons VALUES '
+            '(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+            [lesson.uuid, unit.course.uuid, unit.uuid, lesson.name,
+             lesson.order, lesson.type, io.get_directory_slug(lesson_path),
+             str(lesson_path), words, len(readme.encode('utf-8')),
+             digests[0], digests[1]])
+        return True
+
+    def sync_course(self, course_directory_path,
+                    renderer=utils.render_markdown):
+        """Bring the rows of a course up to date. Only units and lessons
+        whose .rmotr or README changed since the last sync (or that
+        were renamed) are read and written again.
+
+        Units and lessons without a .rmotr can't be read, they're left
+        out of the catalog. Returns the number of rows written and
+        removed, and the paths left out."""
+        course = io.read_course_from_path(
+            course_directory_path, with_units=False)
+        course.directory_path = course.directory_path.absolute()
+        digest = _sha1(_read_file(
+            course.directory_path / io.DOT_RMOTR_FILE_NAME))
+        updated = removed = 0
+        skipped = []
+
+        with self.connection:
+            row = self.connection.execute(
+                'SELECT path, dot_rmotr_sha1 FROM courses WHERE uuid = ?',
+                [course.uuid]).fetchone()
+            if row is None or tuple(row) != (str(course.directory_path),
+                                             digest):
+                self.connection.execute(
+                    'INSERT OR REPLACE INTO courses VALUES (?, ?, ?, ?, ?)',
+                    [course.uuid, course.name, course.track,
+                     str(course.directory_path), digest])
+                updated += 1
+
+            units = self._existing('units', course.uuid, 'dot_rmotr_sha1')
+            lessons = self._existing(
+                'lessons', course.uuid, 'dot_rmotr_sha1', 'readme_sha1')
+            for unit_path in io.iter_numbered_paths(
+                    course.directory_path, io.UNIT_GLOB):
+                unit_uuid, changed = self._sync_unit(course, unit_path, units)
+                if unit_uuid is None:
+                    skipped.append(unit_path)
+                    continue
+                updated += changed
+                # Only what lessons need from their unit
+                unit = Unit(course, unit_uuid, None, None, unit_path)
+                for lesson_path in io.iter_numbered_paths(
+                        unit_path, io.LESSON_GLOB):
+                    # A unit that changed might have a new uuid
+                    written = self._sync_lesson(
+                        unit, lesson_path, lessons, renderer, changed)
+                    if written is None:
+                        skipped.append(lesson_path)
+                    else:
+                        updated += written
+
+            # Whatever wasn't seen during the scan was removed from disk
+            for table, existing in [('units', units), ('lessons', lessons)]:
+                for path in existing:
+                    removed += self.connection.execute(
+                        'DELETE FROM {} WHERE path = ?'.format(table),
+                        [path]).rowcount
+
+        return updated, removed, skipped
+
+    def query_lessons(self, track=None, lesson_type=None, min_words=None,
+                      max_words=None, course=None, uuid=None):
+        """Lessons matching every given filter, in course order. `course`
+        is a course uuid or name."""
+        conditions = []
+        parameters = []
+        for condition, value in [
+                ('courses.track = ?', track),
+                ('lessons.type = ?', lesson_type),
+                ('lessons.words >= ?', min_words),
+                ('lessons.words <= ?', max_words),
+                ('lessons.uuid = ?', uuid)]:
+            if value is not None:
+                conditions.append(condition)
+                parameters.append(value)
+        if course is not None:
+            conditions.append('(courses.uuid = ? OR courses.name = ?)')
+            parameters.extend([course, course])
+
+        query = LESSONS_QUERY
+        if conditions:
+            query += 'WHERE {}\n'.format(' AND '.join(conditions))
+        query += 'ORDER BY courses.name, units."order", lessons."order"'
+        return [dict(zip(LESSON_FIELDS, row))
+                for row in self.connection.execute(query, parameters)]
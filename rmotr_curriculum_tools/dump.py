@@ -0,0 +1,80 @@
+from __future__ import unicode_literals
+
+import json
+import hashlib
+from collections import OrderedDict
+
+from . import io
+from .filesystems import get_filesystem
+
+FIELDS = ['course_uuid', 'course', 'unit_uuid', 'unit', 'unit_order',
+          'unit_slug', 'uuid', 'name', 'order', 'type', 'slug', 'path',
+          'readme_size', 'readme_sha1']
+README_FIELDS = ['readme_size', 'readme_sha1']
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def readme_size_and_hash(readme_path):
+    """Size and sha1 of a README, read in blocks"""
+    filesystem = get_filesystem()
+    if not filesystem.is_file(readme_path):
+        return 0, None
+    digest = hashlib.sha1()
+    size = 0
+    fp = filesystem.open_binary(readme_path)
+    try:
+        for block in iter(lambda: fp.read(READ_BLOCK_SIZE), b''):
+            digest.update(block)
+            size += len(block)
+    finally:
+        fp.close()
+    return size, digest.hexdigest()
+
+
+def get_fields(names=None):
+    """Validate a selection of fields, all of them by default"""
+    if not names:
+        return list(FIELDS)
+    unknown = [name for name in names if name not in FIELDS]
+    if unknown:
+        raise ValueError("Unknown fields: {}".format(', '.join(unknown)))
+    return list(names)
+
+
+def lesson_record(lesson, fields=FIELDS):
+    unit = lesson.unit
+    values = {
+        'course_uuid': unit.course.uuid,
+        'course': unit.course.name,
+        'unit_uuid': unit.uuid,
+        'unit': unit.name,
+        'unit_order': unit.order,
+        'unit_slug': io.get_directory_slug(unit.directory_path),
+        'uuid': lesson.uuid,
+        'name': lesson.name,
+        'order': lesson.order,
+        'type': lesson.type,
+        'slug': io.get_directory_slug(lesson.directory_path),
+        'path': str(lesson.directory_path)
+    }
+    if any(name in README_FIELDS for name in fields):
+        values['readme_size'], values['readme_sha1'] = readme_size_and_hash(
+            lesson.readme_path)
+    return OrderedDict((name, values[name]) for name in fields)
+
+
+def iter_lesson_records(course_directory_path, fields=None):
+    """Yield one flat record per lesson, in course order, as the course
+    is read. READMEs are only read for the README fields."""
+    fields = get_fields(fields)
+    for lesson in io.iter_lessons(course_directory_path, with_readme=False):
+        yield lesson_record(lesson, fields)
+
+
+def write_json_lines(records, fp):
+    # Flushed by line, consumers get every lesson as soon as it's read
+    for record in records:
+        fp.write(json.dumps(record))
+        fp.write('\n')
+        fp.flush()
@@ -0,0 +1,197 @@
+from __future__ import unicode_literals
+
+import random
+import struct
+import hashlib
+import multiprocessing
+from collections import defaultdict
+from bs4 import BeautifulSoup
+
+from . import io
+from . import utils
+from .filesystems import get_filesystem
+from .search import tokenize
+
+DEFAULT_THRESHOLD = 0.8
+SHINGLE_SIZE = 4
+NUM_PERMUTATIONS = 128
+# Lowest probability that a pair of lessons right at the threshold is
+# compared. The S-curve midpoint of the chosen split is well below it.
+CANDIDATE_PROBABILITY = 0.9
+
+# Permutations are (a * x + b) mod a Mersenne prime, larger than any
+# shingle hash. The seed is fixed, signatures of different runs (and
+# processes) can be compared.
+_PRIME = (1 << 61) - 1
+_SEED = 20170502
+_permutations = {}
+
+
+def get_permutations(num_perm=NUM_PERMUTATIONS):
+    if num_perm not in _permutations:
+        generator = random.Random(_SEED)
+        _permutations[num_perm] = [
+            (generator.randint(1, _PRIME - 1),
+             generator.randint(0, _PRIME - 1))
+            for _ in range(num_perm)]
+    return _permutations[num_perm]
+
+
+def readme_words(html):
+    """Words of a rendered README, leaving code out like
+    utils.count_words does"""
+    soup = BeautifulSoup(html, "html.parser")
+    words = []
+    for text in soup.find_all(string=True):
+        if any(parent.name in utils.AVOID_COUNT_TAGS
+               for parent in text.parents):
+            continue
+        words.extend(tokenize(text))
+    return words
+
+
+def shingles(words, size=SHINGLE_SIZE):
+    """Hashes of every run of `size` words (or of all of them, if there
+    are fewer)"""
+    runs = set(' '.join(words[i:i + size])
+               for i in range(max(len(words) - size + 1, 1)) if words)
+    return set(
+        struct.unpack('<Q', hashlib.md5(run.encode('utf-8')).digest()[:8])[0]
+        for run in runs)
+
+
+def minhash(shingle_hashes, num_perm=NUM_PERMUTATIONS):
+    """For every permutation, the smallest permuted shingle hash. Two
+    signatures agree in a position with a probability equal to the
+    Jaccard similarity of their shingles."""
+    return tuple(
+        min((a * x + b) % _PRIME for x in shingle_hashes)
+        for a, b in get_permutations(num_perm))
+
+
+def similarity(signature, other):
+    return (sum(1 for x, y in zip(signature, other) if x == y) /
+            float(len(signature)))
+
+
+def candidate_probability(value, bands, rows):
+    """Probability that two signatures with this similarity share at
+    least one of their bands"""
+    return 1 - (1 - value ** rows) ** bands
+
+
+def choose_bands(num_perm, threshold):
+    """Split signatures in `bands` of `rows`. Candidates are verified
+    against the whole signatures, so missing a pair costs more than
+    comparing one: the split with the most rows (fewest candidates)
+    that still makes pairs at the threshold candidates with a
+    probability of at least CANDIDATE_PROBABILITY."""
+    options = [(bands, num_perm // bands)
+               for bands in range(1, num_perm + 1) if num_perm % bands == 0]
+    for bands, rows in options:
+        if candidate_probability(
+                threshold, bands, rows) >= CANDIDATE_PROBABILITY:
+            return bands, rows
+    return options[-1]
+
+
+def _lesson_signature_job(job):
+    readme_path, renderer, num_perm = job
+    filesystem = get_filesystem()
+    if not filesystem.is_file(readme_path):
+        return None
+    hashes = shingles(readme_words(renderer(filesystem.read_text(
+        readme_path))))
+    return (hashes and minhash(hashes, num_perm)) or None
+
+
+def _read_lessons(course_directory_paths):
+    return [{
+        'course': lesson.unit.course.name,
+        'unit': lesson.unit.name,
+        'name': lesson.name,
+        'uuid': lesson.uuid,
+        'path': str(lesson.directory_path),
+        'readme_path': lesson.readme_path
+    } for course_directory_path in course_directory_paths
+        for lesson in io.iter_lessons(
+            course_directory_path, with_readme=False)]
+
+
+class _Clusters(object):
+    """Union-find of lesson indexes, remembering the lowest similarity
+    that joined every cluster"""
+    def __init__(self):
+        self.parents = {}
+        self.similarity = {}
+
+    def find(self, index):
+        parent = self.parents.setdefault(index, index)
+        if parent != index:
+            parent = self.parents[index] = self.find(parent)
+        return parent
+
+    def join(self, index, other, value):
+        root, other_root = self.find(index), self.find(other)
+        lowest = min([value] + [
+            self.similarity[key] for key in [root, other_root]
+            if key in self.similarity])
+        self.parents[other_root] = root
+        self.similarity.pop(other_root, None)
+        self.similarity[root] = lowest
+
+    def groups(self):
+        groups = defaultdict(list)
+        for index in self.parents:
+            groups[self.find(index)].append(index)
+        # Lessons that were compared but never joined are left out
+        return [(self.similarity[root], sorted(indexes))
+                for root, indexes in groups.items() if len(indexes) > 1]
+
+
+def find_duplicates(course_directory_paths, threshold=DEFAULT_THRESHOLD,
+                    renderer=utils.render_markdown, processes=None,
+                    num_perm=NUM_PERMUTATIONS):
+    """Clusters of lessons whose READMEs are near duplicates, most
+    similar first.
+
+    Only lessons that share a band of their MinHash signatures (an LSH
+    bucket) are compared, and only if they aren't in the same cluster
+    already, so the work grows about linearly with lessons."""
+    bands, rows = choose_bands(num_perm, threshold)
+    # READMEs are read by the workers, only signatures are kept
+    lessons = _read_lessons(course_directory_paths)
+    signatures = []
+    buckets = defaultdict(list)
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        jobs = [(lesson.pop('readme_path'), renderer, num_perm)
+                for lesson in lessons]
+        for index, signature in enumerate(
+                pool.imap(_lesson_signature_job, jobs, chunksize=8)):
+            signatures.append(signature)
+            if signature is None:
+                continue
+            for band in range(bands):
+                key = (band,) + signature[band * rows:(band + 1) * rows]
+                buckets[key].append(index)
+    finally:
+        pool.terminate()
+        pool.join()
+
+    clusters = _Clusters()
+    for indexes in buckets.values():
+        for position, index in enumerate(indexes):
+            for other in indexes[position + 1:]:
+                if clusters.find(index) == clusters.find(other):
+                    continue
+                value = similarity(signatures[index], signatures[other])
+                if value >= threshold:
+                    clusters.join(index, other, value)
+
+    result = [{'similarity': round(value, 2),
+               'lessons': [lessons[index] for index in indexes]}
+              for value, indexes in clusters.groups()]
+    return sorted(result, key=lambda cluster: (
+        -cluster['similarity'], cluster['lessons'][0]['path']))
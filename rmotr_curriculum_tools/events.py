@@ -0,0 +1,102 @@
+from __future__ import unicode_literals
+
+import os
+import json
+import time
+import logging
+import contextlib
+
+from .models import Unit
+from .filesystems import get_filesystem
+
+CREATED = 'created'
+RENAMED = 'renamed'
+REMOVED = 'removed'
+EVENT_TYPES = [CREATED, RENAMED, REMOVED]
+
+UNIT = 'unit'
+LESSON = 'lesson'
+
+_subscribers = []
+logger = logging.getLogger(__name__)
+
+
+def subscribe(callback):
+    """Call `callback(event)` for every change io makes to a course,
+    right after it's made. Events are dicts with the event type, the
+    kind of object, its uuid and its absolute path (and old_path, for
+    renames). Lessons of a renamed or removed unit go along with it,
+    without events of their own. Exceptions raised by `callback` are
+    logged, they never stop the change halfway."""
+    _subscribers.append(callback)
+    return callback
+
+
+def unsubscribe(callback):
+    _subscribers.remove(callback)
+
+
+@contextlib.contextmanager
+def subscribed(callback):
+    subscribe(callback)
+    try:
+        yield callback
+    finally:
+        unsubscribe(callback)
+
+
+def get_object_kind(model_obj):
+    return (isinstance(model_obj, Unit) and UNIT) or LESSON
+
+
+def emit(event_type, kind, uuid, path, old_path=None):
+    if not _subscribers:
+        return None
+    event = {
+        'type': event_type,
+        'object': kind,
+        'uuid': uuid,
+        'path': str(path.absolute()),
+        'time': time.time()
+    }
+    if old_path is not None:
+        event['old_path'] = str(old_path.absolute())
+    for callback in list(_subscribers):
+        try:
+            callback(event)
+        except Exception:
+            logger.exception('Event subscriber %r failed', callback)
+    return event
+
+
+class EventLog(object):
+    """Subscriber appending events to a file, one JSON object per line.
+    Lines are written with a single append, so several processes can
+    share the log."""
+    def __init__(self, log_path):
+        self.log_path = log_path
+
+    def __call__(self, event):
+        if get_filesystem().in_memory:
+            # Dry runs don't change anything
+            return
+        line = (json.dumps(event, sort_keys=True) + '\n').encode('utf-8')
+        fd = os.open(self.log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+                     0o644)
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+
+def read_event_log(log_path, offset=0):
+    """Yield (offset after, event) for the events logged from `offset`
+    on, so readers can resume where they stopped"""
+    with open(log_path, 'rb') as fp:
+        fp.seek(offset)
+        for line in fp:
+            if not line.endswith(b'\n'):
+                # Still being written
+                break
+            offset += len(line)
+            yield offset, json.loads(line.decode('utf-8'))
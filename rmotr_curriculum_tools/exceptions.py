@@ -4,3 +4,11 @@ class InvalidUnitNameException(Exception):
 
 class InvalidLessonTypeException(Exception):
     pass
+
+
+class InvalidOrderException(Exception):
+    pass
+
+
+class OutputDirectoryNotEmptyException(Exception):
+    pass
@@ -0,0 +1,241 @@
+from __future__ import unicode_literals
+
+import os
+import zlib
+import uuid
+import struct
+import fnmatch
+import tarfile
+import posixpath
+import contextlib
+import multiprocessing
+from io import BytesIO
+from pathlib import Path
+from collections import deque
+
+from . import io
+from . import atomic
+from .filesystems import get_filesystem, strip_archive_suffix
+
+# Uncompressed bytes per gzip member. Every chunk is compressed by a
+# different process from an empty dictionary, which costs very little
+# ratio at this size.
+CHUNK_SIZE = 4 * 1024 * 1024
+COMPRESS_LEVEL = 6
+GZIP_SUFFIXES = ('.tar.gz', '.tgz')
+
+FILE_MODE = 0o644
+DIRECTORY_MODE = 0o755
+
+# Lesson files and directories that never go in an export: caches, the
+# trash, lock files of older versions and editor temporary files
+EXCLUDED_PATTERNS = ['__pycache__', '*.pyc', '*.pyo', io.TRASH_DIR_NAME,
+                     '.locks', '*~', '.*.swp', '.#*', '.DS_Store']
+
+# Gzip member header: magic, deflate, no flags, mtime 0, no extra
+# flags and "unknown" OS, so it doesn't depend on the exporting machine
+GZIP_HEADER = b'\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff'
+
+
+def get_export_mtime():
+    """The mtime of every archive member. SOURCE_DATE_EPOCH is the
+    usual way to ask reproducible builds for a given date."""
+    return int(os.environ.get('SOURCE_DATE_EPOCH', 0))
+
+
+def _is_excluded(name):
+    return any(fnmatch.fnmatchcase(name, pattern)
+               for pattern in EXCLUDED_PATTERNS)
+
+
+def _iter_lesson_file_paths(lesson):
+    first_paths = [lesson.directory_path / io.DOT_RMOTR_FILE_NAME,
+                   lesson.readme_path]
+    other_paths = []
+    for directory, dir_names, file_names in get_filesystem().walk(
+            lesson.directory_path):
+        dir_names[:] = [name for name in dir_names if not _is_excluded(name)]
+        other_paths.extend(Path(directory, name) for name in file_names
+                           if not _is_excluded(name))
+
+    for file_path in first_paths:
+        yield file_path
+    for file_path in sorted(other_paths):
+        if file_path not in first_paths:
+            yield file_path
+
+
+def iter_course_file_paths(course_directory_path):
+    """Yield the curriculum files of a course in course order: .rmotr
+    and README of the course and every unit, and every file of each
+    lesson (.rmotr and README first) but the EXCLUDED_PATTERNS ones."""
+    filesystem = get_filesystem()
+    course = io.read_course_from_path(course_directory_path, with_units=False)
+    yield course.directory_path / io.DOT_RMOTR_FILE_NAME
+    if filesystem.is_file(course.directory_path / io.README_FILE_NAME):
+        yield course.directory_path / io.README_FILE_NAME
+
+    for unit in io.iter_units(course.directory_path):
+        yield unit.directory_path / io.DOT_RMOTR_FILE_NAME
+        if filesystem.is_file(unit.directory_path / io.README_FILE_NAME):
+            yield unit.directory_path / io.README_FILE_NAME
+        for lesson_path in io.iter_numbered_paths(
+                unit.directory_path, io.LESSON_GLOB):
+            lesson = io.read_lesson(unit, lesson_path, with_readme=False)
+            for file_path in _iter_lesson_file_paths(lesson):
+                if filesystem.is_file(file_path):
+                    yield file_path
+
+
+def iter_archive_entries(course_directory_path):
+    """Yield the (name, path) of every archive member. Directories come
+    right before their first file, and have no path. Names start with
+    the course directory, as with `tar czf course.tar.gz course` (an
+    archived course is named after the archive)."""
+    course_directory_path = io.find_course_directory_path(
+        Path(course_directory_path))
+    root_name = strip_archive_suffix(course_directory_path.name)
+    directories = set()
+    for file_path in iter_course_file_paths(course_directory_path):
+        name = posixpath.join(root_name, os.path.relpath(
+            str(file_path), str(course_directory_path)).replace(os.sep, '/'))
+        missing = []
+        directory = posixpath.dirname(name)
+        while directory and directory not in directories:
+            missing.append(directory)
+            directory = posixpath.dirname(directory)
+        for directory in reversed(missing):
+            directories.add(directory)
+            yield directory, None
+        yield name, file_path
+
+
+def compress_chunk(job):
+    """Compress a chunk as a complete gzip member"""
+    data, level = job
+    compressor = zlib.compressobj(level, zlib.DEFLATED, -zlib.MAX_WBITS)
+    body = compressor.compress(data) + compressor.flush()
+    trailer = struct.pack(
+        '<II', zlib.crc32(data) & 0xffffffff, len(data) & 0xffffffff)
+    return GZIP_HEADER + body + trailer
+
+
+class ParallelGzipWriter(object):
+    """Write only file object that cuts its input in chunks and
+    compresses them in a pool, writing them out in order. Chunks are
+    gzip members, readers take consecutive members as a single stream.
+
+    Chunks are cut at fixed offsets, so the output doesn't depend on
+    the number of processes."""
+    def __init__(self, fp, pool, processes, level=COMPRESS_LEVEL,
+                 chunk_size=CHUNK_SIZE):
+        self.fp = fp
+        self.pool = pool
+        self.level = level
+        self.chunk_size = chunk_size
+        # Bounds memory to a couple of chunks per process
+        self.max_pending = 2 * processes
+        self._buffer = bytearray()
+        self._pending = deque()
+
+    def _submit(self, chunk):
+        self._pending.append(self.pool.apply_async(
+            compress_chunk, ((chunk, self.level),)))
+        while len(self._pending) > self.max_pending:
+            self.fp.write(self._pending.popleft().get())
+
+    def write(self, data):
+        self._buffer.extend(data)
+        while len(self._buffer) >= self.chunk_size:
+            self._submit(bytes(self._buffer[:self.chunk_size]))
+            del self._buffer[:self.chunk_size]
+        return len(data)
+
+    def close(self):
+        if self._buffer:
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        while self._pending:
+            self.fp.write(self._pending.popleft().get())
+
+
+def _write_tar(fp, entries, mtime):
+    filesystem = get_filesystem()
+    archive = tarfile.open(fileobj=fp, mode='w|', format=tarfile.PAX_FORMAT)
+    count = 0
+    try:
+        for name, file_path in entries:
+            # No owners, and the same modes and mtime for everything
+            info = tarfile.TarInfo(name)
+            info.mtime = mtime
+            if file_path is None:
+                info.type = tarfile.DIRTYPE
+                info.mode = DIRECTORY_MODE
+                archive.addfile(info)
+                continue
+
+            info.mode = FILE_MODE
+            info.size = filesystem.get_size(file_path)
+            with contextlib.closing(
+                    filesystem.open_binary(file_path)) as source:
+                archive.addfile(info, source)
+            count += 1
+    finally:
+        archive.close()
+    return count
+
+
+def _write_archive(fp, entries, compress, processes, level, chunk_size):
+    mtime = get_export_mtime()
+    if not compress:
+        return _write_tar(fp, entries, mtime)
+
+    processes = processes or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(processes)
+    try:
+        writer = ParallelGzipWriter(fp, pool, processes, level, chunk_size)
+        count = _write_tar(writer, entries, mtime)
+        writer.close()
+    finally:
+        pool.terminate()
+        pool.join()
+    return count
+
+
+def export_course(course_directory_path, output_path, processes=None,
+                  level=COMPRESS_LEVEL, chunk_size=CHUNK_SIZE):
+    """Write the curriculum files of a course to a tar archive, gzip
+    compressed in parallel if `output_path` ends in .tar.gz or .tgz.
+    The same course always gives the same bytes.
+
+    Returns the number of files exported."""
+    if not isinstance(output_path, Path):
+        output_path = Path(output_path)
+    entries = list(iter_archive_entries(course_directory_path))
+    compress = output_path.name.endswith(GZIP_SUFFIXES)
+
+    filesystem = get_filesystem()
+    if filesystem.in_memory:
+        fp = BytesIO()
+        count = _write_archive(
+            fp, entries, compress, processes, level, chunk_size)
+        filesystem.write_file(output_path, fp.getvalue(), mode='wb')
+        return count
+
+    # Streamed to a temporary name, archives can be much larger than
+    # what atomic.write_file is meant for
+    temp_path = output_path.with_name('.{}.{}.tmp'.format(
+        output_path.name, uuid.uuid4().hex))
+    try:
+        with temp_path.open('wb') as fp:
+            count = _write_archive(
+                fp, entries, compress, processes, level, chunk_size)
+            if atomic.get_durability() != atomic.NONE:
+                fp.flush()
+                os.fsync(fp.fileno())
+        atomic.rename(temp_path, output_path)
+    except BaseException:
+        if temp_path.exists():
+            temp_path.unlink()
+        raise
+    return count
@@ -0,0 +1,544 @@
+from __future__ import unicode_literals
+
+import os
+import errno
+import shutil
+import hashlib
+import fnmatch
+import tarfile
+import zipfile
+import posixpath
+import functools
+import contextlib
+from io import BytesIO
+from collections import defaultdict
+from pathlib import Path
+
+from . import atomic
+
+# Operations recorded by MemoryFilesystem, the plan of a dry run
+WRITE = 'write'
+MAKE_DIRECTORY = 'mkdir'
+RENAME = 'rename'
+REMOVE = 'remove'
+REMOVE_TREE = 'rmtree'
+
+ARCHIVE_SUFFIXES = ('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tbz2')
+
+
+class BaseFilesystem(object):
+    """Everything io (and the commands built on it) does to a course
+    goes through one of these. Paths are pathlib paths."""
+    in_memory = False
+    read_only = False
+
+    def is_read_only(self, path):
+        return self.read_only
+
+    def glob(self, directory_path, pattern):
+        # Only the children of directory_path, like the globs io uses
+        if not self.is_dir(directory_path):
+            return []
+        return [path for path in self.iterdir(directory_path)
+                if fnmatch.fnmatchcase(path.name, pattern)]
+
+    def walk(self, directory_path):
+        dir_names, file_names = [], []
+        for path in self.iterdir(directory_path):
+            if self.is_dir(path):
+                dir_names.append(path.name)
+            else:
+                file_names.append(path.name)
+        yield str(directory_path), dir_names, file_names
+        # Like os.walk, callers can prune dir_names
+        for name in dir_names:
+            for result in self.walk(directory_path / name):
+                yield result
+
+    def make_directory(self, directory_path, parents=False):
+        if parents and not self.exists(directory_path.parent):
+            self.make_directory(directory_path.parent, parents=True)
+        return self._make_directory(directory_path)
+
+
+def is_archive_name(name):
+    return name.lower().endswith(ARCHIVE_SUFFIXES)
+
+
+def strip_archive_suffix(name):
+    for suffix in ARCHIVE_SUFFIXES:
+        if name.lower().endswith(suffix):
+            return name[:-len(suffix)]
+    return name
+
+
+def _archive_aware(method):
+    # Paths inside an archive file are served by its ArchiveFilesystem
+    @functools.wraps(method)
+    def wrapper(self, path, *args, **kwargs):
+        archive = get_archive_filesystem(path)
+        if archive is not None:
+            return getattr(archive, method.__name__)(path, *args, **kwargs)
+        return method(self, path, *args, **kwargs)
+    return wrapper
+
+
+class DiskFilesystem(BaseFilesystem):
+    """The real filesystem. Zip and tar archives in it can be read as
+    if they were directories."""
+    @_archive_aware
+    def exists(self, path):
+        return path.exists()
+
+    @_archive_aware
+    def is_dir(self, path):
+        return path.is_dir()
+
+    @_archive_aware
+    def is_file(self, path):
+        return path.is_file()
+
+    @_archive_aware
+    def iterdir(self, directory_path):
+        return sorted(directory_path.iterdir())
+
+    @_archive_aware
+    def glob(self, directory_path, pattern):
+        return list(directory_path.glob(pattern))
+
+    @_archive_aware
+    def walk(self, directory_path):
+        return os.walk(str(directory_path))
+
+    @_archive_aware
+    def read_text(self, file_path):
+        with file_path.open('r') as fp:
+            return fp.read()
+
+    @_archive_aware
+    def read_bytes(self, file_path):
+        with file_path.open('rb') as fp:
+            return fp.read()
+
+    @_archive_aware
+    def open_binary(self, file_path):
+        return file_path.open('rb')
+
+    @_archive_aware
+    def is_read_only(self, path):
+        return False
+
+    @_archive_aware
+    def get_size(self, file_path):
+        return file_path.stat().st_size
+
+    @_archive_aware
+    def get_signature(self, file_path):
+        stat = file_path.stat()
+        return [getattr(stat, 'st_mtime_ns', stat.st_mtime), stat.st_size]
+
+    @_archive_aware
+    def write_file(self, file_path, content, mode='w'):
+        return atomic.write_file(file_path, content, mode)
+
+    @_archive_aware
+    def _make_directory(self, directory_path):
+        return atomic.make_directory(directory_path)
+
+    @_archive_aware
+    def rename(self, source_path, target_path):
+        return atomic.rename(source_path, target_path)
+
+    @_archive_aware
+    def move(self, source_path, target_path):
+        try:
+            return self.rename(source_path, target_path)
+        except OSError as e:
+            # Source and target live in different filesystems, rename(2)
+            # can't be used so we fall back to copy and delete.
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(str(source_path), str(target_path))
+            return target_path
+
+    @_archive_aware
+    def remove(self, file_path):
+        file_path.unlink()
+
+    @_archive_aware
+    def remove_tree(self, directory_path):
+        shutil.rmtree(str(directory_path.absolute()), ignore_errors=True)
+
+
+class _BaseFile(object):
+    # Content not read yet from the base filesystem
+    def __init__(self, path):
+        self.path = path
+
+
+_DIRECTORY = object()
+
+
+def _error(error_number, path):
+    return OSError(error_number, os.strerror(error_number), str(path))
+
+
+class MemoryFilesystem(BaseFilesystem):
+    """Filesystem kept in a dict. Given a `base` filesystem, it works
+    as a copy on write layer over it: reads fall through to the base
+    until a path is changed here, and the base is never written.
+    Every change is recorded in `operations`."""
+    in_memory = True
+
+    def __init__(self, base=None):
+        self.base = base
+        self.operations = []
+        self._entries = {}
+        self._children = defaultdict(set)
+        # Directories whose children are all in _entries already
+        self._listed = set()
+        # Paths removed (or renamed away) that still exist in the base
+        self._removed = set()
+
+    def _key(self, path):
+        return os.path.abspath(str(path))
+
+    def _set_entry(self, key, entry):
+        self._entries[key] = entry
+        self._children[os.path.dirname(key)].add(os.path.basename(key))
+
+    def _lookup(self, key):
+        if key in self._entries:
+            return self._entries[key]
+        if os.path.dirname(key) == key:
+            return _DIRECTORY
+        if self.base is None:
+            return None
+
+        # Hidden by a removed ancestor, or by a parent we know all the
+        # children of (the base may still have the old ones)
+        ancestor = key
+        while True:
+            parent = os.path.dirname(ancestor)
+            if ancestor in self._removed or parent in self._listed:
+                return None
+            if parent == ancestor or parent in self._entries:
+                break
+            ancestor = parent
+
+        base_path = Path(key)
+        if self.base.is_dir(base_path):
+            self._set_entry(key, _DIRECTORY)
+        elif self.base.is_file(base_path):
+            self._set_entry(key, _BaseFile(base_path))
+        else:
+            return None
+        return self._entries[key]
+
+    def _list(self, key):
+        if key not in self._listed:
+            if self.base is not None:
+                for path in self.base.iterdir(Path(key)):
+                    self._lookup(self._key(path))
+            self._listed.add(key)
+        return sorted(self._children[key])
+
+    def _load_tree(self, key):
+        for name in self._list(key):
+            child_key = os.path.join(key, name)
+            if self._entries[child_key] is _DIRECTORY:
+                self._load_tree(child_key)
+
+    def _pop_tree(self, key):
+        prefix = key + os.sep
+        popped = {}
+        for entry_key in [k for k in self._entries
+                          if k == key or k.startswith(prefix)]:
+            popped[entry_key] = self._entries.pop(entry_key)
+            self._children.pop(entry_key, None)
+            self._listed.discard(entry_key)
+        self._children[os.path.dirname(key)].discard(os.path.basename(key))
+        if self.base is not None:
+            self._removed.add(key)
+        return popped
+
+    def _get_directory_key(self, path):
+        key = self._key(path)
+        entry = self._lookup(key)
+        if entry is None:
+            raise _error(errno.ENOENT, path)
+        if entry is not _DIRECTORY:
+            raise _error(errno.ENOTDIR, path)
+        return key
+
+    def _get_file_entry(self, path):
+        entry = self._lookup(self._key(path))
+        if entry is None:
+            raise _error(errno.ENOENT, path)
+        if entry is _DIRECTORY:
+            raise _error(errno.EISDIR, path)
+        return entry
+
+    def exists(self, path):
+        return self._lookup(self._key(path)) is not None
+
+    def is_dir(self, path):
+        return self._lookup(self._key(path)) is _DIRECTORY
+
+    def is_file(self, path):
+        entry = self._lookup(self._key(path))
+        return entry is not None and entry is not _DIRECTORY
+
+    def iterdir(self, directory_path):
+        key = self._get_directory_key(directory_path)
+        return [directory_path / name for name in self._list(key)]
+
+    def read_bytes(self, file_path):
+        entry = self._get_file_entry(file_path)
+        if isinstance(entry, _BaseFile):
+            return self.base.read_bytes(entry.path)
+        if not isinstance(entry, bytes):
+            entry = entry.encode('utf-8')
+        return entry
+
+    def read_text(self, file_path):
+        entry = self._get_file_entry(file_path)
+        if isinstance(entry, _BaseFile):
+            return self.base.read_text(entry.path)
+        if isinstance(entry, bytes):
+            entry = entry.decode('utf-8')
+        return entry
+
+    def open_binary(self, file_path):
+        entry = self._get_file_entry(file_path)
+        if isinstance(entry, _BaseFile):
+            return self.base.open_binary(entry.path)
+        return BytesIO(self.read_bytes(file_path))
+
+    def is_read_only(self, path):
+        return self.base is not None and self.base.is_read_only(path)
+
+    def get_size(self, file_path):
+        entry = self._get_file_entry(file_path)
+        if isinstance(entry, _BaseFile):
+            return self.base.get_size(entry.path)
+        return len(self.read_bytes(file_path))
+
+    def get_signature(self, file_path):
+        entry = self._get_file_entry(file_path)
+        if isinstance(entry, _BaseFile):
+            return self.base.get_signature(entry.path)
+        # Written during this run, there's no mtime
+        content = self.read_bytes(file_path)
+        return [hashlib.sha1(content).hexdigest(), len(content)]
+
+    def write_file(self, file_path, content, mode='w'):
+        self._get_directory_key(file_path.parent)
+        key = self._key(file_path)
+        if self._lookup(key) is _DIRECTORY:
+            raise _error(errno.EISDIR, file_path)
+        self._removed.discard(key)
+        self._set_entry(key, content)
+        self.operations.append((WRITE, file_path))
+        return file_path
+
+    def _make_directory(self, directory_path):
+        self._get_directory_key(directory_path.parent)
+        key = self._key(directory_path)
+        if self._lookup(key) is not None:
+            raise _error(errno.EEXIST, directory_path)
+        self._removed.discard(key)
+        self._set_entry(key, _DIRECTORY)
+        self._listed.add(key)
+        self.operations.append((MAKE_DIRECTORY, directory_path))
+        return directory_path
+
+    def rename(self, source_path, target_path):
+        source_key = self._key(source_path)
+        entry = self._lookup(source_key)
+        if entry is None:
+            raise _error(errno.ENOENT, source_path)
+        self._get_directory_key(target_path.parent)
+        target_key = self._key(target_path)
+        if self._lookup(target_key) is _DIRECTORY:
+            raise _error(errno.EEXIST, target_path)
+
+        if entry is _DIRECTORY:
+            self._load_tree(source_key)
+        listed = set(key for key in self._listed
+                     if key == source_key or
+                     key.startswith(source_key + os.sep))
+        popped = self._pop_tree(source_key)
+
+        self._removed.discard(target_key)
+        for key, popped_entry in sorted(popped.items()):
+            new_key = target_key + key[len(source_key):]
+            self._set_entry(new_key, popped_entry)
+            if key in listed:
+                self._listed.add(new_key)
+        self.operations.append((RENAME, source_path, target_path))
+        return target_path
+
+    move = rename
+
+    def remove(self, file_path):
+        self._get_file_entry(file_path)
+        self._pop_tree(self._key(file_path))
+        self.operations.append((REMOVE, file_path))
+
+    def remove_tree(self, directory_path):
+        key = self._key(directory_path)
+        if self._lookup(key) is None:
+            return
+        self._pop_tree(key)
+        self.operations.append((REMOVE_TREE, directory_path))
+
+
+class ArchiveFilesystem(BaseFilesystem):
+    """Read only view of a zip or tar archive, built from its member
+    index. Members are only read when asked for (compressed tars are
+    cheapest to read in archive order, as they can't seek back)."""
+    read_only = True
+
+    def __init__(self, archive_path):
+        self.archive_path = archive_path
+        self._members = {'': _DIRECTORY}
+        self._children = defaultdict(set)
+
+        if zipfile.is_zipfile(str(archive_path)):
+            self._archive = zipfile.ZipFile(str(archive_path))
+            members = [(info.filename, info.filename.endswith('/'), info)
+                       for info in self._archive.infolist()]
+        else:
+            self._archive = tarfile.open(str(archive_path))
+            members = [(member.name, member.isdir(), member)
+                       for member in self._archive.getmembers()
+                       if member.isdir() or member.isfile()]
+
+        for name, is_dir, member in members:
+            parts = [part for part in name.split('/') if part not in ('', '.')]
+            if parts and '..' not in parts:
+                self._add_member('/'.join(parts),
+                                 (is_dir and _DIRECTORY) or member)
+
+    def _add_member(self, key, member):
+        parent = posixpath.dirname(key)
+        if parent not in self._members:
+            self._add_member(parent, _DIRECTORY)
+        self._members[key] = member
+        self._children[parent].add(posixpath.basename(key))
+
+    def close(self):
+        self._archive.close()
+
+    def _key(self, path):
+        relative = os.path.relpath(str(path), str(self.archive_path))
+        return ((relative != '.' and relative.replace(os.sep, '/')) or '')
+
+    def _get_member(self, path):
+        member = self._members.get(self._key(path))
+        if member is None:
+            raise _error(errno.ENOENT, path)
+        if member is _DIRECTORY:
+            raise _error(errno.EISDIR, path)
+        return member
+
+    def exists(self, path):
+        return self._key(path) in self._members
+
+    def is_dir(self, path):
+        return self._members.get(self._key(path)) is _DIRECTORY
+
+    def is_file(self, path):
+        return self.exists(path) and not self.is_dir(path)
+
+    def iterdir(self, directory_path):
+        key = self._key(directory_path)
+        if key not in self._members:
+            raise _error(errno.ENOENT, directory_path)
+        if self._members[key] is not _DIRECTORY:
+            raise _error(errno.ENOTDIR, directory_path)
+        return [directory_path / name
+                for name in sorted(self._children[key])]
+
+    def read_bytes(self, file_path):
+        member = self._get_member(file_path)
+        if isinstance(self._archive, zipfile.ZipFile):
+            return self._archive.read(member)
+        return self._archive.extractfile(member).read()
+
+    def read_text(self, file_path):
+        return self.read_bytes(file_path).decode('utf-8')
+
+    def open_binary(self, file_path):
+        member = self._get_member(file_path)
+        if isinstance(self._archive, zipfile.ZipFile):
+            return self._archive.open(member)
+        return self._archive.extractfile(member)
+
+    def get_size(self, file_path):
+        member = self._get_member(file_path)
+        if isinstance(member, zipfile.ZipInfo):
+            return member.file_size
+        return member.size
+
+    def get_signature(self, file_path):
+        member = self._get_member(file_path)
+        if isinstance(member, zipfile.ZipInfo):
+            return [list(member.date_time), member.CRC, member.file_size]
+        return [member.mtime, member.size]
+
+    def _read_only(self, path, *args, **kwargs):
+        raise _error(errno.EROFS, path)
+
+    write_file = _make_directory = rename = move = _read_only
+    remove = remove_tree = _read_only
+
+
+# (pid, archive path) -> (mtime, ArchiveFilesystem). Processes don't
+# share them, file offsets would get mixed up after a fork.
+_archives = {}
+
+
+def get_archive_filesystem(path):
+    """The ArchiveFilesystem of the archive `path` is (or is inside)"""
+    parts = path.parts
+    for index, part in enumerate(parts):
+        if not is_archive_name(part):
+            continue
+        archive_path = Path(*parts[:index + 1])
+        if not archive_path.is_file():
+            continue
+
+        key = (os.getpid(), str(archive_path.absolute()))
+        mtime = archive_path.stat().st_mtime
+        cached = _archives.get(key)
+        if cached is None or cached[0] != mtime:
+            if cached is not None:
+                cached[1].close()
+            cached = _archives[key] = (
+                mtime, ArchiveFilesystem(archive_path))
+        return cached[1]
+    return None
+
+
+_filesystem = DiskFilesystem()
+
+
+def set_filesystem(filesystem):
+    global _filesystem
+    _filesystem = filesystem
+
+
+def get_filesystem():
+    return _filesystem
+
+
+@contextlib.contextmanager
+def using(filesystem):
+    previous = get_filesystem()
+    set_filesystem(filesystem)
+    try:
+        yield filesystem
+    finally:
+        set_filesystem(previous)
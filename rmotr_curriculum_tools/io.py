@@ -1,11 +1,25 @@
 from __future__ import unicode_literals
 
+import os
+import sys
+import errno
+import contextlib
+import functools
+import subprocess
+import time
+import uuid as uuid_module
 from pathlib import Path
 import pytoml as toml
 
 from .models import *
 from . import utils
+from . import atomic
+from . import locks
+from . import filesystems
+from .filesystems import get_filesystem
+from . import templates
 from . import exceptions
+from . import events
 
 UNIT_GLOB = 'unit-*'
 LESSON_GLOB = 'lesson-*'
@@ -16,13 +30,21 @@ TESTS_DIR_NAME = 'tests'
 SOLUTIONS_DIR_NAME = 'solutions'
 TEST_PY_NAME = 'test_.py'
 EMPTY_SOLUTION_NAME = 'solution_.py'
+TRASH_DIR_NAME = '.trash'
+
+# Run by purge_trash(background=True): package directory, then the paths
+PURGE_SCRIPT = '''
+import sys
+from pathlib import Path
+sys.path.insert(0, sys.argv[1])
+from rmotr_curriculum_tools import io
+io._purge_paths([Path(path) for path in sys.argv[2:]])
+'''
 
 
 def read_dot_rmotr_file(path):
     dot_rmotr_path = path / DOT_RMOTR_FILE_NAME
-    with dot_rmotr_path.open('r') as fp:
-        dot_rmotr_content = toml.loads(fp.read())
-    return dot_rmotr_content
+    return toml.loads(get_filesystem().read_text(dot_rmotr_path))
 
 
 def get_lesson_class_from_type(_type):
@@ -35,7 +57,7 @@ def get_lesson_class_from_type(_type):
         '{} is not a valid lesson type'.format(_type))
 
 
-def read_lesson(unit, lesson_path):
+def read_lesson(unit, lesson_path, with_readme=True):
     order = utils.get_order_from_numbered_object_directory_name(
         lesson_path.name)
     dot_rmotr = read_dot_rmotr_file(lesson_path)
@@ -43,8 +65,11 @@ def read_lesson(unit, lesson_path):
     LessonClass = get_lesson_class_from_type(dot_rmotr['type'])
 
     readme_path = lesson_path / README_FILE_NAME
-    with readme_path.open(mode='r') as fp:
-        readme_content = fp.read()
+    readme_content = None
+    if with_readme:
+        # Read the first time it's accessed
+        readme_content = functools.partial(
+            get_filesystem().read_text, readme_path)
 
     lesson = LessonClass(
         unit=unit,
@@ -60,11 +85,11 @@ def read_lesson(unit, lesson_path):
 
 
 def read_lessons(unit):
-    lessons_glob = unit.directory_path.glob(LESSON_GLOB)
+    lessons_glob = get_filesystem().glob(unit.directory_path, LESSON_GLOB)
     return [read_lesson(unit, lesson_path) for lesson_path in lessons_glob]
 
 
-def read_unit(course, unit_path):
+def read_unit(course, unit_path, with_lessons=True, eager=False):
     order = utils.get_order_from_numbered_object_directory_name(unit_path.name)
     dot_rmotr = read_dot_rmotr_file(unit_path)
     unit = Unit(
@@ -74,18 +99,38 @@ def read_unit(course, unit_path):
         name=dot_rmotr['name'],
         order=order
     )
-    unit._lessons = read_lessons(unit)
+    if with_lessons:
+        # Lessons are read the first time they're accessed, unless eager
+        unit._lessons = functools.partial(read_lessons, unit)
+        if eager:
+            unit.lesson_count()
     return unit
 
 
-def read_units(course):
-    units_glob = course.directory_path.glob(UNIT_GLOB)
-    return [read_unit(course, unit_path) for unit_path in units_glob]
+def read_units(course, eager=False):
+    units_glob = get_filesystem().glob(course.directory_path, UNIT_GLOB)
+    return [read_unit(course, unit_path, eager=eager)
+            for unit_path in units_glob]
+
 
+def find_course_directory_path(path):
+    """Courses can also be read from zip and tar archives, which usually
+    wrap the course in a single top directory."""
+    filesystem = get_filesystem()
+    if (filesystems.is_archive_name(path.name) and
+            not filesystem.exists(path / DOT_RMOTR_FILE_NAME)):
+        directory_paths = [child for child in filesystem.iterdir(path)
+                           if filesystem.is_dir(child)]
+        if len(directory_paths) == 1:
+            return directory_paths[0]
+    return path
 
-def read_course_from_path(course_directory_path):
+
+def read_course_from_path(course_directory_path, with_units=True,
+                          eager=False):
     if not isinstance(course_directory_path, Path):
         course_directory_path = Path(course_directory_path)
+    course_directory_path = find_course_directory_path(course_directory_path)
 
     dot_rmotr = read_dot_rmotr_file(course_directory_path)
 
@@ -95,11 +140,40 @@ def read_course_from_path(course_directory_path):
         name=dot_rmotr['name'],
         track=dot_rmotr['track']
     )
-    course._units = read_units(course)
+    if with_units:
+        # Units are read the first time they're accessed, unless eager
+        course._units = functools.partial(read_units, course, eager)
+        if eager:
+            course.unit_count()
 
     return course
 
 
+def iter_numbered_paths(directory_path, glob):
+    return sorted(
+        get_filesystem().glob(directory_path, glob),
+        key=lambda path: (
+            utils.get_order_from_numbered_object_directory_name(path.name))
+    )
+
+
+def iter_units(course_directory_path):
+    """Yields the units of a course in order, as they are read. Units
+    don't load their lessons."""
+    course = read_course_from_path(course_directory_path, with_units=False)
+    for unit_path in iter_numbered_paths(course.directory_path, UNIT_GLOB):
+        yield read_unit(course, unit_path, with_lessons=False)
+
+
+def iter_lessons(course_directory_path, with_readme=True):
+    """Yields all the lessons of a course in order, as they are read.
+    Only the lesson being yielded (and its unit) are kept in memory."""
+    for unit in iter_units(course_directory_path):
+        for lesson_path in iter_numbered_paths(
+                unit.directory_path, LESSON_GLOB):
+            yield read_lesson(unit, lesson_path, with_readme)
+
+
 def read_unit_from_path(unit_directory_path):
 
     unit_dot_rmotr = read_dot_rmotr_file(unit_directory_path)
@@ -121,6 +195,20 @@ def read_lesson_from_path(lesson_directory_path):
             return lesson
 
 
+def iter_assignment_file_paths(lesson_directory_path):
+    filesystem = get_filesystem()
+    main_py_path = lesson_directory_path / MAIN_PY_NAME
+    if filesystem.is_file(main_py_path):
+        yield main_py_path
+
+    for dir_name in [TESTS_DIR_NAME, SOLUTIONS_DIR_NAME]:
+        dir_path = lesson_directory_path / dir_name
+        if not filesystem.is_dir(dir_path):
+            continue
+        for file_path in sorted(filesystem.glob(dir_path, '*.py')):
+            yield file_path
+
+
 def _create_assignment_files(lesson_directory_path):
     main_py_path = lesson_directory_path / MAIN_PY_NAME
     tests_path = lesson_directory_path / TESTS_DIR_NAME
@@ -129,76 +217,115 @@ def _create_assignment_files(lesson_directory_path):
     empty_test_path = tests_path / TEST_PY_NAME
     empty_solution_path = solutions_path / EMPTY_SOLUTION_NAME
 
-    tests_path.mkdir()
-    solutions_path.mkdir()
+    filesystem = get_filesystem()
+    filesystem.make_directory(tests_path)
+    filesystem.make_directory(solutions_path)
     for file_path in [main_py_path, empty_test_path, empty_solution_path]:
-        with file_path.open(mode='w') as fp:
-            fp.write('# empty')
+        filesystem.write_file(file_path, '# empty')
+
 
+def _apply_template(object_directory_path, template_name, templates_path,
+                    variables):
+    if templates_path is not None and not isinstance(templates_path, Path):
+        templates_path = Path(templates_path)
+    template_path = templates.get_template_path(templates_path, template_name)
+    if template_path is None:
+        return False
 
-def create_unit(directory_path, name, order):
+    variables = dict(variables, slug=object_directory_path.name)
+    templates.render_template(template_path, object_directory_path,
+                              variables, exclude=[DOT_RMOTR_FILE_NAME])
+    return True
+
+
+def create_unit(directory_path, name, order, attrs=None):
+    attrs = attrs or {}
+    uuid = attrs.get('uuid') or str(uuid_module.uuid4())
     unit_directory_path = (
         directory_path /
         utils.generate_unit_directory_name(name, order)
     )
 
-    unit_directory_path.mkdir()
+    filesystem = get_filesystem()
+    filesystem.make_directory(unit_directory_path)
     dot_rmotr_path = unit_directory_path / DOT_RMOTR_FILE_NAME
     readme_path = unit_directory_path / README_FILE_NAME
 
-    with dot_rmotr_path.open(mode='w') as fp:
-        fp.write(utils.generate_unit_dot_rmotr_file(name=name))
+    filesystem.write_file(dot_rmotr_path, utils.generate_unit_dot_rmotr_file(
+        name=name, uuid=uuid))
+    filesystem.write_file(readme_path, '# {}\n'.format(name))
 
-    with readme_path.open(mode='w') as fp:
-        fp.write('# {}\n'.format(name))
+    _apply_template(
+        unit_directory_path, templates.UNIT_TEMPLATE_NAME,
+        attrs.get('templates_path'),
+        {'name': name, 'order': order, 'uuid': uuid})
 
+    events.emit(events.CREATED, events.UNIT, uuid, unit_directory_path)
     return unit_directory_path
 
 
 def create_lesson(directory_path, name, order, attrs):
     _type = attrs['type']
+    uuid = attrs.get('uuid') or str(uuid_module.uuid4())
 
     lesson_directory_path = (
         directory_path /
         utils.generate_lesson_directory_name(name, order)
     )
-    lesson_directory_path.mkdir()
+    filesystem = get_filesystem()
+    filesystem.make_directory(lesson_directory_path)
     dot_rmotr_path = lesson_directory_path / DOT_RMOTR_FILE_NAME
     readme_path = lesson_directory_path / README_FILE_NAME
 
-    with dot_rmotr_path.open(mode='w') as fp:
-        fp.write(utils.generate_lesson_dot_rmotr_file(name=name, _type=_type))
+    filesystem.write_file(
+        dot_rmotr_path, utils.generate_lesson_dot_rmotr_file(
+            name=name, _type=_type, uuid=uuid))
+    filesystem.write_file(readme_path, '# {}\n'.format(name))
 
-    with readme_path.open(mode='w') as fp:
-        fp.write('# {}\n'.format(name))
+    # A template for the lesson type replaces the default scaffolding
+    templated = _apply_template(
+        lesson_directory_path, _type, attrs.get('templates_path'),
+        {'name': name, 'order': order, 'uuid': uuid, 'type': _type})
 
-    if _type == ASSIGNMENT:
+    if _type == ASSIGNMENT and not templated:
         _create_assignment_files(lesson_directory_path)
 
+    events.emit(events.CREATED, events.LESSON, uuid, lesson_directory_path)
     return lesson_directory_path
 
 
+def _rename_child_object(model_obj, target_path):
+    get_filesystem().rename(model_obj.directory_path, target_path)
+    events.emit(events.RENAMED, events.get_object_kind(model_obj),
+                model_obj.uuid, target_path, model_obj.directory_path)
+
+
 def rename_child_object_incrementing_order(model_obj, _type):
     new_name = utils.generate_model_object_directory_name(
         model_obj.name, model_obj.order + 1, _type)
-    model_obj.directory_path.rename(model_obj.parent.directory_path / new_name)
+    _rename_child_object(
+        model_obj, model_obj.parent.directory_path / new_name)
     return model_obj.directory_path
 
 
 def rename_child_object_decrementing_order(model_obj, _type):
     new_name = utils.generate_model_object_directory_name(
         model_obj.name, model_obj.order - 1, _type)
-    model_obj.directory_path.rename(model_obj.parent.directory_path / new_name)
+    _rename_child_object(
+        model_obj, model_obj.parent.directory_path / new_name)
     return model_obj.directory_path
 
 
-def make_space_between_child_objects(model_obj, order):
+def _get_children_type(model_obj):
     if isinstance(model_obj, Course):
-        _type = 'unit'
+        return 'unit'
     elif isinstance(model_obj, Unit):
-        _type = 'lesson'
-    else:
-        raise AttributeError("Can't identify object %s" % model_obj)
+        return 'lesson'
+    raise AttributeError("Can't identify object %s" % model_obj)
+
+
+def make_space_between_child_objects(model_obj, order):
+    _type = _get_children_type(model_obj)
 
     for child in model_obj.iter_children():
         if child.order >= order:
@@ -206,12 +333,7 @@ def make_space_between_child_objects(model_obj, order):
 
 
 def _rename_other_children_after_deleting_order(model_obj, order):
-    if isinstance(model_obj, Course):
-        _type = 'unit'
-    elif isinstance(model_obj, Unit):
-        _type = 'lesson'
-    else:
-        raise AttributeError("Can't identify object %s" % model_obj)
+    _type = _get_children_type(model_obj)
 
     for child in model_obj.iter_children():
         if child.order > order:
@@ -233,10 +355,6 @@ def _add_object_to_parent(directory_path, name, creation_callback,
     if order is None:
         order = last_object_order + 1
 
-    rename = (order <= last_object_order)
-    if rename:
-        make_space_between_child_objects(model_obj, order)
-
     creation_kwargs = {
         'directory_path': directory_path,
         'name': name,
@@ -245,23 +363,117 @@ def _add_object_to_parent(directory_path, name, creation_callback,
     if creation_attributes:
         creation_kwargs['attrs'] = creation_attributes
 
-    return creation_callback(**creation_kwargs)
+    with atomic.batch():
+        rename = (order <= last_object_order)
+        if rename:
+            make_space_between_child_objects(model_obj, order)
+
+        return creation_callback(**creation_kwargs)
 
 
-def add_unit_to_course(course_directory_path, name, order=None):
-    return _add_object_to_parent(
-        course_directory_path, name, create_unit,
-        read_course_from_path, order)
+@contextlib.contextmanager
+def _lock_unit_directories(*unit_directory_paths):
+    # All units must belong to the same course. Their uuids are read once
+    # the course is locked, when the units can't be renamed anymore.
+    course_directory_path = unit_directory_paths[0].parent
+    with locks.lock_course_shared(course_directory_path):
+        uuids = [read_dot_rmotr_file(path)['uuid']
+                 for path in unit_directory_paths]
+        with locks.lock_units(course_directory_path, *uuids):
+            yield
 
 
-def add_lesson_to_unit(unit_directory_path, name, _type, order=None):
-    return _add_object_to_parent(
-        unit_directory_path, name, create_lesson,
-        read_unit_from_path,
-        order, {'type': _type})
+def add_unit_to_course(course_directory_path, name, order=None,
+                       templates_path=None):
+    if not isinstance(course_directory_path, Path):
+        course_directory_path = Path(course_directory_path)
 
+    with locks.lock_courses(course_directory_path):
+        return _add_object_to_parent(
+            course_directory_path, name, create_unit,
+            read_course_from_path, order,
+            (templates_path and {'templates_path': templates_path}) or None)
 
-def _remove_child_from_directory(directory_path, get_model_callback):
+
+def add_lesson_to_unit(unit_directory_path, name, _type, order=None,
+                       templates_path=None):
+    if not isinstance(unit_directory_path, Path):
+        unit_directory_path = Path(unit_directory_path)
+
+    with _lock_unit_directories(unit_directory_path):
+        return _add_object_to_parent(
+            unit_directory_path, name, create_lesson,
+            read_unit_from_path,
+            order, {'type': _type, 'templates_path': templates_path})
+
+
+def _get_course_directory_path(model_obj):
+    if isinstance(model_obj, Course):
+        return model_obj.directory_path
+    return _get_course_directory_path(model_obj.parent)
+
+
+def get_trash_directory_path(course_directory_path):
+    if not isinstance(course_directory_path, Path):
+        course_directory_path = Path(course_directory_path)
+    return course_directory_path / TRASH_DIR_NAME
+
+
+def move_to_trash(model_obj):
+    trash_path = get_trash_directory_path(
+        _get_course_directory_path(model_obj))
+    try:
+        get_filesystem().make_directory(trash_path)
+    except OSError as e:
+        # Lessons of different units are removed concurrently
+        if e.errno != errno.EEXIST:
+            raise
+
+    trashed_path = trash_path / '{timestamp}-{uuid}-{name}'.format(
+        timestamp=int(time.time() * 1000000),
+        uuid=model_obj.uuid,
+        name=model_obj.directory_path.name
+    )
+    # Same filesystem as the course, so this is a single atomic rename
+    get_filesystem().rename(model_obj.directory_path, trashed_path)
+    events.emit(events.REMOVED, events.get_object_kind(model_obj),
+                model_obj.uuid, model_obj.directory_path)
+    return trashed_path
+
+
+def _purge_paths(paths):
+    filesystem = get_filesystem()
+    for path in paths:
+        filesystem.remove_tree(path)
+
+
+def purge_trash(course_directory_path, background=False):
+    trash_path = get_trash_directory_path(course_directory_path)
+    if not get_filesystem().exists(trash_path):
+        return None
+
+    # Only what is in the trash right now gets purged, objects removed
+    # while purging will be collected by the next call.
+    paths = get_filesystem().iterdir(trash_path)
+    if not paths:
+        return None
+    if not background or get_filesystem().in_memory:
+        _purge_paths(paths)
+        return None
+
+    # A detached process, so the caller can exit without waiting for it
+    package_parent = os.path.dirname(
+        os.path.dirname(os.path.abspath(__file__)))
+    with open(os.devnull, 'r+b') as devnull:
+        return subprocess.Popen(
+            [sys.executable, '-c', PURGE_SCRIPT, package_parent] +
+            [str(path.absolute()) for path in paths],
+            stdin=devnull, stdout=devnull, stderr=devnull, close_fds=True,
+            preexec_fn=getattr(os, 'setsid', None))
+
+
+def _remove_child_from_directory(directory_path, get_model_callback,
+                                 purge=False):
 
     if not isinstance(directory_path, Path):
         directory_path = Path(directory_path)
@@ -269,17 +481,460 @@ def _remove_child_from_directory(directory_path, get_model_callback):
     model_obj = get_model_callback(directory_path)
     parent = model_obj.parent
 
-    last_object = parent.last_child_object
-    if last_object.order != model_obj.order:
-        _rename_other_children_after_deleting_order(parent, model_obj.order)
+    with atomic.batch():
+        trashed_path = move_to_trash(model_obj)
 
-    import shutil
-    shutil.rmtree(str(model_obj.directory_path.absolute()))
+        last_object = parent.last_child_object
+        if last_object.order != model_obj.order:
+            _rename_other_children_after_deleting_order(
+                parent, model_obj.order)
 
+    if purge:
+        purge_trash(_get_course_directory_path(parent), background=True)
 
-def remove_unit_from_directory(directory_path):
-    return _remove_child_from_directory(directory_path, read_unit_from_path)
+    return trashed_path
 
 
-def remove_lesson_from_directory(directory_path):
-    return _remove_child_from_directory(directory_path, read_lesson_from_path)
+def remove_unit_from_directory(directory_path, purge=False):
+    if not isinstance(directory_path, Path):
+        directory_path = Path(directory_path)
+
+    with locks.lock_courses(directory_path.parent):
+        return _remove_child_from_directory(
+            directory_path, read_unit_from_path, purge)
+
+
+def remove_lesson_from_directory(directory_path, purge=False):
+    if not isinstance(directory_path, Path):
+        directory_path = Path(directory_path)
+
+    with _lock_unit_directories(directory_path.parent):
+        return _remove_child_from_directory(
+            directory_path, read_lesson_from_path, purge)
+
+
+def _find_child_by_uuid(model_obj, uuid):
+    for child in model_obj.iter_children():
+        if child.uuid == uuid:
+            return child
+
+
+def _relocate_directory(source_path, target_path):
+    # Falls back to copy and delete across devices
+    return get_filesystem().move(source_path, target_path)
+
+
+def _move_child_within_parent(model_obj, order):
+    parent = model_obj.parent
+    _type = _get_children_type(parent)
+
+    for sibling in parent.iter_children():
+        if sibling.uuid == model_obj.uuid:
+            continue
+        if model_obj.order < sibling.order <= order:
+            rename_child_object_decrementing_order(sibling, _type)
+        elif order <= sibling.order < model_obj.order:
+            rename_child_object_incrementing_order(sibling, _type)
+
+
+def _move_child_to_parent(model_obj, target_parent, order=None):
+    source_parent = model_obj.parent
+    _type = _get_children_type(target_parent)
+    same_parent = (source_parent.uuid == target_parent.uuid)
+
+    last_object = target_parent.last_child_object
+    last_object_order = (last_object and last_object.order) or 0
+    if same_parent:
+        order = min(order or last_object_order, last_object_order)
+    elif order is None or order > last_object_order:
+        order = last_object_order + 1
+
+    if same_parent and order == model_obj.order:
+        return model_obj.directory_path
+
+    target_path = (
+        target_parent.directory_path /
+        utils.generate_model_object_directory_name(
+            model_obj.name, order, _type)
+    )
+    with atomic.batch():
+        if same_parent:
+            _move_child_within_parent(model_obj, order)
+        else:
+            if source_parent.last_child_object.order != model_obj.order:
+                _rename_other_children_after_deleting_order(
+                    source_parent, model_obj.order)
+            if order <= last_object_order:
+                make_space_between_child_objects(target_parent, order)
+
+        _relocate_directory(model_obj.directory_path, target_path)
+        events.emit(events.RENAMED, events.get_object_kind(model_obj),
+                    model_obj.uuid, target_path, model_obj.directory_path)
+        return target_path
+
+
+def move_lesson_to_unit(lesson_directory_path, unit_directory_path,
+                        order=None):
+    if not isinstance(lesson_directory_path, Path):
+        lesson_directory_path = Path(lesson_directory_path)
+    if not isinstance(unit_directory_path, Path):
+        unit_directory_path = Path(unit_directory_path)
+
+    source_unit_path = lesson_directory_path.parent
+    if (source_unit_path.parent.absolute() ==
+            unit_directory_path.parent.absolute()):
+        lock = _lock_unit_directories(source_unit_path, unit_directory_path)
+    else:
+        lock = locks.lock_courses(
+            source_unit_path.parent, unit_directory_path.parent)
+
+    with lock:
+        return _move_lesson_to_unit(
+            lesson_directory_path, unit_directory_path, order)
+
+
+def _move_lesson_to_unit(lesson_directory_path, unit_directory_path, order):
+    lesson = read_lesson_from_path(lesson_directory_path)
+
+    # Both units are taken from the same read when they share the course
+    course = lesson.unit.course
+    target_unit = None
+    if (unit_directory_path.parent.absolute() ==
+            course.directory_path.absolute()):
+        target_unit = _find_child_by_uuid(
+            course, read_dot_rmotr_file(unit_directory_path)['uuid'])
+    if target_unit is None:
+        target_unit = read_unit_from_path(unit_directory_path)
+
+    return _move_child_to_parent(lesson, target_unit, order)
+
+
+def move_unit_to_course(unit_directory_path, course_directory_path,
+                        order=None):
+    if not isinstance(unit_directory_path, Path):
+        unit_directory_path = Path(unit_directory_path)
+    if not isinstance(course_directory_path, Path):
+        course_directory_path = Path(course_directory_path)
+
+    with locks.lock_courses(unit_directory_path.parent, course_directory_path):
+        return _move_unit_to_course(
+            unit_directory_path, course_directory_path, order)
+
+
+def _move_unit_to_course(unit_directory_path, course_directory_path, order):
+    unit = read_unit_from_path(unit_directory_path)
+
+    target_course = unit.course
+    if (course_directory_path.absolute() !=
+            target_course.directory_path.absolute()):
+        target_course = read_course_from_path(course_directory_path)
+
+    return _move_child_to_parent(unit, target_course, order)
+
+
+def get_directory_slug(directory_path):
+    # unit-3-python-intro -> python-intro
+    parts = directory_path.name.split('-', 2)
+    return (len(parts) == 3 and parts[2]) or ''
+
+
+def _renumber_directory_name(directory_path, order):
+    parts = directory_path.name.split('-', 2)
+    parts[1] = str(order)
+    return '-'.join(parts)
+
+
+def _get_new_order(children, identifiers):
+    by_identifier = {}
+    for child in children:
+        for identifier in set([child.uuid, child.directory_path.name,
+                               get_directory_slug(child.directory_path)]):
+            by_identifier.setdefault(identifier, []).append(child)
+
+    ordered = []
+    for identifier in identifiers:
+        matches = by_identifier.get(identifier, [])
+        if not matches:
+            raise exceptions.InvalidOrderException(
+                '{} not found'.format(identifier))
+        if len(matches) > 1:
+            raise exceptions.InvalidOrderException(
+                '{} is ambiguous, use its uuid'.format(identifier))
+        if matches[0] in ordered:
+            raise exceptions.InvalidOrderException(
+                '{} is listed twice'.format(identifier))
+        ordered.append(matches[0])
+
+    # Whatever isn't listed keeps its relative order, after the rest
+    return ordered + [child for child in children if child not in ordered]
+
+
+def order_renames(renames):
+    """Sort (source, target) renames so no directory is overwritten
+    before it's moved away. Chains take one rename per directory and
+    every cycle one more, through a temporary name."""
+    pending = dict((source, target) for source, target in renames
+                   if source != target)
+    waiting = dict((target, source) for source, target in pending.items())
+    ready = sorted(source for source, target in pending.items()
+                   if target not in pending)
+    ordered = []
+
+    while pending:
+        if not ready:
+            source = min(pending)
+            temporary_path = source.with_name(
+                '.{}.reorder'.format(source.name))
+            target = pending.pop(source)
+            pending[temporary_path] = target
+            waiting[target] = temporary_path
+            ordered.append((source, temporary_path))
+            ready.append(waiting[source])
+            continue
+
+        source = ready.pop()
+        target = pending.pop(source)
+        del waiting[target]
+        ordered.append((source, target))
+        if source in waiting:
+            ready.append(waiting[source])
+
+    return ordered
+
+
+def _reorder_children(model_obj, identifiers):
+    children = list(model_obj.iter_children())
+    new_order = _get_new_order(children, identifiers or [])
+    target_paths = [
+        (child, child.directory_path.with_name(
+            _renumber_directory_name(child.directory_path, order)))
+        for order, child in enumerate(new_order, 1)
+    ]
+    renames = order_renames([(child.directory_path, target_path)
+                             for child, target_path in target_paths])
+
+    with atomic.batch():
+        for source_path, target_path in renames:
+            get_filesystem().rename(source_path, target_path)
+
+    # One event per child, whatever temporary names it went through
+    for child, target_path in target_paths:
+        if target_path != child.directory_path:
+            events.emit(events.RENAMED, events.get_object_kind(child),
+                        child.uuid, target_path, child.directory_path)
+    return renames
+
+
+def reorder_children(directory_path, identifiers=None):
+    """Renumber the units of a course or the lessons of a unit from 1,
+    closing gaps. Children listed in `identifiers` (uuids, slugs or
+    directory names) go first. Returns the renames done."""
+    if not isinstance(directory_path, Path):
+        directory_path = Path(directory_path)
+
+    if directory_path.match(UNIT_GLOB):
+        with _lock_unit_directories(directory_path):
+            return _reorder_children(
+                read_unit_from_path(directory_path), identifiers)
+
+    with locks.lock_courses(directory_path):
+        return _reorder_children(
+            read_course_from_path(directory_path), identifiers)
+
+
+class CourseSession(object):
+    """Changes to a course applied to its in memory model only.
+    commit() compares the model with the course as it was read and
+    renames, creates and trashes each directory at most once."""
+    def __init__(self, course_directory_path):
+        self.course = read_course_from_path(course_directory_path, eager=True)
+        self.committed = False
+        self._templates_paths = {}
+
+        # uuid -> (object, directory path, parent uuid) as read
+        self._original = {}
+        for unit in self.course.iter_units():
+            self._original[unit.uuid] = (
+                unit, unit.directory_path, self.course.uuid)
+            for lesson in unit.iter_lessons():
+                self._original[lesson.uuid] = (
+                    lesson, lesson.directory_path, unit.uuid)
+
+    def _find_child(self, parent, identifier):
+        for child in parent.iter_children():
+            if identifier in [child.uuid, utils.slugify(child.name)]:
+                return child
+            if (child.directory_path is not None and
+                    identifier == child.directory_path.name):
+                return child
+        raise exceptions.InvalidOrderException(
+            '{} not found'.format(identifier))
+
+    def get_unit(self, identifier):
+        """Unit by uuid, slug or directory name"""
+        return self._find_child(self.course, identifier)
+
+    def get_lesson(self, unit, identifier):
+        return self._find_child(unit, identifier)
+
+    def _get_children(self, parent):
+        if isinstance(parent, Course):
+            return parent._units
+        return parent._lessons
+
+    def _set_order(self, child, order):
+        _type = _get_children_type(child.parent)
+        child.order = order
+        child.slug = child._slugify_with_order(_type, order, child.name)
+
+    def _insert_child(self, parent, child, order=None):
+        last_object = parent.last_child_object
+        last_object_order = (last_object and last_object.order) or 0
+        if order is None or order > last_object_order:
+            order = last_object_order + 1
+
+        for sibling in parent.iter_children():
+            if sibling.order >= order:
+                self._set_order(sibling, sibling.order + 1)
+        self._get_children(parent).append(child)
+        self._set_order(child, order)
+        return child
+
+    def _detach_child(self, child):
+        parent = child.parent
+        self._get_children(parent).remove(child)
+        for sibling in parent.iter_children():
+            if sibling.order > child.order:
+                self._set_order(sibling, sibling.order - 1)
+
+    def add_unit(self, name, order=None, templates_path=None):
+        unit = Unit(course=self.course, uuid=str(uuid_module.uuid4()),
+                    name=name, order=order)
+        self._templates_paths[unit.uuid] = templates_path
+        return self._insert_child(self.course, unit, order)
+
+    def add_lesson(self, unit, name, _type, order=None, templates_path=None):
+        LessonClass = get_lesson_class_from_type(_type)
+        lesson = LessonClass(unit=unit, uuid=str(uuid_module.uuid4()),
+                             name=name, order=order)
+        self._templates_paths[lesson.uuid] = templates_path
+        return self._insert_child(unit, lesson, order)
+
+    def remove_unit(self, unit):
+        self._detach_child(unit)
+
+    def remove_lesson(self, lesson):
+        self._detach_child(lesson)
+
+    def move_unit(self, unit, order):
+        self._detach_child(unit)
+        return self._insert_child(self.course, unit, order)
+
+    def move_lesson(self, lesson, unit, order=None):
+        self._detach_child(lesson)
+        lesson.unit = unit
+        return self._insert_child(unit, lesson, order)
+
+    def _get_target_path(self, parent_path, child):
+        if child.uuid in self._original:
+            return parent_path / _renumber_directory_name(
+                self._original[child.uuid][1], child.order)
+        return parent_path / utils.generate_model_object_directory_name(
+            child.name, child.order, _get_children_type(child.parent))
+
+    def commit(self):
+        filesystem = get_filesystem()
+        course_path = self.course.directory_path
+        units = list(self.course.iter_units())
+        lessons = [lesson for unit in units for lesson in unit.iter_lessons()]
+        kept = set(obj.uuid for obj in units + lessons)
+        unit_paths = dict((unit.uuid, self._get_target_path(course_path, unit))
+                          for unit in units)
+
+        with atomic.batch():
+            # Lessons that change unit wait outside of both
+            staged_paths = {}
+            for lesson in lessons:
+                original = self._original.get(lesson.uuid)
+                if original and original[2] != lesson.unit.uuid:
+                    staged_paths[lesson.uuid] = filesystem.rename(
+                        original[1], course_path / '.{}.staged'.format(
+                            lesson.uuid))
+
+            for uuid, (obj, path, parent_uuid) in self._original.items():
+                if uuid not in kept and (
+                        isinstance(obj, Unit) or parent_uuid in kept):
+                    move_to_trash(obj)
+
+            for source_path, target_path in order_renames([
+                    (self._original[unit.uuid][1], unit_paths[unit.uuid])
+                    for unit in units if unit.uuid in self._original]):
+                filesystem.rename(source_path, target_path)
+
+            for unit in units:
+                unit_path = unit_paths[unit.uuid]
+                if unit.uuid not in self._original:
+                    create_unit(course_path, unit.name, unit.order, {
+                        'uuid': unit.uuid,
+                        'templates_path': self._templates_paths[unit.uuid]})
+
+                renames = []
+                for lesson in unit.iter_lessons():
+                    if lesson.uuid in staged_paths:
+                        continue
+                    original = self._original.get(lesson.uuid)
+                    if original:
+                        renames.append((unit_path / original[1].name,
+                                        self._get_target_path(
+                                            unit_path, lesson)))
+                for source_path, target_path in order_renames(renames):
+                    filesystem.rename(source_path, target_path)
+
+                for lesson in unit.iter_lessons():
+                    if lesson.uuid in staged_paths:
+                        filesystem.rename(
+                            staged_paths[lesson.uuid],
+                            self._get_target_path(unit_path, lesson))
+                    elif lesson.uuid not in self._original:
+                        create_lesson(unit_path, lesson.name, lesson.order, {
+                            'type': lesson.type,
+                            'uuid': lesson.uuid,
+                            'templates_path':
+                                self._templates_paths[lesson.uuid]})
+
+        for unit in units:
+            unit.directory_path = unit_paths[unit.uuid]
+            self._emit_renamed(unit, self.course.uuid)
+            for lesson in unit.iter_lessons():
+                lesson.directory_path = self._get_target_path(
+                    unit.directory_path, lesson)
+                lesson.readme_path = lesson.directory_path / README_FILE_NAME
+                if not lesson.readme_loaded:
+                    lesson.readme_content = functools.partial(
+                        filesystem.read_text, lesson.readme_path)
+                self._emit_renamed(lesson, unit.uuid)
+        self.committed = True
+
+    def _emit_renamed(self, child, parent_uuid):
+        # Lessons only follow their unit's rename, like with io functions
+        original = self._original.get(child.uuid)
+        if original is None:
+            return
+        _, original_path, original_parent_uuid = original
+        if (original_parent_uuid != parent_uuid or
+                original_path.name != child.directory_path.name):
+            events.emit(events.RENAMED, events.get_object_kind(child),
+                        child.uuid, child.directory_path, original_path)
+
+
+@contextlib.contextmanager
+def open_course(course_directory_path):
+    """Session to change a course in memory. Changes are written once,
+    when the block exits, or discarded if it raises."""
+    if not isinstance(course_directory_path, Path):
+        course_directory_path = Path(course_directory_path)
+
+    with locks.lock_courses(course_directory_path):
+        session = CourseSession(course_directory_path)
+        yield session
+        session.commit()
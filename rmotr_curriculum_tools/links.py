@@ -0,0 +1,207 @@
+from __future__ import unicode_literals
+
+import os
+import re
+import json
+import posixpath
+
+from . import io
+from . import utils
+from .filesystems import get_filesystem
+
+# Snapshot of where every unit and lesson (by uuid) was the last time
+# links were checked, used to follow renames with --fix.
+PATHS_SNAPSHOT_FILE_NAME = '.rmotr-paths.json'
+
+IGNORED_DIR_NAMES = [io.TRASH_DIR_NAME]
+
+_inline_link_re = re.compile(
+    r'!?\[[^\]]*\]\(\s*<?(?P<target>[^)\s>]+)>?(?:\s+"[^"]*")?\s*\)')
+_reference_link_re = re.compile(
+    r'^ {0,3}\[[^\]]+\]:\s*<?(?P<target>[^\s>]+)>?', re.MULTILINE)
+_html_link_re = re.compile(
+    r'<(?:a|img)\b[^>]*?\b(?:href|src)=["\'](?P<target>[^"\']+)["\']',
+    re.IGNORECASE)
+_external_re = re.compile(r'^([a-z][a-z0-9+.-]*:|//|#)', re.IGNORECASE)
+_numbered_name_re = re.compile(r'^(?P<type>unit|lesson)-\d+(?P<slug>-.*)?$')
+
+
+class Link(object):
+    def __init__(self, lesson, line, target, start, end):
+        self.lesson = lesson
+        self.line = line
+        self.target = target
+        self.start = start
+        self.end = end
+
+    @property
+    def path(self):
+        return re.split(r'[#?]', self.target, 1)[0]
+
+    @property
+    def suffix(self):
+        return self.target[len(self.path):]
+
+
+def _blank_code_blocks(content):
+    # Keep positions and line numbers, but ignore links inside code
+    for match in utils.iter_fenced_code_blocks(content):
+        start, end = match.span()
+        content = (content[:start] +
+                   re.sub(r'[^\n]', ' ', content[start:end]) +
+                   content[end:])
+    return content
+
+
+def extract_links(lesson):
+    content = lesson.readme_content or ''
+    searchable = _blank_code_blocks(content)
+    for link_re in [_inline_link_re, _reference_link_re, _html_link_re]:
+        for match in link_re.finditer(searchable):
+            target = match.group('target')
+            if _external_re.match(target):
+                continue
+            start, end = match.span('target')
+            yield Link(lesson, utils.get_line_number(content, start),
+                       target, start, end)
+
+
+class CoursePathIndex(object):
+    """Every file and directory of a course (relative to it, in posix
+    form) and the current directory of every unit and lesson uuid."""
+    def __init__(self, course):
+        self.course = course
+        self.paths = set()
+        self.uuid_paths = {}
+
+        root = str(course.directory_path)
+        walk = get_filesystem().walk(course.directory_path)
+        for directory, dir_names, file_names in walk:
+            dir_names[:] = [name for name in dir_names
+                            if name not in IGNORED_DIR_NAMES]
+            relative_dir = os.path.relpath(directory, root)
+            for name in dir_names + file_names:
+                self.paths.add(self._normalize(
+                    os.path.join(relative_dir, name)))
+
+        for unit in course.iter_units():
+            self.uuid_paths[unit.uuid] = self.relative_path(
+                unit.directory_path)
+            for lesson in unit.iter_lessons():
+                self.uuid_paths[lesson.uuid] = self.relative_path(
+                    lesson.directory_path)
+
+    def _normalize(self, path):
+        return posixpath.normpath(path.replace(os.sep, '/'))
+
+    def relative_path(self, path):
+        return self._normalize(os.path.relpath(
+            str(path), str(self.course.directory_path)))
+
+    def resolve(self, link):
+        readme_dir = self.relative_path(link.lesson.directory_path)
+        return posixpath.normpath(posixpath.join(readme_dir, link.path))
+
+    def exists(self, relative_path):
+        return relative_path == '.' or relative_path in self.paths
+
+
+def read_paths_snapshot(course_directory_path):
+    snapshot_path = course_directory_path / PATHS_SNAPSHOT_FILE_NAME
+    if not get_filesystem().exists(snapshot_path):
+        return {}
+    return json.loads(get_filesystem().read_text(snapshot_path))
+
+
+def write_paths_snapshot(course_directory_path, path_index):
+    snapshot_path = course_directory_path / PATHS_SNAPSHOT_FILE_NAME
+    get_filesystem().write_file(snapshot_path, json.dumps(
+        path_index.uuid_paths, indent=2, sort_keys=True))
+
+
+def _find_by_slug(path_index, relative_path):
+    # Without a snapshot, a renumbered directory is recognized by keeping
+    # its type and slug in the same parent.
+    parent, name = posixpath.split(relative_path)
+    match = _numbered_name_re.match(name)
+    if not match:
+        return None
+    candidates = [
+        path for path in path_index.uuid_paths.values()
+        if posixpath.dirname(path) == parent and
+        _numbered_name_re.match(posixpath.basename(path)).groups() ==
+        match.groups()
+    ]
+    return (len(candidates) == 1 and candidates[0]) or None
+
+
+def find_moved_path(path_index, snapshot, relative_path):
+    """Where the target of a broken link lives now, if it was (or was
+    inside) a unit or lesson directory that got renamed."""
+    old_uuids = dict((path, uuid) for uuid, path in snapshot.items())
+    parts = relative_path.split('/')
+    for length in range(len(parts), 0, -1):
+        prefix = '/'.join(parts[:length])
+        uuid = old_uuids.get(prefix)
+        new_prefix = (
+            (uuid and path_index.uuid_paths.get(uuid)) or
+            _find_by_slug(path_index, prefix))
+        if not new_prefix:
+            continue
+        new_path = posixpath.join(new_prefix, *parts[length:])
+        if path_index.exists(new_path):
+            return new_path
+    return None
+
+
+def _rewrite_links(lesson, replacements):
+    content = lesson.readme_content
+    for start, end, target in sorted(replacements, reverse=True):
+        content = content[:start] + target + content[end:]
+    get_filesystem().write_file(lesson.readme_path, content)
+    lesson.readme_content = content
+
+
+def check_course_links(course_directory_path, fix=False):
+    """Returns the broken links of all lessons. With `fix`, links to
+    units and lessons that were renamed are rewritten and left out.
+    The paths snapshot is written by the first check and by fixes."""
+    course = io.read_course_from_path(course_directory_path)
+    path_index = CoursePathIndex(course)
+    snapshot = read_paths_snapshot(course.directory_path)
+
+    broken = []
+    for unit in course.iter_units():
+        for lesson in unit.iter_lessons():
+            replacements = []
+            for link in extract_links(lesson):
+                relative_path = path_index.resolve(link)
+                if path_index.exists(relative_path):
+                    continue
+
+                new_path = fix and find_moved_path(
+                    path_index, snapshot, relative_path)
+                if new_path:
+                    lesson_path = path_index.relative_path(
+                        lesson.directory_path)
+                    new_target = posixpath.relpath(
+                        new_path, lesson_path) + link.suffix
+                    replacements.append((link.start, link.end, new_target))
+                    continue
+
+                broken.append({
+                    'lesson': lesson.name,
+                    'uuid': lesson.uuid,
+                    'path': str(lesson.readme_path),
+                    'line': link.line,
+                    'target': link.target
+                })
+            if replacements:
+                _rewrite_links(lesson, replacements)
+
+    # Checking doesn't change the course: only --fix (or the first check)
+    # records where everything is now, and never in read only sources
+    if ((fix or not snapshot) and snapshot != path_index.uuid_paths and
+            not get_filesystem().is_read_only(course.directory_path)):
+        write_paths_snapshot(course.directory_path, path_index)
+    return broken
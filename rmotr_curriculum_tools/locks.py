@@ -0,0 +1,144 @@
+from __future__ import unicode_literals
+
+import os
+import errno
+import hashlib
+import tempfile
+import threading
+import contextlib
+
+from pathlib import Path
+
+from . import filesystems
+from .filesystems import get_filesystem
+
+try:
+    import fcntl
+except ImportError:
+    # No advisory locks (Windows), mutations aren't serialized
+    fcntl = None
+
+# Lock files live out of the courses, in a per user directory, with a
+# subdirectory for every course (by its real path).
+LOCKS_DIR_NAME = 'rmotr_curriculum_tools-{uid}-locks'
+COURSE_LOCK_NAME = 'course.lock'
+
+SHARED = 'shared'
+EXCLUSIVE = 'exclusive'
+
+_local = threading.local()
+
+
+def _held_locks():
+    if not hasattr(_local, 'held'):
+        _local.held = {}
+    return _local.held
+
+
+def get_locks_directory_path():
+    base_path = os.environ.get('XDG_RUNTIME_DIR') or tempfile.gettempdir()
+    return Path(base_path, LOCKS_DIR_NAME.format(
+        uid=getattr(os, 'getuid', lambda: 0)()))
+
+
+def _get_course_locks_path(course_directory_path):
+    real_path = os.path.realpath(str(course_directory_path))
+    return get_locks_directory_path() / hashlib.sha1(
+        real_path.encode('utf-8')).hexdigest()
+
+
+def get_course_lock_path(course_directory_path):
+    return _get_course_locks_path(course_directory_path) / COURSE_LOCK_NAME
+
+
+def get_unit_lock_path(course_directory_path, unit_uuid):
+    return _get_course_locks_path(course_directory_path) / '{}.lock'.format(
+        unit_uuid)
+
+
+def _acquire(lock_path, mode):
+    try:
+        os.makedirs(str(lock_path.parent), 0o700)
+    except OSError as e:
+        if e.errno != errno.EEXIST:
+            raise
+    fd = os.open(str(lock_path), os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        fcntl.flock(fd, (mode == EXCLUSIVE and fcntl.LOCK_EX) or
+                    fcntl.LOCK_SH)
+    except BaseException:
+        os.close(fd)
+        raise
+    return fd
+
+
+@contextlib.contextmanager
+def _locked(locks):
+    """Take the given (course path, lock path, mode) locks in order,
+    skipping the ones this thread already holds, and release them on
+    exit."""
+    if get_filesystem().in_memory:
+        # Nothing to lock, and nothing shared with other processes
+        yield
+        return
+
+    held = _held_locks()
+    acquired = []
+    try:
+        for course_directory_path, lock_path, mode in locks:
+            if filesystems.get_archive_filesystem(
+                    course_directory_path) is not None:
+                # Archives are read only, there's nothing to protect
+                continue
+            key = str(lock_path.absolute())
+            if key in held:
+                if mode == EXCLUSIVE and held[key][1] != EXCLUSIVE:
+                    raise RuntimeError(
+                        "Can't upgrade shared lock {}".format(lock_path))
+                continue
+            if fcntl is not None:
+                held[key] = (_acquire(lock_path, mode), mode)
+            else:
+                held[key] = (None, mode)
+            acquired.append(key)
+        yield
+    finally:
+        for key in reversed(acquired):
+            fd, _ = held.pop(key)
+            if fd is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+                os.close(fd)
+
+
+def _sorted_paths(paths):
+    return sorted(set(path.absolute() for path in paths), key=str)
+
+
+def lock_courses(*course_directory_paths):
+    """Exclusive lock over whole courses, for mutations that rename
+    units. Courses are always locked in the same order, so two
+    operations on the same pair of courses can't deadlock."""
+    return _locked([(path, get_course_lock_path(path), EXCLUSIVE)
+                    for path in _sorted_paths(course_directory_paths)])
+
+
+def lock_course_shared(course_directory_path):
+    """Shared lock over a course: its units can't be renamed while it's
+    held, but their lessons can change."""
+    course_directory_path = course_directory_path.absolute()
+    return _locked([(course_directory_path,
+                     get_course_lock_path(course_directory_path), SHARED)])
+
+
+def lock_units(course_directory_path, *unit_uuids):
+    """Exclusive lock over some units of a course, for mutations that
+    only touch their lessons. The course is locked shared, so units
+    can't be renamed under us but other units stay writable."""
+    course_directory_path = course_directory_path.absolute()
+    locks = [(course_directory_path,
+              get_course_lock_path(course_directory_path), SHARED)]
+    locks.extend(
+        (course_directory_path,
+         get_unit_lock_path(course_directory_path, unit_uuid), EXCLUSIVE)
+        for unit_uuid in sorted(set(unit_uuids)))
+    return _locked(locks)
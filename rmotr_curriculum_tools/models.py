@@ -7,6 +7,27 @@ ASSIGNMENT = 'assignment'
 READING = 'reading'
 
 
+class LazyAttribute(object):
+    """Attribute (like a list of child objects) that can be assigned a
+    loader function instead, called the first time it's accessed."""
+    def __init__(self, attr_name):
+        self.attr_name = attr_name
+
+    def __get__(self, obj, objtype=None):
+        if obj is None:
+            return self
+        children = obj.__dict__[self.attr_name]
+        if callable(children):
+            children = obj.__dict__[self.attr_name] = children()
+        return children
+
+    def __set__(self, obj, children):
+        obj.__dict__[self.attr_name] = children
+
+    def is_loaded(self, obj):
+        return not callable(obj.__dict__[self.attr_name])
+
+
 class BaseTrackObject(object):
     def __str__(self):
         return "({}) - {} - {}".format(
@@ -33,6 +54,8 @@ class BaseTrackObject(object):
 
 
 class Course(BaseTrackObject):
+    _units = LazyAttribute('_units_or_loader')
+
     def __init__(self, directory_path, uuid, name, track):
         self._directory_path = directory_path
         self.uuid = uuid
@@ -66,8 +89,14 @@ class Course(BaseTrackObject):
     def last_child_object(self):
         return self.last_unit
 
+    @property
+    def units_loaded(self):
+        return Course._units.is_loaded(self)
+
 
 class Unit(BaseTrackObject):
+    _lessons = LazyAttribute('_lessons_or_loader')
+
     def __init__(self, course, uuid, name, order, directory_path=None):
         self.course = course
         self._directory_path = directory_path
@@ -113,7 +142,14 @@ class Unit(BaseTrackObject):
     def last_child_object(self):
         return self.last_lesson
 
+    @property
+    def lessons_loaded(self):
+        return Unit._lessons.is_loaded(self)
+
+
 class Lesson(BaseTrackObject):
+    readme_content = LazyAttribute('_readme_content_or_loader')
+
     def __init__(self, unit, uuid, name, order,
                  directory_path=None, readme_path=None, readme_content=None):
         self.unit = unit
@@ -136,6 +172,10 @@ class Lesson(BaseTrackObject):
     def parent(self):
         return self.unit
 
+    @property
+    def readme_loaded(self):
+        return Lesson.readme_content.is_loaded(self)
+
 
 class ReadingLesson(Lesson):
     def __init__(self, *args, **kwargs):
@@ -0,0 +1,433 @@
+from __future__ import unicode_literals
+
+import os
+import sys
+import json
+import time
+import types
+import errno
+import shutil
+import marshal
+import signal
+import tempfile
+import unittest
+import traceback
+import multiprocessing
+from pathlib import Path
+from xml.etree import ElementTree
+
+from . import io
+from . import exceptions
+from .models import ASSIGNMENT
+from .filesystems import get_filesystem
+
+PASSED = 'passed'
+FAILED = 'failed'
+ERROR = 'error'
+TIMEOUT = 'timeout'
+
+# Name the code under test is importable as from the tests
+CODE_MODULE_NAME = 'main'
+DEFAULT_TIMEOUT = 10
+# Seconds past the timeout before the parent kills a job's process
+KILL_GRACE = 2
+POLL_INTERVAL = 0.01
+
+
+class TestTimeoutException(BaseException):
+    # Not an Exception, so `except Exception` in tested code can't stop it
+    pass
+
+
+def _raise_timeout(signum, frame):
+    raise TestTimeoutException('Timed out')
+
+
+def init_worker(memory_limit=None):
+    """Sets up the process a job runs in, before running it. Memory
+    limit is expressed in megabytes."""
+    if memory_limit:
+        import resource
+        limit = memory_limit * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    signal.signal(signal.SIGALRM, _raise_timeout)
+
+
+def create_pool(processes=None, memory_limit=None):
+    return multiprocessing.Pool(
+        processes, initializer=init_worker, initargs=(memory_limit,))
+
+
+def compile_file(file_path):
+    return compile(get_filesystem().read_text(file_path), str(file_path),
+                   'exec')
+
+
+def compile_tests(test_paths):
+    return [(test_path.stem, compile_file(test_path))
+            for test_path in test_paths]
+
+
+def _load_module(name, code):
+    module = types.ModuleType(name)
+    module.__file__ = code.co_filename
+    sys.modules[name] = module
+    exec(code, module.__dict__)
+    return module
+
+
+def _collect_tests(module):
+    for name, obj in sorted(vars(module).items()):
+        if name.startswith('test') and isinstance(obj, types.FunctionType):
+            if obj.__module__ == module.__name__:
+                yield name, obj
+        elif (isinstance(obj, type) and issubclass(obj, unittest.TestCase)
+                and obj.__module__ == module.__name__):
+            suite = unittest.defaultTestLoader.loadTestsFromTestCase(obj)
+            for test in suite:
+                yield '{}.{}'.format(name, test._testMethodName), test
+
+
+def _run_test(test):
+    if isinstance(test, unittest.TestCase):
+        result = unittest.TestResult()
+        test.run(result)
+        for status, errors in [(FAILED, result.failures),
+                               (ERROR, result.errors)]:
+            for _, message in errors:
+                if TestTimeoutException.__name__ in message:
+                    raise TestTimeoutException('Timed out')
+                return status, message
+        return PASSED, None
+
+    try:
+        test()
+    except AssertionError:
+        return FAILED, traceback.format_exc()
+    except TestTimeoutException:
+        raise
+    except BaseException:
+        # sys.exit() included
+        return ERROR, traceback.format_exc()
+    return PASSED, None
+
+
+def _unload_modules(names, cwd=None):
+    # Jobs get a process of their own, but run_tests can also be called
+    # in one that goes on: don't leave the code under test imported.
+    cwd = cwd and os.path.abspath(str(cwd))
+    for name, module in list(sys.modules.items()):
+        module_file = getattr(module, '__file__', None) or ''
+        if name in names or (cwd and module_file.startswith(cwd)):
+            del sys.modules[name]
+
+
+def _overall_status(tests):
+    statuses = set(test['status'] for test in tests)
+    for status in [TIMEOUT, ERROR, FAILED]:
+        if status in statuses:
+            return status
+    return PASSED
+
+
+def run_tests(compiled_tests, code, cwd=None, timeout=DEFAULT_TIMEOUT):
+    """Run already compiled test modules against `code` (the compiled
+    module they import as `main`) in the current process."""
+    start = time.time()
+    previous_cwd = os.getcwd()
+    loaded_modules = [CODE_MODULE_NAME]
+    tests = []
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        if cwd:
+            os.chdir(str(cwd))
+        _load_module(CODE_MODULE_NAME, code)
+        for module_name, test_code in compiled_tests:
+            loaded_modules.append(module_name)
+            module = _load_module(module_name, test_code)
+            for name, test in _collect_tests(module):
+                status, message = _run_test(test)
+                tests.append({
+                    'name': '{}.{}'.format(module_name, name),
+                    'status': status,
+                    'message': message
+                })
+        status = _overall_status(tests)
+    except TestTimeoutException:
+        status = TIMEOUT
+        tests.append({'name': None, 'status': TIMEOUT,
+                      'message': 'Timed out after {}s'.format(timeout)})
+    except BaseException:
+        status = ERROR
+        tests.append({'name': None, 'status': ERROR,
+                      'message': traceback.format_exc()})
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        os.chdir(previous_cwd)
+        _unload_modules(loaded_modules, cwd)
+
+    return {
+        'status': status,
+        'tests': tests,
+        'duration': round(time.time() - start, 4)
+    }
+
+
+def _error_result(status, message, duration=0):
+    return {'status': status, 'duration': duration, 'tests': [{
+        'name': None, 'status': status, 'message': message}]}
+
+
+def make_sandbox(lesson_directory_path):
+    """Scratch copy of a lesson, without its solutions, for the code
+    under test to run in"""
+    filesystem = get_filesystem()
+    sandbox_path = tempfile.mkdtemp()
+    for directory, dir_names, file_names in filesystem.walk(
+            lesson_directory_path):
+        relative = os.path.relpath(directory, str(lesson_directory_path))
+        if relative == '.':
+            dir_names[:] = [name for name in dir_names
+                            if name != io.SOLUTIONS_DIR_NAME]
+        target = os.path.join(sandbox_path, relative)
+        if not os.path.isdir(target):
+            os.makedirs(target)
+        for name in file_names:
+            with open(os.path.join(target, name), 'wb') as fp:
+                fp.write(filesystem.read_bytes(Path(directory, name)))
+    return sandbox_path
+
+
+def run_tests_against_file(compiled_tests, code_path, cwd=None,
+                           timeout=DEFAULT_TIMEOUT):
+    try:
+        code = compile_file(code_path)
+    except SyntaxError:
+        return _error_result(ERROR, traceback.format_exc())
+    return run_tests(compiled_tests, code, cwd=cwd, timeout=timeout)
+
+
+def _run_job(job):
+    if job.get('error'):
+        return _error_result(ERROR, job['error'])
+    compiled_tests = [(name, marshal.loads(code))
+                      for name, code in job['tests']]
+    sandbox_path = make_sandbox(job['lesson_path'])
+    try:
+        return run_tests_against_file(
+            compiled_tests, job['code_path'], cwd=sandbox_path,
+            timeout=job['timeout'])
+    finally:
+        shutil.rmtree(sandbox_path, ignore_errors=True)
+
+
+def _job_process(connection, function, job, memory_limit):
+    init_worker(memory_limit)
+    try:
+        outcome = (True, function(job))
+    except BaseException:
+        outcome = (False, traceback.format_exc())
+    connection.send(outcome)
+    connection.close()
+
+
+def _kill(process):
+    if process.is_alive():
+        try:
+            os.kill(process.pid, getattr(signal, 'SIGKILL', signal.SIGTERM))
+        except OSError as e:
+            if e.errno != errno.ESRCH:
+                raise
+    process.join()
+
+
+def _finished_result(process, connection, started, timeout):
+    """The result of a running job, or None if it isn't finished yet"""
+    alive = process.is_alive()
+    if connection.poll():
+        try:
+            returned, value = connection.recv()
+        except EOFError:
+            # Exited (os._exit, crash) before sending anything
+            process.join()
+            return _error_result(ERROR, 'Worker exited with code {}'.format(
+                process.exitcode))
+        if returned:
+            return value
+        return _error_result(ERROR, value)
+    if not alive:
+        return _error_result(ERROR, 'Worker exited with code {}'.format(
+            process.exitcode))
+    if time.time() - started > timeout + KILL_GRACE:
+        return _error_result(TIMEOUT, 'Killed after {}s'.format(timeout),
+                             round(time.time() - started, 4))
+    return None
+
+
+def iter_isolated_results(function, jobs, processes=None,
+                          timeout=DEFAULT_TIMEOUT, memory_limit=None):
+    """Yield (index, result) of `function(job)` for every job, as they
+    finish. Every job runs in a new process, so nothing it does (global
+    state, exiting, crashing) reaches the others, and the parent kills
+    it KILL_GRACE seconds after `timeout` if it's still running."""
+    processes = processes or multiprocessing.cpu_count()
+    pending = list(enumerate(jobs))
+    pending.reverse()
+    running = []
+    try:
+        while pending or running:
+            while pending and len(running) < processes:
+                index, job = pending.pop()
+                connection, child_connection = multiprocessing.Pipe(False)
+                process = multiprocessing.Process(
+                    target=_job_process,
+                    args=(child_connection, function, job, memory_limit))
+                process.start()
+                child_connection.close()
+                running.append((index, process, connection, time.time()))
+
+            still_running = []
+            for worker in running:
+                index, process, connection, started = worker
+                result = _finished_result(
+                    process, connection, started, timeout)
+                if result is None:
+                    still_running.append(worker)
+                    continue
+                process.join(KILL_GRACE)
+                _kill(process)
+                connection.close()
+                yield index, result
+            if len(still_running) == len(running):
+                time.sleep(POLL_INTERVAL)
+            running = still_running
+    finally:
+        for _, process, connection, _ in running:
+            _kill(process)
+            connection.close()
+
+
+def _compile_lesson_tests(lesson_directory_path):
+    test_paths = sorted(get_filesystem().glob(
+        lesson_directory_path / io.TESTS_DIR_NAME, 'test*.py'))
+    return [(name, marshal.dumps(code))
+            for name, code in compile_tests(test_paths)]
+
+
+def _iter_solution_jobs(course, timeout):
+    for unit in course.iter_units():
+        for lesson in unit.iter_lessons():
+            if lesson.type != ASSIGNMENT:
+                continue
+            lesson_path = lesson.directory_path
+            solution_paths = sorted(get_filesystem().glob(
+                lesson_path / io.SOLUTIONS_DIR_NAME, '*.py'))
+            if not solution_paths:
+                continue
+            tests, error = None, None
+            try:
+                tests = _compile_lesson_tests(lesson_path)
+            except SyntaxError:
+                error = traceback.format_exc()
+            for solution_path in solution_paths:
+                yield {
+                    'name': '{}/{}/{}'.format(
+                        unit.name, lesson.name, solution_path.name),
+                    'uuid': lesson.uuid,
+                    'lesson_path': lesson_path,
+                    'tests': tests,
+                    'error': error,
+                    'code_path': solution_path,
+                    'timeout': timeout
+                }
+
+
+def check_course_solutions(course_directory_path, processes=None,
+                           timeout=DEFAULT_TIMEOUT, memory_limit=None):
+    """Run the tests of every assignment lesson in the course against
+    each of its solutions, every one in a process of its own."""
+    course = io.read_course_from_path(course_directory_path)
+    jobs = list(_iter_solution_jobs(course, timeout))
+
+    results = [None] * len(jobs)
+    for index, result in iter_isolated_results(
+            _run_job, jobs, processes, timeout, memory_limit):
+        job = jobs[index]
+        result.update({
+            'name': job['name'],
+            'uuid': job['uuid'],
+            'path': str(job['lesson_path'])
+        })
+        results[index] = result
+    return results
+
+
+def iter_graded_submissions(lesson_directory_path, submissions_path,
+                            processes=None, timeout=DEFAULT_TIMEOUT,
+                            memory_limit=None):
+    """Run an assignment lesson's tests against every `.py` file in
+    `submissions_path`, yielding results as soon as they're ready.
+    Submissions run in a scratch copy of the lesson (without its
+    solutions), each in a process of its own."""
+    if not isinstance(lesson_directory_path, Path):
+        lesson_directory_path = Path(lesson_directory_path)
+    if not isinstance(submissions_path, Path):
+        submissions_path = Path(submissions_path)
+
+    lesson = io.read_lesson_from_path(lesson_directory_path)
+    if lesson.type != ASSIGNMENT:
+        raise exceptions.InvalidLessonTypeException(
+            '{} is not an assignment lesson'.format(lesson.name))
+
+    tests = _compile_lesson_tests(lesson.directory_path)
+    submission_paths = sorted(
+        get_filesystem().glob(submissions_path, '*.py'))
+    jobs = [{
+        'lesson_path': lesson.directory_path,
+        'tests': tests,
+        'code_path': submission_path,
+        'timeout': timeout
+    } for submission_path in submission_paths]
+
+    for index, result in iter_isolated_results(
+            _run_job, jobs, processes, timeout, memory_limit):
+        result.update({
+            'name': submission_paths[index].name,
+            'path': str(submission_paths[index])
+        })
+        yield result
+
+
+def write_json_report(results, fp):
+    fp.write(json.dumps(results, indent=2, sort_keys=True))
+    fp.write('\n')
+
+
+def write_junit_report(results, fp):
+    testsuites = ElementTree.Element('testsuites')
+    for result in results:
+        testsuite = ElementTree.SubElement(testsuites, 'testsuite', {
+            'name': result['name'],
+            'tests': str(len(result['tests'])),
+            'time': str(result['duration'])
+        })
+        for test in result['tests']:
+            testcase = ElementTree.SubElement(testsuite, 'testcase', {
+                'classname': result['name'],
+                'name': test['name'] or result['name']
+            })
+            if test['status'] == FAILED:
+                ElementTree.SubElement(
+                    testcase, 'failure').text = test['message']
+            elif test['status'] in [ERROR, TIMEOUT]:
+                ElementTree.SubElement(
+                    testcase, 'error', {'type': test['status']}
+                ).text = test['message']
+    fp.write(ElementTree.tostring(testsuites).decode('utf-8'))
+    fp.write('\n')
+
+
+REPORT_WRITERS = {
+    'json': write_json_report,
+    'junit': write_junit_report
+}
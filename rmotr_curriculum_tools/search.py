@@ -0,0 +1,259 @@
+from __future__ import unicode_literals
+
+import os
+import re
+import json
+import bisect
+from collections import defaultdict
+from pathlib import Path
+
+from . import io
+from .filesystems import get_filesystem
+
+DEFAULT_INDEX_PATH = os.path.join(
+    os.path.expanduser('~'), '.rmotr_curriculum_tools', 'search_index.json')
+
+# Positions of different fields (name, README, files) are separated by
+# this gap so phrases never match across them.
+FIELD_POSITION_GAP = 10
+FUZZY_THRESHOLD = 0.3
+
+# Documents are keyed by lesson path: the same lesson (same uuid) can be
+# copied into several courses. Indexes of other versions are rebuilt.
+INDEX_VERSION = 2
+
+_token_re = re.compile(r'\w+', re.UNICODE)
+_query_re = re.compile(r'"([^"]+)"|(\S+)', re.UNICODE)
+
+
+def tokenize(text):
+    return _token_re.findall(text.lower())
+
+
+def trigrams(text):
+    text = '  {} '.format(text.lower())
+    return set(text[i:i + 3] for i in range(len(text) - 2))
+
+
+def get_lesson_signature(lesson_directory_path):
+    """Stats of the lesson files, and of its unit and course .rmotr (the
+    unit and course names are indexed with the lesson)"""
+    filesystem = get_filesystem()
+    course_directory_path = lesson_directory_path.parent.parent
+    file_paths = [
+        course_directory_path / io.DOT_RMOTR_FILE_NAME,
+        lesson_directory_path.parent / io.DOT_RMOTR_FILE_NAME,
+        lesson_directory_path / io.DOT_RMOTR_FILE_NAME,
+        lesson_directory_path / io.README_FILE_NAME
+    ]
+    file_paths.extend(io.iter_assignment_file_paths(lesson_directory_path))
+    return [[str(file_path.relative_to(course_directory_path))] +
+            filesystem.get_signature(file_path)
+            for file_path in file_paths if filesystem.is_file(file_path)]
+
+
+class SearchIndex(object):
+    def __init__(self, index_path=DEFAULT_INDEX_PATH):
+        self.index_path = Path(index_path)
+        self.documents = {}
+        self.postings = defaultdict(dict)
+        self._sorted_terms = None
+        self._name_trigrams = None
+
+    @classmethod
+    def load(cls, index_path=DEFAULT_INDEX_PATH):
+        index = cls(index_path)
+        if get_filesystem().exists(index.index_path):
+            content = json.loads(
+                get_filesystem().read_text(index.index_path))
+            if content.get('version') == INDEX_VERSION:
+                index.documents = content['documents']
+                index.postings.update(content['postings'])
+        return index
+
+    def save(self):
+        filesystem = get_filesystem()
+        if not filesystem.exists(self.index_path.parent):
+            filesystem.make_directory(self.index_path.parent, parents=True)
+        filesystem.write_file(self.index_path, json.dumps({
+            'version': INDEX_VERSION,
+            'documents': self.documents,
+            'postings': self.postings
+        }))
+
+    @property
+    def sorted_terms(self):
+        if self._sorted_terms is None:
+            self._sorted_terms = sorted(self.postings)
+        return self._sorted_terms
+
+    def _remove_document(self, doc_id):
+        document = self.documents.pop(doc_id)
+        for term in document['terms']:
+            postings = self.postings[term]
+            postings.pop(doc_id, None)
+            if not postings:
+                del self.postings[term]
+        self._sorted_terms = None
+        self._name_trigrams = None
+
+    def _add_lesson(self, lesson, signature):
+        fields = [lesson.name, lesson.unit.name, lesson.readme_content or '']
+        for file_path in io.iter_assignment_file_paths(
+                lesson.directory_path):
+            fields.append(get_filesystem().read_text(file_path))
+
+        positions = defaultdict(list)
+        position = 0
+        for field in fields:
+            for token in tokenize(field):
+                positions[token].append(position)
+                position += 1
+            position += FIELD_POSITION_GAP
+
+        doc_id = str(lesson.directory_path.absolute())
+        for term, term_positions in positions.items():
+            self.postings[term][doc_id] = term_positions
+
+        self.documents[doc_id] = {
+            'course': lesson.unit.course.name,
+            'course_path': str(lesson.unit.course.directory_path.absolute()),
+            'unit': lesson.unit.name,
+            'uuid': lesson.uuid,
+            'name': lesson.name,
+            'path': doc_id,
+            'signature': signature,
+            'terms': list(positions)
+        }
+        self._sorted_terms = None
+        self._name_trigrams = None
+
+    def update_course(self, course_directory_path):
+        """Re-index the lessons of a course that changed since the last
+        update. Returns the number of lessons (re)indexed."""
+        course = io.read_course_from_path(
+            course_directory_path, with_units=False)
+        course_path = str(course.directory_path.absolute())
+        unseen = set(doc_id for doc_id, document in self.documents.items()
+                     if document['course_path'] == course_path)
+
+        updated = 0
+        for unit_path in io.iter_numbered_paths(
+                course.directory_path, io.UNIT_GLOB):
+            unit = io.read_unit(course, unit_path, with_lessons=False)
+            for lesson_path in io.iter_numbered_paths(
+                    unit_path, io.LESSON_GLOB):
+                doc_id = str(lesson_path.absolute())
+                signature = get_lesson_signature(lesson_path)
+                if doc_id in unseen:
+                    unseen.remove(doc_id)
+                    if self.documents[doc_id]['signature'] == signature:
+                        continue
+                    self._remove_document(doc_id)
+
+                lesson = io.read_lesson(unit, lesson_path)
+                self._add_lesson(lesson, signature)
+                updated += 1
+
+        # Whatever wasn't seen during the scan was removed from disk
+        for doc_id in unseen:
+            self._remove_document(doc_id)
+            updated += 1
+
+        return updated
+
+    def _expand_prefix(self, prefix):
+        terms = self.sorted_terms
+        start = bisect.bisect_left(terms, prefix)
+        for term in terms[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def _match_prefix(self, prefix):
+        scores = defaultdict(int)
+        for term in self._expand_prefix(prefix):
+            for doc_id, positions in self.postings[term].items():
+                scores[doc_id] += len(positions)
+        return scores
+
+    def _match_phrase(self, terms):
+        if not terms:
+            return {}
+        candidates = [self.postings.get(term, {}) for term in terms]
+        doc_ids = set(candidates[0])
+        for postings in candidates[1:]:
+            doc_ids &= set(postings)
+
+        scores = {}
+        for doc_id in doc_ids:
+            following = [set(postings[doc_id]) for postings in candidates]
+            matches = sum(
+                1 for start in candidates[0][doc_id]
+                if all(start + offset in following[offset]
+                       for offset in range(1, len(terms)))
+            )
+            if matches:
+                scores[doc_id] = matches
+        return scores
+
+    def search(self, query):
+        """Lessons matching every clause of the query, best first.
+
+        Clauses are words (`closure`), prefixes (`decor*`) or
+        quoted phrases (`"list comprehension"`)."""
+        result = None
+        for phrase, word in _query_re.findall(query):
+            if phrase:
+                scores = self._match_phrase(tokenize(phrase))
+            elif word.endswith('*'):
+                scores = self._match_prefix(word[:-1].lower())
+            else:
+                scores = self._match_phrase(tokenize(word))
+
+            if result is None:
+                result = dict(scores)
+            else:
+                result = dict((doc_id, result[doc_id] + score)
+                              for doc_id, score in scores.items()
+                              if doc_id in result)
+            if not result:
+                return []
+
+        return self._ranked_documents(result or {})
+
+    @property
+    def name_trigrams(self):
+        if self._name_trigrams is None:
+            self._name_trigrams = defaultdict(set)
+            for doc_id, document in self.documents.items():
+                for name in [document['name'], document['unit']]:
+                    for trigram in trigrams(name):
+                        self._name_trigrams[trigram].add(doc_id)
+        return self._name_trigrams
+
+    def fuzzy_search(self, query, threshold=FUZZY_THRESHOLD):
+        """Lessons whose lesson or unit name is similar to the query,
+        measured as the Jaccard similarity of their trigrams."""
+        query_trigrams = trigrams(query)
+        candidates = set()
+        for trigram in query_trigrams:
+            candidates |= self.name_trigrams.get(trigram, set())
+
+        scores = {}
+        for doc_id in candidates:
+            document = self.documents[doc_id]
+            similarity = max(
+                len(query_trigrams & name_trigrams) /
+                float(len(query_trigrams | name_trigrams))
+                for name_trigrams in [trigrams(document['name']),
+                                      trigrams(document['unit'])]
+            )
+            if similarity >= threshold:
+                scores[doc_id] = similarity
+        return self._ranked_documents(scores)
+
+    def _ranked_documents(self, scores):
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return [dict(self.documents[doc_id], score=score)
+                for doc_id, score in ranked]
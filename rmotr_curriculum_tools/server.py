@@ -0,0 +1,427 @@
+from __future__ import unicode_literals
+
+import json
+import asyncio
+import hashlib
+from pathlib import Path
+from urllib.parse import urlsplit, parse_qs
+
+from . import io
+from .filesystems import get_filesystem
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 8765
+DEFAULT_POLL_INTERVAL = 2.0
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 500
+
+COURSE = 'course'
+UNIT = 'unit'
+LESSON = 'lesson'
+CHILDREN_KEYS = {COURSE: 'units', UNIT: 'lessons'}
+
+STATUS_REASONS = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed'
+}
+
+
+def _hash(*parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = '{}'.format(part).encode('utf-8')
+        digest.update(part)
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def _file_signature(file_path):
+    try:
+        return tuple(get_filesystem().get_signature(file_path))
+    except OSError:
+        return None
+
+
+class Resource(object):
+    """JSON document with a strong ETag. It's only serialized the first
+    time its body is needed, never for a 304."""
+    def __init__(self, etag, data):
+        self.etag = etag
+        self.data = data
+        self._body = None
+
+    @property
+    def body(self):
+        if self._body is None:
+            self._body = json.dumps(self.data, sort_keys=True).encode('utf-8')
+        return self._body
+
+
+class Entry(object):
+    """A course, unit or lesson as of its last read. `signature` tells
+    when its files changed, `summary_hash` when its summary did."""
+    def __init__(self, kind, uuid, signature, summary, model=None):
+        self.kind = kind
+        self.uuid = uuid
+        self.signature = signature
+        self.summary = summary
+        self.summary_hash = _hash(json.dumps(summary, sort_keys=True))
+        self.model = model
+        self.children = []
+        self.resource = None
+
+    def with_children(self, children):
+        """The entry with these children, this same one if nothing
+        they show changed"""
+        etag = _hash(self.summary_hash,
+                     *[child.summary_hash for child in children])
+        if self.resource is not None and self.resource.etag == etag:
+            return self
+        entry = Entry(self.kind, self.uuid, self.signature, self.summary,
+                      self.model)
+        entry.children = children
+        entry.resource = Resource(etag, dict(self.summary, **{
+            CHILDREN_KEYS[self.kind]: [child.summary for child in children]
+        }))
+        return entry
+
+
+def _course_uuid(entry):
+    return entry.summary.get('course_uuid', entry.uuid)
+
+
+class Snapshot(object):
+    """Every entry of a refresh, by path and by (kind, course uuid,
+    uuid): the same unit or lesson can be copied into several courses.
+    Pages are cached until the next snapshot."""
+    def __init__(self, entries, courses):
+        self.entries = entries
+        self.courses = courses
+        self.objects = {}
+        self._by_uuid = {}
+        for entry in entries.values():
+            key = (entry.kind, _course_uuid(entry), entry.uuid)
+            if key not in self.objects:
+                self.objects[key] = entry
+                self._by_uuid.setdefault(
+                    (entry.kind, entry.uuid), []).append(entry)
+        self._pages = {}
+
+    def find(self, kind, uuid, course_uuid=None):
+        """Entries of a course, unit or lesson uuid, only the one in the
+        given course if `course_uuid`"""
+        if course_uuid is not None:
+            entry = self.objects.get((kind, course_uuid, uuid))
+            return (entry is not None and [entry]) or []
+        return self._by_uuid.get((kind, uuid), [])
+
+    def get_page(self, key, entries, page, per_page):
+        cache_key = (key, page, per_page)
+        resource = self._pages.get(cache_key)
+        if resource is not None:
+            return resource
+
+        items = entries[(page - 1) * per_page:page * per_page]
+        etag = _hash(key, page, per_page, len(entries),
+                     *[entry.summary_hash for entry in items])
+        resource = Resource(etag, {
+            'items': [entry.summary for entry in items],
+            'page': page,
+            'per_page': per_page,
+            'total': len(entries)
+        })
+        if items:
+            self._pages[cache_key] = resource
+        return resource
+
+
+class CourseStore(object):
+    """Courses on disk, kept in memory. refresh() only re-reads the
+    units and lessons whose files changed."""
+    def __init__(self, course_directory_paths):
+        # Archives usually wrap the course in a top directory
+        self.course_directory_paths = [
+            io.find_course_directory_path(Path(path).absolute())
+            for path in course_directory_paths]
+        self.snapshot = Snapshot({}, [])
+        self.refresh()
+
+    def _course_entry(self, course_path, previous):
+        signature = _file_signature(course_path / io.DOT_RMOTR_FILE_NAME)
+        entry = previous.get(str(course_path))
+        if entry is not None and entry.signature == signature:
+            return entry, 0
+        course = io.read_course_from_path(course_path, with_units=False)
+        return Entry(COURSE, course.uuid, signature, {
+            'uuid': course.uuid,
+            'name': course.name,
+            'track': course.track,
+            'path': str(course_path)
+        }, course), 1
+
+    def _unit_entry(self, course_entry, unit_path, previous):
+        signature = (course_entry.signature, _file_signature(
+            unit_path / io.DOT_RMOTR_FILE_NAME))
+        entry = previous.get(str(unit_path))
+        if entry is not None and entry.signature == signature:
+            return entry, 0
+        unit = io.read_unit(course_entry.model, unit_path, with_lessons=False)
+        return Entry(UNIT, unit.uuid, signature, {
+            'uuid': unit.uuid,
+            'name': unit.name,
+            'order': unit.order,
+            'slug': io.get_directory_slug(unit_path),
+            'path': str(unit_path),
+            'course_uuid': course_entry.uuid
+        }, unit), 1
+
+    def _lesson_entry(self, unit_entry, lesson_path, previous):
+        readme_path = lesson_path / io.README_FILE_NAME
+        signature = (unit_entry.signature, _file_signature(
+            lesson_path / io.DOT_RMOTR_FILE_NAME),
+            _file_signature(readme_path))
+        entry = previous.get(str(lesson_path))
+        if entry is not None and entry.signature == signature:
+            return entry, 0
+
+        lesson = io.read_lesson(
+            unit_entry.model, lesson_path, with_readme=False)
+        entry = Entry(LESSON, lesson.uuid, signature, {
+            'uuid': lesson.uuid,
+            'name': lesson.name,
+            'order': lesson.order,
+            'type': lesson.type,
+            'slug': io.get_directory_slug(lesson_path),
+            'path': str(lesson_path),
+            'unit_uuid': unit_entry.uuid,
+            'course_uuid': unit_entry.summary['course_uuid']
+        })
+        readme = b''
+        if signature[-1] is not None:
+            readme = get_filesystem().read_bytes(readme_path)
+        entry.resource = Resource(
+            _hash(entry.summary_hash, readme),
+            dict(entry.summary, readme=readme.decode('utf-8')))
+        return entry, 1
+
+    def refresh(self):
+        """Bring the snapshot up to date, returning how many courses,
+        units and lessons had to be read again"""
+        previous = self.snapshot.entries
+        entries = {}
+        courses = []
+        read = 0
+        for course_path in self.course_directory_paths:
+            course_entry, count = self._course_entry(course_path, previous)
+            read += count
+            units = []
+            for unit_path in io.iter_numbered_paths(
+                    course_path, io.UNIT_GLOB):
+                unit_entry, count = self._unit_entry(
+                    course_entry, unit_path, previous)
+                read += count
+                lessons = []
+                for lesson_path in io.iter_numbered_paths(
+                        unit_path, io.LESSON_GLOB):
+                    lesson_entry, count = self._lesson_entry(
+                        unit_entry, lesson_path, previous)
+                    read += count
+                    entries[str(lesson_path)] = lesson_entry
+                    lessons.append(lesson_entry)
+                unit_entry = unit_entry.with_children(lessons)
+                entries[str(unit_path)] = unit_entry
+                units.append(unit_entry)
+            course_entry = course_entry.with_children(units)
+            entries[str(course_path)] = course_entry
+            courses.append(course_entry)
+
+        # Cached pages survive refreshes that find nothing new
+        if len(entries) != len(previous) or any(
+                previous.get(path) is not entry
+                for path, entry in entries.items()):
+            self.snapshot = Snapshot(entries, courses)
+        return read
+
+
+def _parse_page(query):
+    try:
+        page = int(query.get('page', ['1'])[0])
+        per_page = int(query.get('per_page', [DEFAULT_PER_PAGE])[0])
+    except ValueError:
+        return None
+    if page < 1 or not 1 <= per_page <= MAX_PER_PAGE:
+        return None
+    return page, per_page
+
+
+def _error(message):
+    return Resource(None, {'error': message})
+
+
+def _find_entry(snapshot, kind, uuid, query):
+    """(status, entry or error) of a course, unit or lesson. Units and
+    lessons copied into several courses need ?course=UUID"""
+    entries = snapshot.find(kind, uuid, query.get('course', [None])[0])
+    if not entries:
+        return 404, _error('Not found')
+    if len(entries) > 1:
+        return 400, _error(
+            '{} is in several courses, pick one with ?course=UUID'.format(
+                uuid))
+    return 200, entries[0]
+
+
+def route(snapshot, target):
+    """(status, resource) for a GET of `target`"""
+    url = urlsplit(target)
+    parts = [part for part in url.path.split('/') if part]
+    query = parse_qs(url.query)
+
+    if parts == ['courses']:
+        collection = ('courses', snapshot.courses)
+    elif len(parts) == 2 and parts[0] in ['courses', 'units', 'lessons']:
+        status, entry = _find_entry(snapshot, parts[0][:-1], parts[1], query)
+        if status != 200:
+            return status, entry
+        return 200, entry.resource
+    elif len(parts) == 3 and parts[0::2] in [['courses', 'units'],
+                                            ['units', 'lessons']]:
+        status, entry = _find_entry(snapshot, parts[0][:-1], parts[1], query)
+        if status != 200:
+            return status, entry
+        collection = ('{}?course={}'.format(
+            '/'.join(parts), _course_uuid(entry)), entry.children)
+    else:
+        return 404, _error('Not found')
+
+    page = _parse_page(query)
+    if page is None:
+        return 400, _error(
+            'page must be positive and per_page from 1 to {}'.format(
+                MAX_PER_PAGE))
+    return 200, snapshot.get_page(collection[0], collection[1], *page)
+
+
+def _etag_matches(header, etag):
+    if header is None or etag is None:
+        return False
+    # If-None-Match uses the weak comparison, W/ prefixes don't matter
+    tags = [(tag.startswith('W/') and tag[2:]) or tag
+            for tag in (tag.strip() for tag in header.split(','))]
+    return '*' in tags or '"{}"'.format(etag) in tags
+
+
+class CourseServer(object):
+    """HTTP/1.1 server of a CourseStore, polling the courses for
+    changes every `poll_interval` seconds"""
+    def __init__(self, store, poll_interval=DEFAULT_POLL_INTERVAL):
+        self.store = store
+        self.poll_interval = poll_interval
+        self._server = None
+        self._poller = None
+
+    @property
+    def port(self):
+        return self._server.sockets[0].getsockname()[1]
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        self._server = await asyncio.start_server(self.handle, host, port)
+        if self.poll_interval:
+            self._poller = asyncio.ensure_future(self._poll())
+        return self._server
+
+    async def close(self):
+        if self._poller is not None:
+            self._poller.cancel()
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def serve_forever(self, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        await self.start(host, port)
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+    async def _poll(self):
+        loop = asyncio.get_event_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await loop.run_in_executor(None, self.store.refresh)
+            except Exception:
+                # Usually a course being changed while read, the
+                # current snapshot is served until the next poll
+                pass
+
+    def respond(self, method, target, headers):
+        """(status, headers, body) of a request"""
+        if method not in ['GET', 'HEAD']:
+            status, resource = 405, _error('Only GET and HEAD')
+        else:
+            status, resource = route(self.store.snapshot, target)
+
+        response_headers = [('Content-Type', 'application/json')]
+        if resource.etag is not None:
+            response_headers.append(('ETag', '"{}"'.format(resource.etag)))
+            response_headers.append(('Cache-Control', 'no-cache'))
+            if _etag_matches(headers.get('if-none-match'), resource.etag):
+                return 304, response_headers, b''
+
+        body = resource.body
+        response_headers.append(('Content-Length', str(len(body))))
+        return status, response_headers, (method != 'HEAD' and body) or b''
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in [b'\r\n', b'\n', b'']:
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    break
+                method, target, version = parts
+                length = int(headers.get('content-length') or 0)
+                if length:
+                    await reader.readexactly(length)
+
+                status, response_headers, body = self.respond(
+                    method, target, headers)
+                connection = headers.get('connection', '').lower()
+                keep_alive = ((version == 'HTTP/1.1' and
+                               connection != 'close') or
+                              connection == 'keep-alive')
+                if not keep_alive:
+                    response_headers.append(('Connection', 'close'))
+
+                writer.write('HTTP/1.1 {} {}\r\n{}\r\n'.format(
+                    status, STATUS_REASONS[status], ''.join(
+                        '{}: {}\r\n'.format(name, value)
+                        for name, value in response_headers)
+                ).encode('latin-1') + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+
+def serve(course_directory_paths, host=DEFAULT_HOST, port=DEFAULT_PORT,
+          poll_interval=DEFAULT_POLL_INTERVAL):
+    server = CourseServer(CourseStore(course_directory_paths), poll_interval)
+    asyncio.run(server.serve_forever(host, port))
@@ -0,0 +1,352 @@
+from __future__ import unicode_literals
+
+import os
+import struct
+from pathlib import Path
+from multiprocessing import shared_memory, resource_tracker
+
+from . import io
+from .filesystems import get_filesystem
+
+MAGIC = b'RMCT'
+VERSION = 1
+
+# Fixed size records, strings are (offset, length) in the segment.
+# Units are stored by course and lessons by unit, in order, so every
+# parent knows its children by the first index and a count.
+HEADER = struct.Struct('<4sHHIII')
+COURSE = struct.Struct('<QQQQQQQQII')
+UNIT = struct.Struct('<IQQQQQQiII')
+LESSON = struct.Struct('<IQQQQQQQQQQi')
+
+# (pid, name) -> SharedCatalog attached by this process
+_attached = {}
+# Segments created by this process, or its parent before a fork
+_created_names = set()
+
+
+class _Heap(object):
+    """Strings of the segment, each distinct one stored once. README
+    space is only reserved, they're copied in once the segment exists."""
+    def __init__(self):
+        self.parts = []
+        self.offsets = {}
+        self.size = 0
+        self.readmes = []
+
+    def add(self, text):
+        data = text.encode('utf-8')
+        if data not in self.offsets:
+            self.offsets[data] = self.size
+            self.parts.append((self.size, data))
+            self.size += len(data)
+        return self.offsets[data], len(data)
+
+    def reserve(self, file_path):
+        size = 0
+        if get_filesystem().is_file(file_path):
+            size = get_filesystem().get_size(file_path)
+        offset = self.size
+        self.readmes.append((file_path, offset, size))
+        self.size += size
+        return offset, size
+
+
+def _collect(course_directory_paths, heap):
+    courses, units, lessons = [], [], []
+    for course_directory_path in course_directory_paths:
+        course = io.read_course_from_path(
+            course_directory_path, with_units=False)
+        first_unit = len(units)
+        for unit in io.iter_units(course.directory_path):
+            first_lesson = len(lessons)
+            for lesson_path in io.iter_numbered_paths(
+                    unit.directory_path, io.LESSON_GLOB):
+                lesson = io.read_lesson(unit, lesson_path, with_readme=False)
+                lessons.append((len(units),) +
+                               heap.add(lesson.uuid) + heap.add(lesson.name) +
+                               heap.add(lesson.type) +
+                               heap.add(str(lesson_path)) +
+                               heap.reserve(lesson.readme_path) +
+                               (lesson.order,))
+            units.append((len(courses),) +
+                         heap.add(unit.uuid) + heap.add(unit.name) +
+                         heap.add(str(unit.directory_path)) +
+                         (unit.order, first_lesson,
+                          len(lessons) - first_lesson))
+        courses.append(heap.add(course.uuid) + heap.add(course.name) +
+                       heap.add(course.track) +
+                       heap.add(str(course.directory_path)) +
+                       (first_unit, len(units) - first_unit))
+    return courses, units, lessons
+
+
+def _attach_segment(name):
+    if name in _created_names:
+        # Same resource tracker as the creator, registering is a no-op
+        return shared_memory.SharedMemory(name=name)
+    try:
+        return shared_memory.SharedMemory(name=name, track=False)
+    except TypeError:
+        # Before Python 3.13 attaching also registers the segment, to be
+        # unlinked when this process' resource tracker exits
+        segment = shared_memory.SharedMemory(name=name)
+        resource_tracker.unregister(segment._name, 'shared_memory')
+        return segment
+
+
+class SharedCatalog(object):
+    """Courses laid out flat in a shared memory segment. It's built once
+    and attached read only by any number of processes, which share the
+    same pages instead of each reading its own models.
+
+    Pickles as its name, so it can be passed to pool workers."""
+    def __init__(self, segment, owner=False):
+        self.segment = segment
+        self.owner = owner
+        self.buffer = segment.buf.toreadonly()
+        magic, version, _, courses, units, lessons = HEADER.unpack_from(
+            self.buffer)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError('{} is not a course catalog'.format(
+                segment.name))
+        self.course_count = courses
+        self.unit_count = units
+        self.lesson_count = lessons
+        self._units_offset = HEADER.size + COURSE.size * courses
+        self._lessons_offset = self._units_offset + UNIT.size * units
+
+    @property
+    def name(self):
+        return self.segment.name
+
+    @classmethod
+    def build(cls, course_directory_paths, name=None):
+        """Read the courses into a new segment, owned (and unlinked on
+        close) by this catalog"""
+        heap = _Heap()
+        courses, units, lessons = _collect(course_directory_paths, heap)
+        heap_offset = (HEADER.size + COURSE.size * len(courses) +
+                       UNIT.size * len(units) + LESSON.size * len(lessons))
+
+        def absolute(record, positions):
+            record = list(record)
+            for position in positions:
+                record[position] += heap_offset
+            return record
+
+        segment = shared_memory.SharedMemory(
+            name=name, create=True, size=max(heap_offset + heap.size, 1))
+        _created_names.add(segment.name)
+        try:
+            buf = segment.buf
+            HEADER.pack_into(buf, 0, MAGIC, VERSION, 0, len(courses),
+                             len(units), len(lessons))
+            offset = HEADER.size
+            for table, record_struct, positions in [
+                    (courses, COURSE, [0, 2, 4, 6]),
+                    (units, UNIT, [1, 3, 5]),
+                    (lessons, LESSON, [1, 3, 5, 7, 9])]:
+                for record in table:
+                    record_struct.pack_into(
+                        buf, offset, *absolute(record, positions))
+                    offset += record_struct.size
+
+            for part_offset, data in heap.parts:
+                start = heap_offset + part_offset
+                buf[start:start + len(data)] = data
+            # One README in memory at a time
+            filesystem = get_filesystem()
+            for readme_path, readme_offset, size in heap.readmes:
+                if not size:
+                    continue
+                data = filesystem.read_bytes(readme_path)
+                if len(data) != size:
+                    raise RuntimeError(
+                        '{} changed while building the catalog'.format(
+                            readme_path))
+                start = heap_offset + readme_offset
+                buf[start:start + size] = data
+            del buf
+        except BaseException:
+            segment.close()
+            segment.unlink()
+            _created_names.discard(segment.name)
+            raise
+
+        catalog = cls(segment, owner=True)
+        _attached[(os.getpid(), catalog.name)] = catalog
+        return catalog
+
+    @classmethod
+    def attach(cls, name):
+        """The catalog in segment `name`, attached once per process"""
+        key = (os.getpid(), name)
+        if key not in _attached:
+            _attached[key] = cls(_attach_segment(name))
+        return _attached[key]
+
+    def __reduce__(self):
+        return (SharedCatalog.attach, (self.name,))
+
+    def close(self):
+        """Detach from the segment (and remove it, if this catalog built
+        it). README views must have been released."""
+        _attached.pop((os.getpid(), self.name), None)
+        self.buffer.release()
+        self.segment.close()
+        if self.owner:
+            self.segment.unlink()
+            _created_names.discard(self.segment.name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def read_string(self, offset, length):
+        return bytes(self.buffer[offset:offset + length]).decode('utf-8')
+
+    def get_course(self, index):
+        return SharedCourse(self, index)
+
+    def get_unit(self, index):
+        return SharedUnit(self, index)
+
+    def get_lesson(self, index):
+        return SharedLesson(self, index)
+
+    def iter_courses(self):
+        for index in range(self.course_count):
+            yield SharedCourse(self, index)
+
+    def iter_lessons(self):
+        """Every lesson of every course, in order. Workers can split them
+        by index with get_lesson()."""
+        for index in range(self.lesson_count):
+            yield SharedLesson(self, index)
+
+
+class _SharedObject(object):
+    __slots__ = ['catalog', 'index']
+
+    def __init__(self, catalog, index):
+        self.catalog = catalog
+        self.index = index
+
+    def _record(self):
+        raise NotImplementedError()
+
+    def _string(self, position):
+        record = self._record()
+        return self.catalog.read_string(record[position],
+                                        record[position + 1])
+
+    def __eq__(self, other):
+        return (type(self) is type(other) and
+                (self.catalog, self.index) == (other.catalog, other.index))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash((type(self), self.index))
+
+    def __str__(self):
+        return "({}) - {} - {}".format(
+            self.__class__.__name__, self.name, self.uuid)
+
+    __repr__ = __str__
+
+
+class SharedCourse(_SharedObject):
+    """Read only view of a course in a SharedCatalog, with the same
+    attributes as models.Course"""
+    __slots__ = []
+
+    def _record(self):
+        return COURSE.unpack_from(
+            self.catalog.buffer, HEADER.size + COURSE.size * self.index)
+
+    uuid = property(lambda self: self._string(0))
+    name = property(lambda self: self._string(2))
+    track = property(lambda self: self._string(4))
+    directory_path = property(lambda self: Path(self._string(6)))
+
+    def unit_count(self):
+        return self._record()[9]
+
+    def iter_units(self):
+        record = self._record()
+        for index in range(record[8], record[8] + record[9]):
+            yield SharedUnit(self.catalog, index)
+
+    iter_children = iter_units
+
+
+class SharedUnit(_SharedObject):
+    """Read only view of a unit in a SharedCatalog"""
+    __slots__ = []
+
+    def _record(self):
+        return UNIT.unpack_from(
+            self.catalog.buffer,
+            self.catalog._units_offset + UNIT.size * self.index)
+
+    uuid = property(lambda self: self._string(1))
+    name = property(lambda self: self._string(3))
+    directory_path = property(lambda self: Path(self._string(5)))
+    order = property(lambda self: self._record()[7])
+
+    @property
+    def course(self):
+        return SharedCourse(self.catalog, self._record()[0])
+
+    parent = course
+
+    def lesson_count(self):
+        return self._record()[9]
+
+    def iter_lessons(self):
+        record = self._record()
+        for index in range(record[8], record[8] + record[9]):
+            yield SharedLesson(self.catalog, index)
+
+    iter_children = iter_lessons
+
+
+class SharedLesson(_SharedObject):
+    """Read only view of a lesson in a SharedCatalog. readme_bytes is a
+    view of the segment itself, nothing is copied."""
+    __slots__ = []
+
+    def _record(self):
+        return LESSON.unpack_from(
+            self.catalog.buffer,
+            self.catalog._lessons_offset + LESSON.size * self.index)
+
+    uuid = property(lambda self: self._string(1))
+    name = property(lambda self: self._string(3))
+    type = property(lambda self: self._string(5))
+    directory_path = property(lambda self: Path(self._string(7)))
+    order = property(lambda self: self._record()[11])
+
+    @property
+    def unit(self):
+        return SharedUnit(self.catalog, self._record()[0])
+
+    parent = unit
+
+    @property
+    def readme_path(self):
+        return self.directory_path / io.README_FILE_NAME
+
+    @property
+    def readme_bytes(self):
+        record = self._record()
+        return self.catalog.buffer[record[9]:record[9] + record[10]]
+
+    @property
+    def readme_content(self):
+        return bytes(self.readme_bytes).decode('utf-8')
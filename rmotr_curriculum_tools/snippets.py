@@ -0,0 +1,207 @@
+from __future__ import unicode_literals
+
+import os
+import json
+import signal
+import shutil
+import doctest
+import hashlib
+import tempfile
+import traceback
+from pathlib import Path
+
+from . import io
+from . import utils
+from . import runner
+from .filesystems import get_filesystem
+
+DEFAULT_CACHE_PATH = os.path.join(
+    os.path.expanduser('~'), '.rmotr_curriculum_tools', 'snippets_cache.json')
+
+PYTHON_LANGUAGES = ['python', 'python2', 'python3', 'py', 'pycon']
+
+OK = 'ok'
+SYNTAX_ERROR = 'syntax_error'
+FAILED = 'failed'
+TIMEOUT = 'timeout'
+
+CHECK = 'check'
+RUN = 'run'
+
+
+class Snippet(object):
+    def __init__(self, lesson, line, language, source):
+        self.lesson = lesson
+        self.line = line
+        self.language = language
+        self.source = source
+
+    @property
+    def is_doctest(self):
+        return (self.language == 'pycon' or
+                self.source.lstrip().startswith('>>>'))
+
+    def get_hash(self, mode):
+        return hashlib.sha1('{}\0{}'.format(
+            mode, self.source).encode('utf-8')).hexdigest()
+
+
+def extract_snippets(lesson):
+    content = lesson.readme_content or ''
+    for match in utils.iter_fenced_code_blocks(content):
+        language = match.group('language').lower()
+        if language not in PYTHON_LANGUAGES:
+            continue
+        yield Snippet(
+            lesson=lesson,
+            line=utils.get_line_number(content, match.start()),
+            language=language,
+            source=match.group('source')
+        )
+
+
+def check_syntax(source, is_doctest, filename='<snippet>'):
+    try:
+        if is_doctest:
+            for example in doctest.DocTestParser().get_examples(source):
+                compile(example.source, filename, 'single')
+        else:
+            compile(source, filename, 'exec')
+    except SyntaxError as e:
+        return SYNTAX_ERROR, '{}: {}'.format(e.lineno, e.msg)
+    return OK, None
+
+
+def run_doctest(source, filename='<snippet>', timeout=runner.DEFAULT_TIMEOUT):
+    test = doctest.DocTestParser().get_doctest(
+        source, {'__name__': '__snippet__'}, filename, filename, 0)
+    doctest_runner = doctest.DocTestRunner(optionflags=doctest.ELLIPSIS)
+    output = []
+
+    # Snippets run in a scratch directory, so files they write don't
+    # end up in the course.
+    previous_cwd = os.getcwd()
+    sandbox_path = tempfile.mkdtemp()
+    signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        os.chdir(sandbox_path)
+        result = doctest_runner.run(test, out=output.append)
+    except runner.TestTimeoutException:
+        return TIMEOUT, 'Timed out after {}s'.format(timeout)
+    except Exception:
+        return FAILED, traceback.format_exc()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        os.chdir(previous_cwd)
+        shutil.rmtree(sandbox_path, ignore_errors=True)
+
+    if result.failed:
+        output = ''.join(output)
+        # doctest reports exceptions raised by examples as failures
+        if runner.TestTimeoutException.__name__ in output:
+            return TIMEOUT, 'Timed out after {}s'.format(timeout)
+        return FAILED, output
+    return OK, None
+
+
+def _check_snippet_job(job):
+    source, is_doctest, mode, filename, timeout = job
+    return check_syntax(source, is_doctest, filename)
+
+
+def _run_doctest_job(job):
+    source, is_doctest, mode, filename, timeout = job
+    return run_doctest(source, filename, timeout)
+
+
+def _iter_doctest_results(jobs, processes, timeout, memory_limit):
+    """Yield (index, (status, message)) of running the doctest jobs,
+    each in a process of its own, killed by the parent past the timeout
+    (doctest catches everything an example raises, timeouts included)"""
+    for index, result in runner.iter_isolated_results(
+            _run_doctest_job, jobs, processes, timeout, memory_limit):
+        if isinstance(result, dict):
+            # Killed, or exited without a result
+            status = FAILED
+            if result['status'] == runner.TIMEOUT:
+                status = TIMEOUT
+            result = (status, result['tests'][0]['message'])
+        yield index, tuple(result)
+
+
+def _load_cache(cache_path):
+    if cache_path is None or not get_filesystem().exists(cache_path):
+        return {}
+    return json.loads(get_filesystem().read_text(cache_path))
+
+
+def _save_cache(cache_path, cache):
+    if cache_path is None:
+        return
+    filesystem = get_filesystem()
+    if not filesystem.exists(cache_path.parent):
+        filesystem.make_directory(cache_path.parent, parents=True)
+    filesystem.write_file(cache_path, json.dumps(cache))
+
+
+def check_course_snippets(course_directory_path, run_doctests=False,
+                          cache_path=DEFAULT_CACHE_PATH, processes=None,
+                          timeout=runner.DEFAULT_TIMEOUT, memory_limit=None):
+    """Syntax check every Python code block of the course READMEs, and
+    optionally run the doctest style ones. Results are cached by snippet
+    content, so only new or edited snippets are checked again."""
+    if cache_path is not None and not isinstance(cache_path, Path):
+        cache_path = Path(cache_path)
+    mode = (run_doctests and RUN) or CHECK
+
+    course = io.read_course_from_path(course_directory_path)
+    snippets = [snippet
+                for unit in course.iter_units()
+                for lesson in unit.iter_lessons()
+                for snippet in extract_snippets(lesson)]
+
+    cache = _load_cache(cache_path)
+    checked = dict(cache)
+    pending = {}
+    for snippet in snippets:
+        snippet_hash = snippet.get_hash(mode)
+        if snippet_hash not in checked and snippet_hash not in pending:
+            pending[snippet_hash] = (
+                snippet.source, snippet.is_doctest, mode,
+                '{}:{}'.format(snippet.lesson.readme_path, snippet.line),
+                timeout)
+
+    if pending:
+        # Syntax checks only compile the snippets, they share a pool
+        pool = runner.create_pool(processes, memory_limit)
+        try:
+            hashes = list(pending)
+            checked.update(zip(hashes, pool.map(
+                _check_snippet_job, [pending[h] for h in hashes])))
+        finally:
+            pool.terminate()
+            pool.join()
+
+        runnable = [h for h in hashes if checked[h][0] == OK and
+                    pending[h][1] and mode == RUN]
+        for index, result in _iter_doctest_results(
+                [pending[h] for h in runnable], processes, timeout,
+                memory_limit):
+            checked[runnable[index]] = result
+        # Timeouts depend on the machine load, they are checked again
+        cache.update((h, checked[h]) for h in hashes
+                     if checked[h][0] != TIMEOUT)
+        _save_cache(cache_path, cache)
+
+    results = []
+    for snippet in snippets:
+        status, message = checked[snippet.get_hash(mode)]
+        results.append({
+            'lesson': snippet.lesson.name,
+            'uuid': snippet.lesson.uuid,
+            'path': str(snippet.lesson.readme_path),
+            'line': snippet.line,
+            'status': status,
+            'message': message
+        })
+    return results
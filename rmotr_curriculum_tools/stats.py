@@ -0,0 +1,180 @@
+from __future__ import unicode_literals
+
+import csv
+import json
+import multiprocessing
+from pathlib import Path
+from bs4 import BeautifulSoup
+
+from . import io
+from . import utils
+from .models import ASSIGNMENT
+from .filesystems import get_filesystem
+
+LESSON = 'lesson'
+UNIT = 'unit'
+COURSE = 'course'
+
+HEADING_TAGS = ['h1', 'h2', 'h3', 'h4', 'h5', 'h6']
+METRICS = ['words', 'code_blocks', 'code_lines', 'headings',
+           'tests_size', 'solutions_size']
+COUNTERS = ['lessons', 'readings', 'assignments']
+FIELDS = (['level', 'course', 'unit', 'lesson', 'type'] + COUNTERS +
+          ['assignment_ratio'] + METRICS + ['path'])
+
+TABLE_COLUMNS = [
+    ('level', 6), ('lesson', 30), ('lessons', 7), ('assignment_ratio', 5),
+    ('words', 7), ('code_blocks', 6), ('code_lines', 6), ('headings', 5),
+    ('tests_size', 9), ('solutions_size', 9)
+]
+
+
+def _directory_size(directory_path):
+    filesystem = get_filesystem()
+    if not filesystem.is_dir(directory_path):
+        return 0
+    return sum(filesystem.get_size(Path(directory, file_name))
+               for directory, _, file_names in filesystem.walk(directory_path)
+               for file_name in file_names)
+
+
+def compute_readme_stats(html):
+    stats = dict.fromkeys(['words', 'code_blocks', 'code_lines', 'headings'],
+                          0)
+    for tag in BeautifulSoup(html, "html.parser").find_all():
+        stats['words'] += utils.count_tag_words(tag)
+        if tag.name == 'pre':
+            stats['code_blocks'] += 1
+            stats['code_lines'] += len(tag.text.strip('\n').splitlines())
+        elif tag.name in HEADING_TAGS:
+            stats['headings'] += 1
+    return stats
+
+
+def compute_lesson_stats(lesson_directory_path,
+                         renderer=utils.render_markdown):
+    dot_rmotr = io.read_dot_rmotr_file(lesson_directory_path)
+    readme_path = lesson_directory_path / io.README_FILE_NAME
+    record = compute_readme_stats(
+        renderer(get_filesystem().read_text(readme_path)))
+
+    is_assignment = dot_rmotr['type'] == ASSIGNMENT
+    record.update({
+        'level': LESSON,
+        'lesson': dot_rmotr['name'],
+        'type': dot_rmotr['type'],
+        'lessons': 1,
+        'readings': int(not is_assignment),
+        'assignments': int(is_assignment),
+        'tests_size': _directory_size(
+            lesson_directory_path / io.TESTS_DIR_NAME),
+        'solutions_size': _directory_size(
+            lesson_directory_path / io.SOLUTIONS_DIR_NAME),
+        'path': str(lesson_directory_path)
+    })
+    return _with_ratio(record)
+
+
+def _compute_lesson_stats_job(job):
+    course_name, unit_name, lesson_directory_path, renderer = job
+    record = compute_lesson_stats(lesson_directory_path, renderer)
+    record.update({'course': course_name, 'unit': unit_name})
+    return record
+
+
+def _with_ratio(record):
+    record['assignment_ratio'] = round(
+        float(record['assignments']) / (record['lessons'] or 1), 2)
+    return record
+
+
+def _new_totals(level, course_name, unit_name=None, path=None):
+    totals = dict.fromkeys(COUNTERS + METRICS, 0)
+    totals.update({
+        'level': level, 'course': course_name, 'unit': unit_name,
+        'lesson': None, 'type': None, 'path': path
+    })
+    return totals
+
+
+def _add_to_totals(totals, record):
+    for key in COUNTERS + METRICS:
+        totals[key] += record[key]
+
+
+def _iter_lesson_jobs(course_directory_path, renderer):
+    for lesson in io.iter_lessons(course_directory_path, with_readme=False):
+        yield (lesson.unit.course.name, lesson.unit.name,
+               lesson.directory_path, renderer)
+
+
+def iter_course_stats(course_directory_path, renderer=utils.render_markdown,
+                      processes=None):
+    """Yield one stats record per lesson, then one per unit as soon as
+    its lessons are done, and a final one for the whole course.
+
+    Lessons are processed in parallel but yielded in course order, and
+    only their numbers (never README contents) are kept around."""
+    course = io.read_course_from_path(course_directory_path, with_units=False)
+    course_totals = _new_totals(
+        COURSE, course.name, path=str(course.directory_path))
+    unit_totals = None
+
+    pool = multiprocessing.Pool(processes)
+    try:
+        jobs = _iter_lesson_jobs(course.directory_path, renderer)
+        for record in pool.imap(_compute_lesson_stats_job, jobs):
+            unit_path = str(Path(record['path']).parent)
+            if unit_totals is not None and unit_totals['path'] != unit_path:
+                yield _with_ratio(unit_totals)
+                unit_totals = None
+            if unit_totals is None:
+                unit_totals = _new_totals(
+                    UNIT, course.name, record['unit'], unit_path)
+
+            _add_to_totals(unit_totals, record)
+            _add_to_totals(course_totals, record)
+            yield record
+    finally:
+        # Also stops pending work when the caller stops consuming early
+        pool.terminate()
+        pool.join()
+
+    if unit_totals is not None:
+        yield _with_ratio(unit_totals)
+    yield _with_ratio(course_totals)
+
+
+def write_table(records, fp):
+    row_format = ' '.join('{{:<{}}}'.format(width)
+                          for _, width in TABLE_COLUMNS) + '\n'
+    fp.write(row_format.format(*[name[:width]
+                                 for name, width in TABLE_COLUMNS]))
+    for record in records:
+        if record['level'] != LESSON:
+            # Aggregates are labeled with the name of what they sum up
+            record = dict(record, lesson=record[record['level']])
+        fp.write(row_format.format(*[
+            str(record[name])[:width] for name, width in TABLE_COLUMNS]))
+
+
+def write_csv(records, fp):
+    writer = csv.DictWriter(fp, FIELDS, lineterminator='\n')
+    writer.writeheader()
+    for record in records:
+        writer.writerow(record)
+
+
+def write_json(records, fp):
+    fp.write('[')
+    for index, record in enumerate(records):
+        fp.write((index and ',\n') or '\n')
+        fp.write(json.dumps(record, sort_keys=True))
+    fp.write('\n]\n')
+
+
+WRITERS = {
+    'table': write_table,
+    'csv': write_csv,
+    'json': write_json
+}
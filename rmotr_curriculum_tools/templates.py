@@ -0,0 +1,100 @@
+from __future__ import unicode_literals
+
+import os
+import errno
+import shutil
+from string import Template
+
+from .filesystems import get_filesystem
+
+UNIT_TEMPLATE_NAME = 'unit'
+
+# Only files with this suffix are rendered (and lose it), everything
+# else is placed as is.
+TEMPLATE_SUFFIX = '.tmpl'
+
+# Static files from this size on are hardlinked when they can't be
+# reflinked. Hardlinks share their content with the template, smaller
+# files are copied so they can be edited freely.
+LINK_THRESHOLD = 1024 * 1024
+
+REFLINK = 'reflink'
+HARDLINK = 'hardlink'
+COPY = 'copy'
+
+# ioctl request to clone a file's extents (linux/fs.h)
+FICLONE = 0x40049409
+
+
+def get_template_path(templates_path, template_name):
+    if templates_path is None:
+        return None
+    template_path = templates_path / template_name
+    return (template_path.is_dir() and template_path) or None
+
+
+def reflink(source_path, target_path):
+    import fcntl
+    with open(str(source_path), 'rb') as source:
+        with open(str(target_path), 'wb') as target:
+            fcntl.ioctl(target.fileno(), FICLONE, source.fileno())
+
+
+def place_file(source_path, target_path, link_threshold=LINK_THRESHOLD):
+    """Place a copy of a static file, as cheaply as the filesystem
+    allows. Returns the method used."""
+    try:
+        reflink(source_path, target_path)
+        return REFLINK
+    except (ImportError, IOError, OSError):
+        if target_path.exists():
+            target_path.unlink()
+
+    if (link_threshold is not None and
+            source_path.stat().st_size >= link_threshold):
+        try:
+            os.link(str(source_path), str(target_path))
+            return HARDLINK
+        except OSError as e:
+            if e.errno not in (errno.EXDEV, errno.EPERM, errno.EMLINK):
+                raise
+
+    shutil.copyfile(str(source_path), str(target_path))
+    return COPY
+
+
+def render_template(template_path, target_path, variables, exclude=None,
+                    link_threshold=LINK_THRESHOLD):
+    """Copy the template directory into `target_path`, substituting
+    `$variables` in `.tmpl` files. Returns the created file paths."""
+    exclude = exclude or []
+    created = []
+    filesystem = get_filesystem()
+    for source_path in sorted(template_path.rglob('*')):
+        relative_path = source_path.relative_to(template_path)
+        if relative_path.parts[0] in exclude:
+            continue
+
+        destination_path = target_path / relative_path
+        if source_path.is_dir():
+            if not filesystem.exists(destination_path):
+                filesystem.make_directory(destination_path)
+            continue
+
+        if source_path.suffix == TEMPLATE_SUFFIX:
+            destination_path = destination_path.with_suffix('')
+            with source_path.open('r') as fp:
+                content = Template(fp.read()).safe_substitute(variables)
+            filesystem.write_file(destination_path, content)
+        else:
+            if filesystem.exists(destination_path):
+                filesystem.remove(destination_path)
+            if filesystem.in_memory:
+                # Templates are always read from disk
+                filesystem.write_file(
+                    destination_path, source_path.read_bytes(), 'wb')
+            else:
+                place_file(source_path, destination_path, link_threshold)
+        created.append(destination_path)
+
+    return created
@@ -1,5 +1,6 @@
 import re
 import uuid as uuid_module
+import markdown
 import pytoml as toml
 from bs4 import BeautifulSoup
 
@@ -13,6 +14,10 @@ except NameError:
 AVOID_COUNT_TAGS = ['code', 'pre']
 
 _punct_re = re.compile(r'[\t !"#$%&\'()*\-/<=>?@\[\\\]^_`{|},.]+')
+_fence_re = re.compile(
+    r'^(?P<indent> {0,3})(?P<fence>`{3,}|~{3,})[ \t]*(?P<language>[\w+-]*)'
+    r'[^\n]*\n(?P<source>.*?)^(?P=indent)(?P=fence)[ \t]*$',
+    re.MULTILINE | re.DOTALL)
 
 
 def slugify(text, delim=u'-'):
@@ -69,9 +74,29 @@ def generate_unit_directory_name(name, order, include_human_name=True):
     return _generate_directory_name(name, order, 'unit', include_human_name)
 
 
+def iter_fenced_code_blocks(markdown_content):
+    """Yields the regex match of every fenced code block, with `language`
+    and `source` groups."""
+    for match in _fence_re.finditer(markdown_content):
+        yield match
+
+
+def get_line_number(content, position):
+    return content.count('\n', 0, position) + 1
+
+
+def render_markdown(markdown_content):
+    return markdown.markdown(markdown_content, extensions=['gfm'])
+
+
+def count_tag_words(tag):
+    if tag.name in AVOID_COUNT_TAGS:
+        return 0
+    return len([w for w in tag.text.split(" ") if w])
+
+
 def count_words(markdown_content):
     count = 0
     for tag in BeautifulSoup(markdown_content, "html.parser").find_all():
-        if tag.name not in AVOID_COUNT_TAGS:
-            count += len([w for w in tag.text.split(" ") if w])
+        count += count_tag_words(tag)
     return count
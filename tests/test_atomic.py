@@ -0,0 +1,68 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import unittest
+import tempfile
+import shutil
+
+from rmotr_curriculum_tools import atomic
+
+
+class AtomicTestCase(unittest.TestCase):
+    def setUp(self):
+        self.directory_path = Path(tempfile.mkdtemp())
+        self.file_path = self.directory_path / 'README.md'
+        self.file_path.write_text('# Original\n')
+
+    def tearDown(self):
+        atomic.set_durability(atomic.NONE)
+        shutil.rmtree(str(self.directory_path.absolute()))
+
+    def test_write_file_replaces_content(self):
+        for policy in atomic.DURABILITY_POLICIES:
+            atomic.set_durability(policy)
+            atomic.write_file(self.file_path, '# {}\n'.format(policy))
+            with self.file_path.open() as fp:
+                self.assertEqual(fp.read(), '# {}\n'.format(policy))
+
+        self.assertEqual([p.name for p in self.directory_path.iterdir()],
+                         ['README.md'])
+
+    def test_failed_write_keeps_previous_content(self):
+        with self.assertRaises(TypeError):
+            atomic.write_file(self.file_path, b'# Bytes\n')
+
+        with self.file_path.open() as fp:
+            self.assertEqual(fp.read(), '# Original\n')
+        self.assertEqual([p.name for p in self.directory_path.iterdir()],
+                         ['README.md'])
+
+    def test_batch_syncs_on_exit(self):
+        atomic.set_durability(atomic.BATCH)
+        unit_path = self.directory_path / 'unit-1-intro'
+        with atomic.batch() as batch:
+            atomic.make_directory(unit_path)
+            atomic.write_file(unit_path / '.rmotr', 'name = "Intro"\n')
+            with atomic.batch() as nested_batch:
+                self.assertIs(nested_batch, batch)
+                atomic.rename(self.file_path, unit_path / 'README.md')
+
+            # Nothing is synced until the outermost batch exits
+            self.assertEqual(batch.file_paths,
+                             set([unit_path / '.rmotr']))
+            self.assertEqual(batch.directory_paths,
+                             set([self.directory_path, unit_path]))
+
+        self.assertEqual(batch.file_paths, set())
+        self.assertEqual(batch.directory_paths, set())
+        self.assertTrue((unit_path / 'README.md').exists())
+
+    def test_batch_is_ignored_by_other_policies(self):
+        with atomic.batch() as batch:
+            atomic.write_file(self.file_path, '# Updated\n')
+            self.assertEqual(batch.file_paths, set())
+
+    def test_invalid_durability_policy(self):
+        with self.assertRaises(ValueError):
+            atomic.set_durability('sometimes')
+        self.assertEqual(atomic.get_durability(), atomic.NONE)
@@ -0,0 +1,107 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import tempfile
+import shutil
+import markdown
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools.build import build_course
+from rmotr_curriculum_tools.exceptions import (
+    OutputDirectoryNotEmptyException)
+
+
+class BuildCourseTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+        self.output_path = Path(tempfile.mkdtemp())
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self.lesson_1_path = self._create_testing_reading_lesson(
+            self.unit_1_path, 'Python Intro', 'lesson-1-python-intro',
+            'aaaa574a-ac1b-4aa9-a964-c1feaa05c811', "# Intro\nHello")
+        self.lesson_2_path = self._create_testing_reading_lesson(
+            self.unit_1_path, 'Interpreters', 'lesson-2-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "# Interpreters")
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+        shutil.rmtree(str(self.output_path.absolute()))
+
+    def _build(self):
+        return build_course(self.course_directory_path, self.output_path,
+                            renderer=markdown.markdown, processes=2)
+
+    def test_build_course(self):
+        self.assertEqual(self._build(), (2, 0))
+
+        unit_output_path = self.output_path / 'unit-1-python-intro'
+        self.assertFileExists(self.output_path / 'index.html')
+        self.assertFileExists(unit_output_path / 'index.html')
+        self.assertFileExists(
+            unit_output_path / 'lesson-2-interpreters.html')
+
+        with (unit_output_path / 'lesson-1-python-intro.html').open() as fp:
+            self.assertIn('<h1>Intro</h1>', fp.read())
+        with (self.output_path / 'index.html').open() as fp:
+            self.assertIn(
+                '<a href="unit-1-python-intro/index.html">Python Intro</a>',
+                fp.read())
+
+    def test_rebuild_only_renders_changed_lessons(self):
+        self._build()
+        self.assertEqual(self._build(), (0, 2))
+
+        with (self.lesson_2_path / 'README.md').open('w') as fp:
+            fp.write('# Compilers')
+        self.assertEqual(self._build(), (1, 1))
+
+        lesson_2_output_path = (
+            self.output_path / 'unit-1-python-intro' /
+            'lesson-2-interpreters.html')
+        with lesson_2_output_path.open() as fp:
+            self.assertIn('<h1>Compilers</h1>', fp.read())
+
+    def test_rebuild_follows_renamed_lessons(self):
+        self._build()
+        shutil.rmtree(str(self.lesson_1_path))
+        self.lesson_2_path.rename(
+            self.unit_1_path / 'lesson-1-interpreters')
+
+        self.assertEqual(self._build(), (0, 1))
+
+        unit_output_path = self.output_path / 'unit-1-python-intro'
+        self.assertFileExists(unit_output_path / 'lesson-1-interpreters.html')
+        self.assertFileDoesntExist(
+            unit_output_path / 'lesson-1-python-intro.html')
+        self.assertFileDoesntExist(
+            unit_output_path / 'lesson-2-interpreters.html')
+
+    def test_only_removes_files_of_previous_builds(self):
+        self._build()
+        own_path = self.output_path / 'notes'
+        own_path.mkdir()
+        (own_path / 'todo.txt').write_text('Keep me')
+        shutil.rmtree(str(self.unit_1_path))
+
+        self.assertEqual(self._build(), (0, 0))
+        self.assertDirectoryDoesntExist(
+            self.output_path / 'unit-1-python-intro')
+        self.assertFileExists(own_path / 'todo.txt')
+
+    def test_refuses_non_empty_directory_without_manifest(self):
+        (self.output_path / 'important.txt').write_text('Keep me')
+        with self.assertRaises(OutputDirectoryNotEmptyException):
+            self._build()
+        self.assertEqual([path.name for path in self.output_path.iterdir()],
+                         ['important.txt'])
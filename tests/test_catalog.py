@@ -0,0 +1,137 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import tempfile
+import sqlite3
+import shutil
+import markdown
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import io, catalog
+
+
+class CatalogTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.directory_path = Path(tempfile.mkdtemp())
+        self.course_directory_path = self.directory_path / 'python-course'
+        self.course_directory_path.mkdir()
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self._create_testing_reading_lesson(
+            self.unit_path, 'Interpreters', 'lesson-1-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "Python is interpreted\n")
+        self._create_testing_assignment_lesson(
+            self.unit_path, 'Variables', 'lesson-2-variables',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb',
+            "Variables hold values, *any* values\n",
+            "x = 1\n", "def test_x(): pass\n")
+
+        self.catalog = catalog.Catalog(
+            str(self.directory_path / 'catalog.sqlite3'))
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(str(self.directory_path.absolute()))
+
+    def _sync(self):
+        return self.catalog.sync_course(
+            self.course_directory_path, renderer=markdown.markdown)
+
+    def test_query_lessons(self):
+        self.assertEqual(self._sync(), (4, 0, []))
+
+        lessons = self.catalog.query_lessons(
+            track='python', lesson_type='assignment', min_words=3)
+        self.assertEqual([lesson['name'] for lesson in lessons],
+                         ['Variables'])
+        self.assertEqual(lessons[0]['course'], 'Advanced Python Programming')
+        self.assertEqual(lessons[0]['unit'], 'Python Intro')
+        self.assertEqual(lessons[0]['slug'], 'variables')
+
+        lessons = self.catalog.query_lessons(
+            uuid='bbbb574a-ac1b-4aa9-a964-c1feaa05cca2')
+        self.assertEqual([lesson['course_uuid'] for lesson in lessons],
+                         ['a7c2574a-a28b-4b19-bb64-c1feaa05dd52'])
+        self.assertEqual(self.catalog.query_lessons(track='javascript'), [])
+
+    def test_only_changes_are_synced(self):
+        self._sync()
+        self.assertEqual(self._sync(), (0, 0, []))
+
+        readme_path = self.unit_path / 'lesson-1-interpreters' / 'README.md'
+        readme_path.write_text("Python is interpreted, not compiled\n")
+        self.assertEqual(self._sync(), (1, 0, []))
+        lesson = self.catalog.query_lessons(
+            uuid='bbbb574a-ac1b-4aa9-a964-c1feaa05cca2')[0]
+        self.assertEqual(lesson['words'], 5)
+
+        # Variables is renamed to take the place of the removed lesson:
+        # the rows of both old paths go, one for the new path is written
+        io.remove_lesson_from_directory(
+            self.unit_path / 'lesson-1-interpreters')
+        self.assertEqual(self._sync(), (1, 2, []))
+        lessons = self.catalog.query_lessons(course='python-course')
+        self.assertEqual(lessons, [])
+        lessons = self.catalog.query_lessons(
+            course='Advanced Python Programming')
+        self.assertEqual([(lesson['name'], lesson['order'])
+                          for lesson in lessons], [('Variables', 1)])
+
+    def test_lessons_copied_into_other_courses(self):
+        other_course_path = self.directory_path / 'python-course-copy'
+        shutil.copytree(str(self.course_directory_path),
+                        str(other_course_path))
+        (other_course_path / '.rmotr').write_text("""
+uuid = "dddd574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Python Course Copy"
+track = "python"
+""")
+        self._sync()
+        self.assertEqual(self.catalog.sync_course(
+            other_course_path, renderer=markdown.markdown), (4, 0, []))
+
+        lessons = self.catalog.query_lessons(
+            uuid='bbbb574a-ac1b-4aa9-a964-c1feaa05cca2')
+        self.assertEqual([(lesson['course'], lesson['unit'])
+                          for lesson in lessons],
+                         [('Advanced Python Programming', 'Python Intro'),
+                          ('Python Course Copy', 'Python Intro')])
+        # Neither course overwrote the rows of the other
+        self.assertEqual(self._sync(), (0, 0, []))
+        self.assertEqual(self.catalog.sync_course(
+            other_course_path, renderer=markdown.markdown), (0, 0, []))
+
+    def test_units_and_lessons_without_dot_rmotr_are_skipped(self):
+        unit_path = self.course_directory_path / 'unit-2-broken'
+        (unit_path / 'lesson-1-lost').mkdir(parents=True)
+        lesson_path = self.unit_path / 'lesson-3-lost'
+        lesson_path.mkdir()
+
+        self.assertEqual(self._sync(), (4, 0, [lesson_path, unit_path]))
+        self.assertEqual(
+            len(self.catalog.query_lessons(course='python-course')), 0)
+        self.assertEqual(
+            len(self.catalog.query_lessons(
+                course='Advanced Python Programming')), 2)
+
+    def test_older_catalogs_are_synced_again(self):
+        self.catalog.close()
+        catalog_path = str(self.directory_path / 'old.sqlite3')
+        connection = sqlite3.connect(catalog_path)
+        connection.executescript(
+            'CREATE TABLE units (uuid TEXT PRIMARY KEY, path TEXT); '
+            'CREATE TABLE lessons (uuid TEXT PRIMARY KEY, path TEXT);')
+        connection.close()
+
+        self.catalog = catalog.Catalog(catalog_path)
+        self.assertEqual(self._sync(), (4, 0, []))
+        self.assertEqual(
+            len(self.catalog.query_lessons(track='python')), 2)
@@ -0,0 +1,76 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import tempfile
+import hashlib
+import shutil
+import json
+import io as python_io
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import dump
+
+
+class DumpTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        unit_2_path = self._create_testing_unit(
+            "Decorators", 'unit-2-decorators',
+            '7c2a3ef2-ff0c-4a7e-a6bb-6a4ed7b1e4c2')
+        self._create_testing_reading_lesson(
+            unit_1_path, 'Interpreters', 'lesson-1-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "# Interpreters\n")
+        self._create_testing_assignment_lesson(
+            unit_1_path, 'Variables', 'lesson-2-variables',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', "Some *variables*\n",
+            "x = 1\n", "def test_x(): pass\n")
+        self._create_testing_reading_lesson(
+            unit_2_path, 'Closures', 'lesson-1-closures',
+            'dddd574a-ac1b-4aa9-a964-c1feaa05cca2', "# Closures\n")
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def test_lesson_records(self):
+        records = list(dump.iter_lesson_records(self.course_directory_path))
+        self.assertEqual([(r['unit_slug'], r['slug'], r['order'], r['type'])
+                          for r in records], [
+            ('python-intro', 'interpreters', 1, 'reading'),
+            ('python-intro', 'variables', 2, 'assignment'),
+            ('decorators', 'closures', 1, 'reading')
+        ])
+        self.assertEqual(list(records[1]), dump.FIELDS)
+        self.assertEqual(records[1]['readme_size'], 17)
+        self.assertEqual(records[1]['readme_sha1'], hashlib.sha1(
+            b"Some *variables*\n").hexdigest())
+        self.assertEqual(records[2]['path'], str(
+            self.course_directory_path / 'unit-2-decorators' /
+            'lesson-1-closures'))
+
+    def test_selected_fields(self):
+        records = dump.iter_lesson_records(
+            self.course_directory_path, ['name', 'uuid'])
+        fp = python_io.StringIO()
+        dump.write_json_lines(records, fp)
+
+        lines = fp.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(lines[0], json.dumps(
+            {'name': 'Interpreters',
+             'uuid': 'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2'},
+            sort_keys=True))
+
+        with self.assertRaises(ValueError):
+            dump.get_fields(['name', 'size'])
+
@@ -0,0 +1,124 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import unittest
+import tempfile
+import shutil
+import markdown
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import duplicates
+
+WORDS = ['lesson{}'.format(i) for i in range(150)]
+README = ' '.join(WORDS) + '\n'
+# Two words changed out of 150
+EDITED_README = ' '.join(['changed'] + WORDS[1:75] + ['edited'] +
+                         WORDS[76:]) + '\n'
+# Five words changed out of 150, just above the default threshold
+DISTANT_README = ' '.join(
+    (i in [5, 35, 65, 95, 125] and 'new{}'.format(i)) or word
+    for i, word in enumerate(WORDS)) + '\n'
+OTHER_README = ' '.join('other{}'.format(i) for i in range(150)) + '\n'
+
+
+class ReadmeWordsTestCase(unittest.TestCase):
+    def test_code_is_left_out(self):
+        html = markdown.markdown(
+            "Some `inline` text\n\n    def code(): pass\n\nand *more*\n")
+        self.assertEqual(duplicates.readme_words(html),
+                         ['some', 'text', 'and', 'more'])
+
+    def test_similarity_of_signatures(self):
+        signature = duplicates.minhash(duplicates.shingles(WORDS))
+        self.assertEqual(len(signature), duplicates.NUM_PERMUTATIONS)
+        self.assertEqual(duplicates.similarity(signature, signature), 1)
+        other = duplicates.minhash(duplicates.shingles(OTHER_README.split()))
+        self.assertLess(duplicates.similarity(signature, other), 0.1)
+
+    def test_pairs_at_the_threshold_are_likely_candidates(self):
+        for threshold in [0.5, 0.7, 0.8, 0.9, 0.95]:
+            bands, rows = duplicates.choose_bands(
+                duplicates.NUM_PERMUTATIONS, threshold)
+            self.assertEqual(bands * rows, duplicates.NUM_PERMUTATIONS)
+            self.assertGreaterEqual(
+                duplicates.candidate_probability(threshold, bands, rows),
+                duplicates.CANDIDATE_PROBABILITY)
+
+
+class FindDuplicatesTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.directory_path = Path(tempfile.mkdtemp())
+        self.course_paths = []
+        for index, name in enumerate(['python', 'javascript']):
+            self.course_directory_path = self.directory_path / name
+            self.course_directory_path.mkdir()
+            with (self.course_directory_path / '.rmotr').open('w') as fp:
+                fp.write('uuid = "{}"\nname = "{}"\ntrack = "{}"\n'.format(
+                    'a7c2574a-a28b-4b19-bb64-c1feaa05dd5{}'.format(index),
+                    name.title(), name))
+            self.course_paths.append(self.course_directory_path)
+
+        self.course_directory_path = self.course_paths[0]
+        unit_path = self._create_testing_unit(
+            "Intro", 'unit-1-intro', 'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self._create_testing_reading_lesson(
+            unit_path, 'Original', 'lesson-1-original',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', README)
+        self._create_testing_reading_lesson(
+            unit_path, 'Other', 'lesson-2-other',
+            'cccc574a-ac1b-4aa9-a964-c1feaa05cca2', OTHER_README)
+        self._create_testing_reading_lesson(
+            unit_path, 'Empty', 'lesson-3-empty',
+            'dddd574a-ac1b-4aa9-a964-c1feaa05cca2', "")
+
+        self.course_directory_path = self.course_paths[1]
+        unit_path = self._create_testing_unit(
+            "Intro", 'unit-1-intro', 'f4ed574a-a11b-4119-bb64-c1feaa05ea56')
+        self._create_testing_reading_lesson(
+            unit_path, 'Copy', 'lesson-1-copy',
+            'eeee574a-ac1b-4aa9-a964-c1feaa05cca2', EDITED_README)
+        self._create_testing_reading_lesson(
+            unit_path, 'Copy with code', 'lesson-2-copy-with-code',
+            'ffff574a-ac1b-4aa9-a964-c1feaa05cca2',
+            README + "\n    print('only here')\n")
+
+    def tearDown(self):
+        shutil.rmtree(str(self.directory_path.absolute()))
+
+    def test_find_duplicates_across_courses(self):
+        clusters = duplicates.find_duplicates(
+            self.course_paths, renderer=markdown.markdown, processes=1)
+
+        self.assertEqual(len(clusters), 1)
+        self.assertEqual(
+            [(lesson['course'], lesson['name'])
+             for lesson in clusters[0]['lessons']],
+            [('Python', 'Original'), ('Javascript', 'Copy'),
+             ('Javascript', 'Copy with code')])
+        self.assertGreaterEqual(clusters[0]['similarity'], 0.8)
+        self.assertLess(clusters[0]['similarity'], 1)
+
+    def test_threshold(self):
+        clusters = duplicates.find_duplicates(
+            self.course_paths, threshold=0.99, renderer=markdown.markdown,
+            processes=1)
+        self.assertEqual(
+            [[lesson['name'] for lesson in cluster['lessons']]
+             for cluster in clusters],
+            [['Original', 'Copy with code']])
+
+    def test_pairs_just_above_the_threshold(self):
+        self._create_testing_reading_lesson(
+            self.course_paths[1] / 'unit-1-intro', 'Distant copy',
+            'lesson-3-distant-copy', 'abcd574a-ac1b-4aa9-a964-c1feaa05cca2',
+            DISTANT_README)
+        signature, distant = [
+            duplicates.minhash(duplicates.shingles(readme.split()))
+            for readme in [README, DISTANT_README]]
+        self.assertTrue(
+            0.8 <= duplicates.similarity(signature, distant) < 0.85)
+
+        clusters = duplicates.find_duplicates(
+            self.course_paths, renderer=markdown.markdown, processes=1)
+        self.assertIn('Distant copy', [
+            lesson['name'] for lesson in clusters[0]['lessons']])
@@ -0,0 +1,119 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import tempfile
+import shutil
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import io, events
+
+
+class EventsTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.directory_path = Path(tempfile.mkdtemp())
+        self.course_directory_path = self.directory_path / 'python-course'
+        self.course_directory_path.mkdir()
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self._create_testing_reading_lesson(
+            self.unit_path, 'Interpreters', 'lesson-1-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "# Interpreters\n")
+        self._create_testing_reading_lesson(
+            self.unit_path, 'Variables', 'lesson-2-variables',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', "# Variables\n")
+
+        self.events = []
+        events.subscribe(self.events.append)
+
+    def tearDown(self):
+        events.unsubscribe(self.events.append)
+        shutil.rmtree(str(self.directory_path.absolute()))
+
+    def _summary(self):
+        return [(event['type'], event['object'],
+                 Path(event['path']).name,
+                 event.get('old_path') and Path(event['old_path']).name)
+                for event in self.events]
+
+    def test_io_mutations(self):
+        lesson_path = io.add_lesson_to_unit(
+            self.unit_path, 'History', 'reading', 1)
+        created = self.events[-1]
+        io.remove_lesson_from_directory(
+            self.unit_path / 'lesson-2-interpreters')
+
+        self.assertEqual(self._summary(), [
+            (events.RENAMED, events.LESSON, 'lesson-2-interpreters',
+             'lesson-1-interpreters'),
+            (events.RENAMED, events.LESSON, 'lesson-3-variables',
+             'lesson-2-variables'),
+            (events.CREATED, events.LESSON, 'lesson-1-history', None),
+            (events.REMOVED, events.LESSON, 'lesson-2-interpreters', None),
+            (events.RENAMED, events.LESSON, 'lesson-2-variables',
+             'lesson-3-variables')
+        ])
+        self.assertEqual(created['uuid'],
+                         io.read_lesson_from_path(lesson_path).uuid)
+        self.assertEqual(self.events[3]['uuid'],
+                         'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2')
+        self.assertEqual(created['path'], str(lesson_path.absolute()))
+
+    def test_failing_subscribers_dont_stop_changes(self):
+        event_log = events.EventLog(
+            str(self.directory_path / 'missing' / 'events.log'))
+        with events.subscribed(event_log):
+            with self.assertLogs(events.logger) as logs:
+                io.add_lesson_to_unit(self.unit_path, 'History', 'reading', 1)
+
+        self.assertEqual(
+            sorted(path.name for path in self.unit_path.glob('lesson-*')),
+            ['lesson-1-history', 'lesson-2-interpreters',
+             'lesson-3-variables'])
+        self.assertEqual(len(logs.records), 3)
+        # The other subscribers got every event
+        self.assertEqual(len(self.events), 3)
+
+    def test_reorder_reports_final_names(self):
+        io.reorder_children(self.unit_path, ['variables'])
+        self.assertEqual(self._summary(), [
+            (events.RENAMED, events.LESSON, 'lesson-1-variables',
+             'lesson-2-variables'),
+            (events.RENAMED, events.LESSON, 'lesson-2-interpreters',
+             'lesson-1-interpreters')
+        ])
+
+    def test_course_session(self):
+        with io.open_course(self.course_directory_path) as session:
+            unit = session.get_unit('python-intro')
+            new_unit = session.add_unit('Setup', order=1)
+            session.move_lesson(
+                session.get_lesson(unit, 'variables'), new_unit)
+
+        self.assertEqual(sorted(self._summary()), [
+            (events.CREATED, events.UNIT, 'unit-1-setup', None),
+            (events.RENAMED, events.LESSON, 'lesson-1-variables',
+             'lesson-2-variables'),
+            (events.RENAMED, events.UNIT, 'unit-2-python-intro',
+             'unit-1-python-intro')
+        ])
+
+    def test_event_log(self):
+        log_path = str(self.directory_path / 'events.log')
+        with events.subscribed(events.EventLog(log_path)):
+            io.add_unit_to_course(self.course_directory_path, 'Setup')
+
+        logged = list(events.read_event_log(log_path))
+        self.assertEqual([event for _, event in logged], self.events)
+        with open(log_path, 'a') as fp:
+            fp.write('{"type": "crea')
+        # Readers resume where they stopped, and skip partial lines
+        self.assertEqual(
+            list(events.read_event_log(log_path, logged[0][0])), [])
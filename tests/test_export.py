@@ -0,0 +1,126 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import tempfile
+import tarfile
+import shutil
+import gzip
+import os
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import io, export, filesystems
+
+
+class ExportTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.directory_path = Path(tempfile.mkdtemp())
+        self.course_directory_path = self.directory_path / 'python-course'
+        self.course_directory_path.mkdir()
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        unit_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self._create_testing_reading_lesson(
+            unit_path, 'Interpreters', 'lesson-1-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "# Interpreters\n")
+        lesson_path = self._create_testing_assignment_lesson(
+            unit_path, 'Variables', 'lesson-2-variables',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', "Some *variables*\n",
+            # Large enough to span a few chunks
+            "".join("x_{} = {}\n".format(i, i) for i in range(5000)),
+            "def test_x(): pass\n")
+        (lesson_path / 'tests').mkdir()
+        (lesson_path / 'tests' / 'test_variables.py').write_text(
+            "def test_x(): pass\n")
+
+        # Junk that shouldn't be exported
+        (lesson_path / '__pycache__').mkdir()
+        (lesson_path / '__pycache__' / 'main.cpython-36.pyc').write_bytes(
+            b'\0' * 16)
+        (lesson_path / '.main.py.swp').write_bytes(b'\0' * 16)
+        (lesson_path / 'main.py~').write_text("x = 0\n")
+        (lesson_path / '.trash').mkdir()
+        (lesson_path / '.trash' / 'old.csv').write_text("a,b\n")
+        (self.course_directory_path / '.trash').mkdir()
+
+        # Data files of the lesson are exported with it
+        (lesson_path / 'prices.csv').write_text("item,price\negg,1\n")
+        (lesson_path / 'data').mkdir()
+        (lesson_path / 'data' / 'stock.json').write_text("{}\n")
+
+    def tearDown(self):
+        shutil.rmtree(str(self.directory_path.absolute()))
+
+    def _export(self, name, **kwargs):
+        output_path = self.directory_path / name
+        export.export_course(
+            self.course_directory_path, output_path, chunk_size=1024,
+            **kwargs)
+        return output_path
+
+    def test_only_curriculum_files_are_exported(self):
+        output_path = self._export('python-course.tar.gz', processes=2)
+        with tarfile.open(str(output_path)) as archive:
+            members = archive.getmembers()
+
+        lesson_name = 'python-course/unit-1-python-intro/lesson-2-variables'
+        self.assertEqual([member.name for member in members], [
+            'python-course',
+            'python-course/.rmotr',
+            'python-course/unit-1-python-intro',
+            'python-course/unit-1-python-intro/.rmotr',
+            'python-course/unit-1-python-intro/lesson-1-interpreters',
+            'python-course/unit-1-python-intro/lesson-1-interpreters/.rmotr',
+            'python-course/unit-1-python-intro/lesson-1-interpreters/'
+            'README.md',
+            lesson_name,
+            lesson_name + '/.rmotr',
+            lesson_name + '/README.md',
+            lesson_name + '/data',
+            lesson_name + '/data/stock.json',
+            lesson_name + '/main.py',
+            lesson_name + '/prices.csv',
+            lesson_name + '/tests',
+            lesson_name + '/tests/test_variables.py',
+            lesson_name + '/tests.py'
+        ])
+        self.assertEqual(set((member.mtime, member.uid, member.uname)
+                             for member in members), set([(0, 0, '')]))
+
+        course = io.read_course_from_path(output_path)
+        lessons = list(course.last_unit.iter_lessons())
+        self.assertEqual(lessons[1].readme_content, "Some *variables*\n")
+        self.assertEqual(filesystems.get_filesystem().read_text(
+            lessons[1].directory_path / 'prices.csv'), "item,price\negg,1\n")
+
+    def test_exports_are_reproducible(self):
+        first_path = self._export('first.tar.gz', processes=1)
+        os.utime(str(self.course_directory_path / '.rmotr'), (0, 1e9))
+        second_path = self._export('second.tar.gz', processes=3)
+        tar_path = self._export('python-course.tar')
+
+        self.assertEqual(first_path.read_bytes(), second_path.read_bytes())
+        # Chunks are separate gzip members of the same stream
+        self.assertEqual(gzip.decompress(first_path.read_bytes()),
+                         tar_path.read_bytes())
+
+    def test_dry_run_export(self):
+        filesystem = filesystems.MemoryFilesystem(
+            base=filesystems.DiskFilesystem())
+        with filesystems.using(filesystem):
+            count = export.export_course(
+                self.course_directory_path,
+                self.directory_path / 'python-course.tgz', processes=1)
+
+        self.assertEqual(count, 11)
+        self.assertFalse(
+            (self.directory_path / 'python-course.tgz').exists())
+        self.assertEqual(filesystem.operations, [
+            (filesystems.WRITE, self.directory_path / 'python-course.tgz')
+        ])
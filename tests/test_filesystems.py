@@ -0,0 +1,287 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import unittest
+import tempfile
+import shutil
+import tarfile
+import zipfile
+import errno
+import os
+import markdown
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import (
+    io, filesystems, stats, search, runner, links, snippets, dump, export)
+from rmotr_curriculum_tools.build import build_course
+
+
+class MemoryFilesystemTestCase(unittest.TestCase):
+    def setUp(self):
+        self.filesystem = filesystems.MemoryFilesystem()
+        self.course_path = Path('/courses/python')
+        self.filesystem.make_directory(self.course_path, parents=True)
+
+    def test_files_and_directories(self):
+        unit_path = self.course_path / 'unit-1-intro'
+        self.filesystem.make_directory(unit_path)
+        self.filesystem.write_file(unit_path / 'README.md', '# Intro\n')
+
+        self.assertTrue(self.filesystem.is_dir(unit_path))
+        self.assertTrue(self.filesystem.is_file(unit_path / 'README.md'))
+        self.assertEqual(
+            self.filesystem.read_text(unit_path / 'README.md'), '# Intro\n')
+        self.assertEqual(self.filesystem.glob(self.course_path, 'unit-*'),
+                         [unit_path])
+        self.assertEqual(list(self.filesystem.walk(self.course_path)), [
+            (str(self.course_path), ['unit-1-intro'], []),
+            (str(unit_path), [], ['README.md'])
+        ])
+
+        with self.assertRaises(OSError) as context:
+            self.filesystem.make_directory(unit_path)
+        self.assertEqual(context.exception.errno, errno.EEXIST)
+        with self.assertRaises(OSError) as context:
+            self.filesystem.read_text(unit_path / 'main.py')
+        self.assertEqual(context.exception.errno, errno.ENOENT)
+
+    def test_rename_and_remove_directories(self):
+        unit_path = self.course_path / 'unit-1-intro'
+        self.filesystem.make_directory(unit_path / 'lesson-1-intro',
+                                       parents=True)
+        self.filesystem.write_file(
+            unit_path / 'lesson-1-intro' / 'README.md', '# Intro\n')
+
+        new_path = self.filesystem.rename(
+            unit_path, self.course_path / 'unit-2-intro')
+        self.assertFalse(self.filesystem.exists(unit_path))
+        self.assertEqual(self.filesystem.read_text(
+            new_path / 'lesson-1-intro' / 'README.md'), '# Intro\n')
+
+        self.filesystem.remove_tree(new_path)
+        self.assertEqual(self.filesystem.iterdir(self.course_path), [])
+        self.assertEqual(self.filesystem.operations[-2:], [
+            (filesystems.RENAME, unit_path, new_path),
+            (filesystems.REMOVE_TREE, new_path)
+        ])
+
+
+class MemoryIOTestCase(unittest.TestCase):
+    def setUp(self):
+        self.course_directory_path = Path('/courses/advanced-python')
+        self.filesystem = filesystems.MemoryFilesystem()
+        self.filesystem.make_directory(
+            self.course_directory_path, parents=True)
+        self.filesystem.write_file(
+            self.course_directory_path / '.rmotr',
+            'uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"\n'
+            'name = "Advanced Python Programming"\n'
+            'track = "python"\n')
+
+    def test_course_lifecycle_in_memory(self):
+        with filesystems.using(self.filesystem):
+            unit_path = io.add_unit_to_course(
+                self.course_directory_path, 'Python Intro')
+            io.add_lesson_to_unit(unit_path, 'Interpreters', 'reading')
+            io.add_lesson_to_unit(unit_path, 'Variables', 'assignment', 1)
+            io.remove_lesson_from_directory(
+                unit_path / 'lesson-2-interpreters')
+
+            unit = io.read_unit_from_path(unit_path)
+            self.assertEqual([lesson.name for lesson in unit.iter_lessons()],
+                             ['Variables'])
+
+        lesson_path = unit_path / 'lesson-1-variables'
+        self.assertTrue(self.filesystem.is_file(
+            lesson_path / 'tests' / 'test_.py'))
+        self.assertFalse(os.path.exists(str(self.course_directory_path)))
+
+
+class DryRunTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self._create_testing_reading_lesson(
+            self.unit_1_path, 'Interpreters', 'lesson-1-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "Lesson 1 Unit 1")
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def _list_tree(self):
+        return sorted(os.walk(str(self.course_directory_path)))
+
+    def test_dry_run_leaves_disk_untouched(self):
+        tree = self._list_tree()
+        filesystem = filesystems.MemoryFilesystem(
+            base=filesystems.DiskFilesystem())
+
+        with filesystems.using(filesystem):
+            io.add_unit_to_course(self.course_directory_path, 'Setup', 1)
+            unit_path = self.course_directory_path / 'unit-2-python-intro'
+            io.add_lesson_to_unit(unit_path, 'History', 'reading', 1)
+
+            unit = io.read_unit_from_path(unit_path)
+            self.assertEqual([lesson.name for lesson in unit.iter_lessons()],
+                             ['History', 'Interpreters'])
+            self.assertEqual(filesystem.read_text(
+                unit_path / 'lesson-2-interpreters' / 'README.md'),
+                "Lesson 1 Unit 1")
+
+        self.assertEqual(self._list_tree(), tree)
+        # The existing unit and lesson make room for the new ones
+        renames = [operation for operation in filesystem.operations
+                   if operation[0] == filesystems.RENAME]
+        self.assertEqual(len(renames), 2)
+
+
+class ArchiveTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.directory_path = Path(tempfile.mkdtemp())
+        self.course_directory_path = self.directory_path / 'python-course'
+        self.course_directory_path.mkdir()
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        unit_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self._create_testing_reading_lesson(
+            unit_path, 'Interpreters', 'lesson-1-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2',
+            "# Interpreters\n\nSee [variables](../lesson-2-variables) "
+            "and [functions](../lesson-3-functions)\n\n"
+            "```python\nprint(1 +)\n```\n")
+        lesson_path = self._create_testing_assignment_lesson(
+            unit_path, 'Variables', 'lesson-2-variables',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', "Some *variables*\n",
+            "x = 1\n", "def test_x(): pass\n")
+        for relative_path, content in [
+                ('tests/test_.py', "from main import x\n\n\n"
+                                   "def test_x():\n    assert x == 1\n"),
+                ('solutions/solution_.py', "x = 1\n"),
+                # Empty members have no size to tell apart
+                ('tests/__init__.py', "")]:
+            file_path = lesson_path / relative_path
+            if not file_path.parent.exists():
+                file_path.parent.mkdir()
+            with file_path.open('w') as fp:
+                fp.write(content)
+
+        self.zip_path = self.directory_path / 'python-course.zip'
+        with zipfile.ZipFile(str(self.zip_path), 'w') as archive:
+            for directory, _, file_names in os.walk(
+                    str(self.course_directory_path)):
+                for file_name in file_names:
+                    file_path = os.path.join(directory, file_name)
+                    archive.write(file_path, os.path.relpath(
+                        file_path, str(self.directory_path)))
+
+        self.tar_path = self.directory_path / 'python-course.tar.gz'
+        with tarfile.open(str(self.tar_path), 'w:gz') as archive:
+            archive.add(str(self.course_directory_path), '.')
+
+    def tearDown(self):
+        shutil.rmtree(str(self.directory_path.absolute()))
+
+    def test_read_course_from_archives(self):
+        for archive_path in [self.zip_path, self.tar_path]:
+            course = io.read_course_from_path(archive_path)
+            self.assertEqual(course.name, 'Advanced Python Programming')
+
+            lessons = list(course.last_unit.iter_lessons())
+            self.assertEqual([lesson.name for lesson in lessons],
+                             ['Interpreters', 'Variables'])
+            self.assertFalse(lessons[1].readme_loaded)
+            self.assertEqual(lessons[1].readme_content, "Some *variables*\n")
+            self.assertEqual(
+                [path.name for path in io.iter_assignment_file_paths(
+                    lessons[1].directory_path)],
+                ['main.py', '__init__.py', 'test_.py', 'solution_.py'])
+
+    def test_archives_are_read_only(self):
+        unit_path = io.read_course_from_path(
+            self.zip_path).last_unit.directory_path
+        with self.assertRaises(OSError) as context:
+            io.add_lesson_to_unit(unit_path, 'Functions', 'reading')
+        self.assertEqual(context.exception.errno, errno.EROFS)
+
+    def test_stats_of_archive(self):
+        def words(course_path):
+            return [(record['level'], record['words'], record['tests_size'])
+                    for record in stats.iter_course_stats(
+                        course_path, renderer=markdown.markdown,
+                        processes=1)]
+
+        for archive_path in [self.zip_path, self.tar_path]:
+            self.assertEqual(words(archive_path),
+                             words(self.course_directory_path))
+
+    def test_search_archive(self):
+        index = search.SearchIndex(str(self.directory_path / 'index.json'))
+
+        self.assertEqual(index.update_course(self.tar_path), 2)
+        self.assertEqual([result['name'] for result in
+                          index.search('interpreters')], ['Interpreters'])
+        self.assertEqual(index.update_course(self.tar_path), 0)
+
+    def test_check_solutions_of_archive(self):
+        for archive_path in [self.zip_path, self.tar_path]:
+            results = runner.check_course_solutions(
+                archive_path, processes=1)
+            self.assertEqual([result['status'] for result in results],
+                             [runner.PASSED])
+
+    def test_check_links_of_archive(self):
+        for archive_path in [self.zip_path, self.tar_path]:
+            broken = links.check_course_links(archive_path)
+            self.assertEqual([link['target'] for link in broken],
+                             ['../lesson-3-functions'])
+        self.assertFalse(
+            (self.course_directory_path / links.PATHS_SNAPSHOT_FILE_NAME)
+            .exists())
+
+    def test_check_snippets_of_archive(self):
+        results = snippets.check_course_snippets(
+            self.tar_path, cache_path=str(self.directory_path / 'cache'),
+            processes=1)
+        self.assertEqual([result['status'] for result in results],
+                         [snippets.SYNTAX_ERROR])
+
+    def test_build_dump_and_export_archive(self):
+        build_path = self.directory_path / 'build'
+        self.assertEqual(build_course(self.tar_path, str(build_path),
+                                      renderer=markdown.markdown,
+                                      processes=1), (2, 0))
+
+        def uuids(course_path):
+            return [record['uuid'] for record in
+                    dump.iter_lesson_records(course_path, ['uuid'])]
+        self.assertEqual(uuids(self.zip_path),
+                         uuids(self.course_directory_path))
+
+        def exported_names(course_path, name):
+            output_path = self.directory_path / name
+            export.export_course(course_path, str(output_path), processes=1)
+            with tarfile.open(str(output_path)) as archive:
+                return archive.getnames()
+        disk_names = exported_names(
+            self.course_directory_path, 'from-disk.tar.gz')
+        self.assertEqual(exported_names(self.tar_path, 'from-tar.tar.gz'),
+                         disk_names)
+        self.assertEqual(exported_names(self.zip_path, 'from-zip.tar.gz'),
+                         disk_names)
@@ -6,7 +6,7 @@ import shutil
 import pytoml as toml
 
 from base_tests import IOTestCase
-from rmotr_curriculum_tools import io
+from rmotr_curriculum_tools import io, exceptions
 
 
 class BaseIOTestCase(IOTestCase):
@@ -312,6 +312,46 @@ This is the assignment description""",
         self.assertEqual(lesson_2.uuid, 'd4500b25-151e-4e5d-9fc1-83feca938c3e')
 
 
+class LazyReadCourseTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        unit_1_path = self._create_testing_unit(
+            'Python Introduction', 'unit-1-python-introduction',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        # Lessons with an invalid type can only be read by accident
+        self._create_testing_lesson(
+            unit_1_path, 'Basic Data Types', 'lesson-1-basic-data-types',
+            '0d900c98-935c-4f00-aa4d-cb626409e756', "# Basic", 'unknown')
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def test_children_are_read_on_first_access(self):
+        course = io.read_course_from_path(self.course_directory_path)
+        self.assertFalse(course.units_loaded)
+
+        unit = course.last_child_object
+        self.assertTrue(course.units_loaded)
+        self.assertEqual(unit.name, 'Python Introduction')
+        self.assertFalse(unit.lessons_loaded)
+
+        with self.assertRaises(exceptions.InvalidLessonTypeException):
+            list(unit.iter_lessons())
+
+    def test_eager_read(self):
+        with self.assertRaises(exceptions.InvalidLessonTypeException):
+            io.read_course_from_path(self.course_directory_path, eager=True)
+
+
 class AddUnitToCourseTestCase(BaseIOTestCase):
     def setUp(self):
         self.course_name = 'Advanced Python Programming'
@@ -764,6 +804,49 @@ track = "python"
             self.course_directory_path / 'unit-2-collections'
         )
 
+    def test_removed_unit_is_moved_to_trash(self):
+        self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        unit_1_path = self.course_directory_path / 'unit-1-python-intro'
+
+        trashed_path = io.remove_unit_from_directory(unit_1_path)
+
+        trash_path = self.course_directory_path / '.trash'
+        self.assertDirectoryDoesntExist(unit_1_path)
+        self.assertEqual(trashed_path.parent, trash_path)
+        self.assertTrue(trashed_path.name.endswith(
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55-unit-1-python-intro'))
+        self.assertFileExists(trashed_path / '.rmotr')
+
+        course = io.read_course_from_path(self.course_directory_path)
+        self.assertEqual(course.unit_count(), 0)
+
+    def test_purge_trash(self):
+        self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        unit_1_path = self.course_directory_path / 'unit-1-python-intro'
+        trashed_path = io.remove_unit_from_directory(unit_1_path)
+        self.assertDirectoryExists(trashed_path)
+
+        io.purge_trash(self.course_directory_path)
+
+        self.assertDirectoryDoesntExist(trashed_path)
+        self.assertDirectoryIsEmpty(self.course_directory_path / '.trash')
+
+    def test_purge_trash_in_background(self):
+        self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        unit_1_path = self.course_directory_path / 'unit-1-python-intro'
+        trashed_path = io.remove_unit_from_directory(unit_1_path)
+
+        process = io.purge_trash(self.course_directory_path, background=True)
+        self.assertEqual(process.wait(), 0)
+
+        self.assertDirectoryDoesntExist(trashed_path)
+
 
 class RemoveLessonFromUnitTestCase(BaseIOTestCase):
     def setUp(self):
@@ -854,3 +937,409 @@ track = "python"
         self.assertDirectoryExists(lesson_1)
         self.assertDirectoryExists(
             self.unit_1_path / 'lesson-2-history')
+
+
+class MoveLessonToUnitTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self.unit_2_path = self._create_testing_unit(
+            "Data Types", 'unit-2-data-types',
+            '8a22574a-a11b-4119-a964-c1feaa05c833')
+
+        self.lesson_1_unit_1 = self._create_testing_reading_lesson(
+            self.unit_1_path, 'Python Intro', 'lesson-1-python-intro',
+            'aaaa574a-ac1b-4aa9-a964-c1feaa05c811', "Lesson 1 Unit 1")
+        self.lesson_2_unit_1 = self._create_testing_reading_lesson(
+            self.unit_1_path, 'Interpreters', 'lesson-2-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "Lesson 2 Unit 1")
+        self.lesson_3_unit_1 = self._create_testing_reading_lesson(
+            self.unit_1_path, 'History', 'lesson-3-history',
+            'fff574a-aa1b-4a8c-a964-c1feaa0cabb2', "Lesson 3 Unit 1")
+        self.lesson_1_unit_2 = self._create_testing_reading_lesson(
+            self.unit_2_path, 'Numbers', 'lesson-1-numbers',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', "Lesson 1 Unit 2")
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def test_move_lesson_to_the_end_of_other_unit(self):
+        new_path = io.move_lesson_to_unit(
+            self.lesson_1_unit_1, self.unit_2_path)
+
+        self.assertEqual(new_path, self.unit_2_path / 'lesson-2-python-intro')
+        self.assertDirectoryExists(new_path)
+        self.assertDirectoryDoesntExist(self.lesson_1_unit_1)
+        self.assertDirectoryExists(self.lesson_1_unit_2)
+        self.assertDirectoryExists(self.unit_1_path / 'lesson-1-interpreters')
+        self.assertDirectoryExists(self.unit_1_path / 'lesson-2-history')
+
+        with (new_path / '.rmotr').open() as fp:
+            dot_rmotr_content = toml.loads(fp.read())
+        self.assertEqual(dot_rmotr_content['uuid'],
+                         'aaaa574a-ac1b-4aa9-a964-c1feaa05c811')
+
+    def test_move_lesson_in_between_other_unit_lessons(self):
+        new_path = io.move_lesson_to_unit(
+            self.lesson_3_unit_1, self.unit_2_path, order=1)
+
+        self.assertEqual(new_path, self.unit_2_path / 'lesson-1-history')
+        self.assertDirectoryExists(new_path)
+        self.assertDirectoryExists(self.unit_2_path / 'lesson-2-numbers')
+        self.assertDirectoryExists(self.lesson_1_unit_1)
+        self.assertDirectoryExists(self.lesson_2_unit_1)
+        self.assertDirectoryDoesntExist(self.lesson_3_unit_1)
+
+    def test_move_lesson_within_the_same_unit(self):
+        new_path = io.move_lesson_to_unit(
+            self.lesson_1_unit_1, self.unit_1_path, order=3)
+
+        self.assertEqual(new_path, self.unit_1_path / 'lesson-3-python-intro')
+        self.assertDirectoryExists(new_path)
+        self.assertDirectoryExists(self.unit_1_path / 'lesson-1-interpreters')
+        self.assertDirectoryExists(self.unit_1_path / 'lesson-2-history')
+
+
+class MoveUnitToCourseTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+        self.other_course_directory_path = Path(
+            tempfile.mkdtemp(prefix='intro-to-python'))
+
+        with (self.course_directory_path / '.rmotr').open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        with (self.other_course_directory_path / '.rmotr').open(
+                mode='w') as fp:
+            fp.write("""
+uuid = "b1c2574a-a28b-4b19-bb64-c1feaa05aa11"
+name = "Intro to Python"
+track = "python"
+""")
+        self.unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self.unit_2_path = self._create_testing_unit(
+            "Data Types", 'unit-2-data-types',
+            '8a22574a-a11b-4119-a964-c1feaa05c833')
+        self._create_testing_reading_lesson(
+            self.unit_1_path, 'Python Intro', 'lesson-1-python-intro',
+            'aaaa574a-ac1b-4aa9-a964-c1feaa05c811', "Lesson 1 Unit 1")
+
+        other_unit_path = self.other_course_directory_path / 'unit-1-setup'
+        other_unit_path.mkdir()
+        with (other_unit_path / '.rmotr').open('w') as fp:
+            fp.write("""
+uuid = "c822574a-a81b-4aa9-a964-c1feaa05a7b2"
+name = "Setup"
+""")
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+        shutil.rmtree(str(self.other_course_directory_path.absolute()))
+
+    def test_move_unit_to_other_course(self):
+        new_path = io.move_unit_to_course(
+            self.unit_1_path, self.other_course_directory_path, order=1)
+
+        self.assertEqual(
+            new_path,
+            self.other_course_directory_path / 'unit-1-python-intro')
+        self.assertDirectoryExists(new_path / 'lesson-1-python-intro')
+        self.assertDirectoryExists(
+            self.other_course_directory_path / 'unit-2-setup')
+        self.assertDirectoryDoesntExist(self.unit_1_path)
+        self.assertDirectoryExists(
+            self.course_directory_path / 'unit-1-data-types')
+
+    def test_move_unit_within_the_same_course(self):
+        new_path = io.move_unit_to_course(
+            self.unit_2_path, self.course_directory_path, order=1)
+
+        self.assertEqual(
+            new_path, self.course_directory_path / 'unit-1-data-types')
+        self.assertDirectoryExists(new_path)
+        self.assertDirectoryExists(
+            self.course_directory_path / 'unit-2-python-intro')
+
+
+class IterCourseTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        # Created out of order on purpose, and with two digit orders
+        unit_10_path = self._create_testing_unit(
+            "Collections", 'unit-10-collections',
+            'c822574a-a81b-4aa9-a964-c1feaa05a7b2')
+        unit_2_path = self._create_testing_unit(
+            "Data Types", 'unit-2-data-types',
+            '8a22574a-a11b-4119-a964-c1feaa05c833')
+        self._create_testing_reading_lesson(
+            unit_10_path, 'Lists', 'lesson-1-lists',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', "# Lists")
+        self._create_testing_reading_lesson(
+            unit_2_path, 'Strings', 'lesson-11-strings',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "# Strings")
+        self._create_testing_reading_lesson(
+            unit_2_path, 'Numbers', 'lesson-3-numbers',
+            'aaaa574a-ac1b-4aa9-a964-c1feaa05c811', "# Numbers")
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def test_iter_units(self):
+        units = list(io.iter_units(self.course_directory_path))
+
+        self.assertEqual([unit.name for unit in units],
+                         ['Data Types', 'Collections'])
+        self.assertEqual([unit.order for unit in units], [2, 10])
+        self.assertEqual(units[0].lesson_count(), 0)
+        self.assertEqual(units[0].course.name, 'Advanced Python Programming')
+
+    def test_iter_lessons(self):
+        lessons = io.iter_lessons(self.course_directory_path)
+
+        lesson = next(lessons)
+        self.assertEqual(lesson.name, 'Numbers')
+        self.assertEqual(lesson.unit.name, 'Data Types')
+        self.assertEqual(lesson.readme_content, '# Numbers')
+
+        self.assertEqual([lesson.name for lesson in lessons],
+                         ['Strings', 'Lists'])
+
+    def test_iter_lessons_without_readme(self):
+        lessons = list(io.iter_lessons(
+            self.course_directory_path, with_readme=False))
+
+        self.assertEqual(len(lessons), 3)
+        self.assertIsNone(lessons[0].readme_content)
+        self.assertEqual(lessons[0].readme_path,
+                         self.course_directory_path /
+                         'unit-2-data-types' / 'lesson-3-numbers' /
+                         'README.md')
+
+
+class ReorderChildrenTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self.unit_3_path = self._create_testing_unit(
+            "Data Types", 'unit-3-data-types',
+            '8a22574a-a11b-4119-a964-c1feaa05c833')
+
+        self._create_testing_reading_lesson(
+            self.unit_1_path, 'Python Intro', 'lesson-1-python-intro',
+            'aaaa574a-ac1b-4aa9-a964-c1feaa05c811', "Lesson 1")
+        self._create_testing_reading_lesson(
+            self.unit_1_path, 'Interpreters', 'lesson-2-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "Lesson 2")
+        self._create_testing_reading_lesson(
+            self.unit_1_path, 'History', 'lesson-4-history',
+            'fff574a-aa1b-4a8c-a964-c1feaa0cabb2', "Lesson 4")
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def assertLessonNames(self, unit_path, names):
+        self.assertEqual(
+            sorted(p.name for p in unit_path.iterdir()
+                   if p.name.startswith('lesson-')),
+            sorted(names))
+
+    def test_compact_units(self):
+        renames = io.reorder_children(self.course_directory_path)
+
+        self.assertEqual(renames, [(
+            self.unit_3_path,
+            self.course_directory_path / 'unit-2-data-types')])
+        self.assertDirectoryExists(
+            self.course_directory_path / 'unit-2-data-types')
+
+    def test_reorder_lessons(self):
+        renames = io.reorder_children(self.unit_1_path, [
+            'history', 'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2'])
+
+        # Interpreters keeps its position
+        self.assertEqual(len(renames), 2)
+        self.assertLessonNames(self.unit_1_path, [
+            'lesson-1-history', 'lesson-2-interpreters',
+            'lesson-3-python-intro'])
+        readme_path = self.unit_1_path / 'lesson-1-history' / 'README.md'
+        with readme_path.open() as fp:
+            self.assertEqual(fp.read(), "Lesson 4")
+
+    def test_reorder_unknown_lesson(self):
+        with self.assertRaises(exceptions.InvalidOrderException):
+            io.reorder_children(self.unit_1_path, ['decorators'])
+        with self.assertRaises(exceptions.InvalidOrderException):
+            io.reorder_children(self.unit_1_path, ['history', 'history'])
+
+    def test_order_renames_breaks_cycles(self):
+        a, b, c = Path('lesson-1-a'), Path('lesson-2-a'), Path('lesson-3-a')
+        d, e = Path('lesson-4-b'), Path('lesson-5-b')
+        renames = io.order_renames([
+            (a, b), (b, c), (c, a),  # cycle
+            (d, e), (e, Path('lesson-6-b')),  # chain
+            (Path('lesson-7-c'), Path('lesson-7-c'))
+        ])
+
+        self.assertEqual(len(renames), 6)
+        # Simulate the renames, no target can be taken when renamed into
+        occupied = set([a, b, c, d, e])
+        for source, target in renames:
+            self.assertIn(source, occupied)
+            self.assertNotIn(target, occupied)
+            occupied.remove(source)
+            occupied.add(target)
+        self.assertEqual(occupied, set([a, b, c, e, Path('lesson-6-b')]))
+
+
+class OpenCourseTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self.unit_2_path = self._create_testing_unit(
+            "Data Types", 'unit-2-data-types',
+            '8a22574a-a11b-4119-a964-c1feaa05c833')
+
+        self._create_testing_reading_lesson(
+            self.unit_1_path, 'Python Intro', 'lesson-1-python-intro',
+            'aaaa574a-ac1b-4aa9-a964-c1feaa05c811', "Lesson 1 Unit 1")
+        self._create_testing_reading_lesson(
+            self.unit_1_path, 'Interpreters', 'lesson-2-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "Lesson 2 Unit 1")
+        self._create_testing_reading_lesson(
+            self.unit_1_path, 'History', 'lesson-3-history',
+            'fff574a-aa1b-4a8c-a964-c1feaa0cabb2', "Lesson 3 Unit 1")
+        self._create_testing_reading_lesson(
+            self.unit_2_path, 'Numbers', 'lesson-1-numbers',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', "Lesson 1 Unit 2")
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def assertChildNames(self, path, names):
+        self.assertEqual(
+            sorted(p.name for p in path.iterdir()
+                   if not p.name.startswith('.') and p.is_dir()),
+            sorted(names))
+
+    def test_changes_are_written_on_exit(self):
+        with io.open_course(self.course_directory_path) as session:
+            unit_1 = session.get_unit('python-intro')
+            session.remove_lesson(session.get_lesson(unit_1, 'history'))
+            session.add_lesson(unit_1, 'Variables', 'reading', order=2)
+            session.add_lesson(unit_1, 'Functions', 'assignment', order=2)
+            session.add_unit('Decorators')
+
+            # Nothing is written until the block exits
+            self.assertChildNames(self.unit_1_path, [
+                'lesson-1-python-intro', 'lesson-2-interpreters',
+                'lesson-3-history'])
+
+        self.assertChildNames(self.course_directory_path, [
+            'unit-1-python-intro', 'unit-2-data-types', 'unit-3-decorators'])
+        self.assertChildNames(self.unit_1_path, [
+            'lesson-1-python-intro', 'lesson-2-functions',
+            'lesson-3-variables', 'lesson-4-interpreters'])
+        self.assertDirectoryExists(
+            self.unit_1_path / 'lesson-2-functions' / 'tests')
+
+        trash_path = io.get_trash_directory_path(self.course_directory_path)
+        self.assertEqual([p.name.split('-', 1)[1]
+                          for p in trash_path.iterdir()],
+                         ['fff574a-aa1b-4a8c-a964-c1feaa0cabb2-'
+                          'lesson-3-history'])
+
+        unit = io.read_unit_from_path(self.unit_1_path)
+        self.assertEqual(
+            [lesson.uuid for lesson in unit.iter_lessons()],
+            [lesson.uuid for lesson in unit_1.iter_lessons()])
+        self.assertEqual(session.course.last_unit.directory_path,
+                         self.course_directory_path / 'unit-3-decorators')
+
+    def test_move_lesson_and_units(self):
+        with io.open_course(self.course_directory_path) as session:
+            unit_1 = session.get_unit('python-intro')
+            unit_2 = session.get_unit('8a22574a-a11b-4119-a964-c1feaa05c833')
+            session.move_lesson(
+                session.get_lesson(unit_1, 'python-intro'), unit_2, 1)
+            session.move_unit(unit_2, 1)
+
+        unit_1_path = self.course_directory_path / 'unit-1-data-types'
+        unit_2_path = self.course_directory_path / 'unit-2-python-intro'
+        self.assertChildNames(unit_1_path, [
+            'lesson-1-python-intro', 'lesson-2-numbers'])
+        self.assertChildNames(unit_2_path, [
+            'lesson-1-interpreters', 'lesson-2-history'])
+        readme_path = unit_1_path / 'lesson-1-python-intro' / 'README.md'
+        with readme_path.open() as fp:
+            self.assertEqual(fp.read(), "Lesson 1 Unit 1")
+
+    def test_remove_unit_keeping_moved_lesson(self):
+        with io.open_course(self.course_directory_path) as session:
+            unit_1 = session.get_unit('python-intro')
+            unit_2 = session.get_unit('data-types')
+            session.move_lesson(session.get_lesson(unit_1, 'history'), unit_2)
+            session.remove_unit(unit_1)
+
+        self.assertChildNames(self.course_directory_path, [
+            'unit-1-data-types'])
+        self.assertChildNames(
+            self.course_directory_path / 'unit-1-data-types', [
+                'lesson-1-numbers', 'lesson-2-history'])
+
+    def test_changes_are_discarded_on_error(self):
+        with self.assertRaises(exceptions.InvalidOrderException):
+            with io.open_course(self.course_directory_path) as session:
+                session.add_unit('Decorators', order=1)
+                session.get_unit('generators')
+
+        self.assertChildNames(self.course_directory_path, [
+            'unit-1-python-intro', 'unit-2-data-types'])
+        self.assertFalse(session.committed)
@@ -0,0 +1,109 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import tempfile
+import shutil
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import io, links
+
+README_CONTENT = """# Lists
+
+See [the intro](../lesson-1-python-intro/README.md#setup) first.
+
+![Diagram](images/diagram.png)
+![Missing](images/missing.png)
+[Python](https://www.python.org) and [top](#lists)
+
+```python
+x = [1]  # [not a link](nowhere.md)
+```
+
+[history]: ../lesson-2-history
+"""
+
+
+class CheckLinksTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self._create_testing_reading_lesson(
+            self.unit_1_path, 'Python Intro', 'lesson-1-python-intro',
+            'aaaa574a-ac1b-4aa9-a964-c1feaa05c811', "# Intro")
+        self._create_testing_reading_lesson(
+            self.unit_1_path, 'History', 'lesson-2-history',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "# History")
+        self.lesson_path = self._create_testing_reading_lesson(
+            self.unit_1_path, 'Lists', 'lesson-3-lists',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', README_CONTENT)
+        (self.lesson_path / 'images').mkdir()
+        (self.lesson_path / 'images' / 'diagram.png').write_bytes(b'png')
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def _targets(self, broken):
+        return [(link['line'], link['target']) for link in broken]
+
+    def test_report_broken_links(self):
+        broken = links.check_course_links(self.course_directory_path)
+
+        self.assertEqual(self._targets(broken),
+                         [(6, 'images/missing.png')])
+
+    def test_fix_links_after_renumbering(self):
+        links.check_course_links(self.course_directory_path)
+        io.add_lesson_to_unit(self.unit_1_path, 'Setup', 'reading', order=1)
+
+        broken = links.check_course_links(self.course_directory_path)
+        self.assertEqual(self._targets(broken), [
+            (3, '../lesson-1-python-intro/README.md#setup'),
+            (6, 'images/missing.png'),
+            (13, '../lesson-2-history')])
+
+        broken = links.check_course_links(
+            self.course_directory_path, fix=True)
+        self.assertEqual(self._targets(broken),
+                         [(6, 'images/missing.png')])
+
+        readme_path = self.unit_1_path / 'lesson-4-lists' / 'README.md'
+        content = readme_path.read_text()
+        self.assertIn(
+            '[the intro](../lesson-2-python-intro/README.md#setup)', content)
+        self.assertIn('[history]: ../lesson-3-history', content)
+        self.assertIn('![Diagram](images/diagram.png)', content)
+
+    def test_check_only_writes_missing_snapshot(self):
+        snapshot_path = self.course_directory_path / '.rmotr-paths.json'
+        links.check_course_links(self.course_directory_path)
+        snapshot = snapshot_path.read_text()
+        io.add_lesson_to_unit(self.unit_1_path, 'Setup', 'reading', order=1)
+
+        links.check_course_links(self.course_directory_path)
+        self.assertEqual(snapshot_path.read_text(), snapshot)
+
+        links.check_course_links(self.course_directory_path, fix=True)
+        self.assertIn('lesson-4-lists', snapshot_path.read_text())
+
+    def test_fix_links_without_snapshot_uses_slugs(self):
+        (self.unit_1_path / 'lesson-2-history').rename(
+            self.unit_1_path / 'lesson-7-history')
+
+        broken = links.check_course_links(
+            self.course_directory_path, fix=True)
+
+        self.assertEqual(self._targets(broken),
+                         [(6, 'images/missing.png')])
+        with (self.lesson_path / 'README.md').open() as fp:
+            self.assertIn('[history]: ../lesson-7-history', fp.read())
@@ -0,0 +1,129 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import threading
+import os
+import tempfile
+import shutil
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import io, locks
+
+UNIT_UUIDS = [
+    'f4ed574a-a11b-4119-bb64-c1feaa05ea55',
+    '7c2a3ef2-ff0c-4a7e-a6bb-6a4ed7b1e4c2',
+    'a1b7f4e0-4f44-45b5-9e6c-2b0c1b2a7d11',
+    '0d5a5b39-2e6f-4b1a-8f0a-6f6c8e1b9c33'
+]
+
+
+class LocksTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_paths = [
+            self._create_testing_unit(
+                'Unit {}'.format(i), 'unit-{}-unit-{}'.format(i, i), uuid)
+            for i, uuid in enumerate(UNIT_UUIDS, 1)
+        ]
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def _start(self, target, *args):
+        thread = threading.Thread(target=target, args=args)
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def assertLessonsNumbered(self, unit_path, count):
+        names = sorted(path.name for path in unit_path.glob('lesson-*'))
+        self.assertEqual(len(names), count)
+        orders = sorted(int(name.split('-')[1]) for name in names)
+        self.assertEqual(orders, list(range(1, count + 1)))
+
+    def test_other_units_stay_writable(self):
+        with locks.lock_units(self.course_directory_path, UNIT_UUIDS[0]):
+            other_unit = self._start(
+                io.add_lesson_to_unit, self.unit_paths[1], 'Other', 'reading')
+            other_unit.join(5)
+            self.assertFalse(other_unit.is_alive())
+
+            same_unit = self._start(
+                io.add_lesson_to_unit, self.unit_paths[0], 'Same', 'reading')
+            same_unit.join(0.2)
+            self.assertTrue(same_unit.is_alive())
+
+        same_unit.join(5)
+        self.assertFalse(same_unit.is_alive())
+        self.assertLessonsNumbered(self.unit_paths[0], 1)
+        self.assertLessonsNumbered(self.unit_paths[1], 1)
+
+    def test_unit_mutations_wait_for_lesson_mutations(self):
+        with locks.lock_units(self.course_directory_path, UNIT_UUIDS[0]):
+            new_unit = self._start(
+                io.add_unit_to_course, self.course_directory_path, 'New')
+            new_unit.join(0.2)
+            self.assertTrue(new_unit.is_alive())
+
+        new_unit.join(5)
+        self.assertFalse(new_unit.is_alive())
+        self.assertEqual(
+            len(list(self.course_directory_path.glob('unit-*'))), 5)
+
+    def test_locks_are_reentrant(self):
+        with locks.lock_courses(self.course_directory_path):
+            io.add_unit_to_course(self.course_directory_path, 'New')
+            io.add_lesson_to_unit(self.unit_paths[0], 'Intro', 'reading')
+
+        with locks.lock_units(self.course_directory_path, UNIT_UUIDS[0]):
+            with self.assertRaises(RuntimeError):
+                io.add_unit_to_course(self.course_directory_path, 'Other')
+
+    def test_concurrent_writers(self):
+        writers_per_unit = 8
+        lessons_per_writer = 3
+        errors = []
+
+        def write_lessons(unit_path, writer):
+            try:
+                for i in range(lessons_per_writer):
+                    # Inserting at the start renumbers every other lesson
+                    io.add_lesson_to_unit(
+                        unit_path, 'Lesson {} {}'.format(writer, i),
+                        'reading', order=(i % 2 and 1) or None)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [self._start(write_lessons, unit_path, writer)
+                   for unit_path in self.unit_paths
+                   for writer in range(writers_per_unit)]
+        for thread in threads:
+            thread.join(60)
+
+        self.assertEqual(errors, [])
+        self.assertFalse(any(thread.is_alive() for thread in threads))
+        for unit_path in self.unit_paths:
+            self.assertLessonsNumbered(
+                unit_path, writers_per_unit * lessons_per_writer)
+
+    def test_lock_files_are_out_of_the_course(self):
+        io.add_lesson_to_unit(self.unit_paths[0], 'Intro', 'reading')
+
+        self.assertEqual(list(self.course_directory_path.glob('.*lock*')),
+                         [])
+        lock_path = locks.get_course_lock_path(self.course_directory_path)
+        self.assertTrue(lock_path.exists())
+        self.assertEqual(
+            lock_path.parent.parent, locks.get_locks_directory_path())
+        # Same course, same locks, whatever the path used to get to it
+        relative_path = Path(os.path.relpath(
+            str(self.course_directory_path)))
+        self.assertEqual(locks.get_course_lock_path(relative_path), lock_path)
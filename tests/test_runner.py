@@ -0,0 +1,189 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+from xml.etree import ElementTree
+import tempfile
+import shutil
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import runner
+from rmotr_curriculum_tools.exceptions import InvalidLessonTypeException
+
+TEST_CONTENT = """from main import add
+
+
+def test_add():
+    assert add(2, 3) == 5
+"""
+
+
+class BaseRunnerTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self._create_testing_reading_lesson(
+            unit_1_path, 'Python Intro', 'lesson-1-python-intro',
+            'aaaa574a-ac1b-4aa9-a964-c1feaa05c811', "# Intro")
+        self.lesson_path = self._create_testing_lesson(
+            unit_1_path, 'Add', 'lesson-2-add',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "# Add", 'assignment')
+
+        (self.lesson_path / 'tests').mkdir()
+        (self.lesson_path / 'solutions').mkdir()
+        self._write('tests/test_.py', TEST_CONTENT)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def _write(self, relative_path, content):
+        with (self.lesson_path / relative_path).open('w') as fp:
+            fp.write(content)
+
+
+class CheckSolutionsTestCase(BaseRunnerTestCase):
+    def _check(self, **kwargs):
+        return runner.check_course_solutions(
+            self.course_directory_path, processes=2, **kwargs)
+
+    def test_passing_solution(self):
+        self._write('solutions/solution_.py',
+                    "def add(a, b):\n    return a + b\n")
+
+        results = self._check()
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0]['status'], runner.PASSED)
+        self.assertEqual(results[0]['uuid'],
+                         'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2')
+        self.assertEqual(results[0]['tests'][0]['name'], 'test_.test_add')
+
+    def test_failing_and_broken_solutions(self):
+        self._write('solutions/solution_1.py',
+                    "def add(a, b):\n    return a - b\n")
+        self._write('solutions/solution_2.py', "def add(a, b)\n")
+
+        results = self._check()
+
+        self.assertEqual([result['status'] for result in results],
+                         [runner.FAILED, runner.ERROR])
+
+    def test_solution_timeout(self):
+        self._write('solutions/solution_.py',
+                    "def add(a, b):\n    while True:\n        pass\n")
+
+        results = self._check(timeout=1)
+
+        self.assertEqual(results[0]['status'], runner.TIMEOUT)
+
+    def test_exiting_solutions(self):
+        self._write('solutions/solution_1.py',
+                    "import sys\nsys.exit(0)\n")
+        self._write('solutions/solution_2.py',
+                    "import os\nos._exit(0)\n")
+
+        results = self._check(timeout=5)
+
+        self.assertEqual([result['status'] for result in results],
+                         [runner.ERROR, runner.ERROR])
+        self.assertIn('exited with code 0',
+                      results[1]['tests'][0]['message'])
+
+    def test_timeouts_cannot_be_swallowed(self):
+        self._write('solutions/solution_1.py', """import time
+while True:
+    try:
+        time.sleep(1)
+    except Exception:
+        pass
+""")
+        self._write('solutions/solution_2.py', """import time
+while True:
+    try:
+        time.sleep(1)
+    except:
+        pass
+""")
+
+        results = self._check(timeout=1)
+
+        self.assertEqual([result['status'] for result in results],
+                         [runner.TIMEOUT, runner.TIMEOUT])
+        self.assertIn('Killed', results[1]['tests'][0]['message'])
+
+    def test_junit_report(self):
+        self._write('solutions/solution_.py',
+                    "def add(a, b):\n    return a - b\n")
+        output = tempfile.TemporaryFile('w+')
+
+        runner.write_junit_report(self._check(), output)
+
+        output.seek(0)
+        testsuites = ElementTree.fromstring(output.read())
+        testcase = testsuites.find('testsuite/testcase')
+        self.assertEqual(testcase.get('name'), 'test_.test_add')
+        self.assertIsNotNone(testcase.find('failure'))
+
+
+class GradeSubmissionsTestCase(BaseRunnerTestCase):
+    def setUp(self):
+        super(GradeSubmissionsTestCase, self).setUp()
+        self.submissions_path = Path(tempfile.mkdtemp())
+        for name, content in [
+                ('alice.py', "def add(a, b):\n    return a + b\n"),
+                ('bob.py', "def add(a, b):\n    return a * b\n"),
+                ('carol.py', "import os\nos.getcwd(\n")]:
+            with (self.submissions_path / name).open('w') as fp:
+                fp.write(content)
+
+    def tearDown(self):
+        super(GradeSubmissionsTestCase, self).tearDown()
+        shutil.rmtree(str(self.submissions_path.absolute()))
+
+    def test_grade_submissions(self):
+        results = runner.iter_graded_submissions(
+            self.lesson_path, self.submissions_path, processes=2)
+
+        statuses = dict((result['name'], result['status'])
+                        for result in results)
+        self.assertEqual(statuses, {
+            'alice.py': runner.PASSED,
+            'bob.py': runner.FAILED,
+            'carol.py': runner.ERROR
+        })
+
+    def test_grade_reading_lesson_is_not_allowed(self):
+        reading_lesson_path = self.lesson_path.parent / 'lesson-1-python-intro'
+        with self.assertRaises(InvalidLessonTypeException):
+            list(runner.iter_graded_submissions(
+                reading_lesson_path, self.submissions_path))
+
+    def test_submissions_are_isolated(self):
+        for name, content in [
+                ('alice.py', "import string\nstring.leaked = True\n"
+                             "def add(a, b):\n    return a + b\n"),
+                ('bob.py', "import os, string\n"
+                           "assert not hasattr(string, 'leaked')\n"
+                           "assert not os.path.exists('solutions')\n"
+                           "def add(a, b):\n    return a + b\n")]:
+            with (self.submissions_path / name).open('w') as fp:
+                fp.write(content)
+        self._write('solutions/solution_.py',
+                    "def add(a, b):\n    return a + b\n")
+
+        results = runner.iter_graded_submissions(
+            self.lesson_path, self.submissions_path, processes=1)
+
+        statuses = dict((result['name'], result['status'])
+                        for result in results)
+        self.assertEqual(statuses['bob.py'], runner.PASSED)
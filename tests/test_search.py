@@ -0,0 +1,137 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import tempfile
+import shutil
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import filesystems
+from rmotr_curriculum_tools.search import SearchIndex
+
+
+class SearchIndexTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+        self.index_directory_path = Path(tempfile.mkdtemp())
+        self.index_path = self.index_directory_path / 'index.json'
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self.lesson_1_path = self._create_testing_reading_lesson(
+            self.unit_1_path, 'Decorators', 'lesson-1-decorators',
+            'aaaa574a-ac1b-4aa9-a964-c1feaa05c811',
+            "# Decorators\nA decorator wraps a function in a closure.")
+        self.lesson_2_path = self._create_testing_reading_lesson(
+            self.unit_1_path, 'List Comprehensions',
+            'lesson-2-list-comprehensions',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2',
+            "# Comprehensions\nA list comprehension builds a list.")
+
+        self.index = SearchIndex(self.index_path)
+        self.index.update_course(self.course_directory_path)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+        shutil.rmtree(str(self.index_directory_path.absolute()))
+
+    def _uuids(self, results):
+        return [result['uuid'] for result in results]
+
+    def test_word_query(self):
+        self.assertEqual(self._uuids(self.index.search('closure')),
+                         ['aaaa574a-ac1b-4aa9-a964-c1feaa05c811'])
+        self.assertEqual(len(self.index.search('a')), 2)
+        self.assertEqual(self.index.search('generators'), [])
+
+    def test_phrase_query(self):
+        self.assertEqual(
+            self._uuids(self.index.search('"list comprehension"')),
+            ['bbbb574a-ac1b-4aa9-a964-c1feaa05cca2'])
+        self.assertEqual(self.index.search('"comprehension list"'), [])
+
+    def test_prefix_query(self):
+        self.assertEqual(self._uuids(self.index.search('decor*')),
+                         ['aaaa574a-ac1b-4aa9-a964-c1feaa05c811'])
+        self.assertEqual(len(self.index.search('comp* list')), 1)
+
+    def test_fuzzy_search_on_names(self):
+        results = self.index.fuzzy_search('decoratros')
+        self.assertEqual(self._uuids(results),
+                         ['aaaa574a-ac1b-4aa9-a964-c1feaa05c811'])
+
+    def test_index_is_saved_and_loaded(self):
+        self.index.save()
+        index = SearchIndex.load(self.index_path)
+        self.assertEqual(self._uuids(index.search('closure')),
+                         ['aaaa574a-ac1b-4aa9-a964-c1feaa05c811'])
+
+    def test_update_only_reindexes_changed_lessons(self):
+        self.assertEqual(
+            self.index.update_course(self.course_directory_path), 0)
+
+        with (self.lesson_2_path / 'README.md').open('w') as fp:
+            fp.write("# Comprehensions\nGenerator expressions are lazy.")
+        self.assertEqual(
+            self.index.update_course(self.course_directory_path), 1)
+        self.assertEqual(self._uuids(self.index.search('lazy')),
+                         ['bbbb574a-ac1b-4aa9-a964-c1feaa05cca2'])
+        self.assertEqual(self.index.search('"list comprehension"'), [])
+
+        shutil.rmtree(str(self.lesson_1_path))
+        self.assertEqual(
+            self.index.update_course(self.course_directory_path), 1)
+        self.assertEqual(self.index.search('closure'), [])
+
+    def test_unit_rename_reindexes_its_lessons(self):
+        with (self.unit_1_path / '.rmotr').open('w') as fp:
+            fp.write("""
+uuid = "f4ed574a-a11b-4119-bb64-c1feaa05ea55"
+name = "Functional Programming"
+""")
+        self.assertEqual(
+            self.index.update_course(self.course_directory_path), 2)
+        self.assertEqual(
+            [result['unit'] for result in self.index.search('decorators')],
+            ['Functional Programming'])
+
+    def test_dry_run_changes_are_indexed(self):
+        filesystem = filesystems.MemoryFilesystem(
+            base=filesystems.DiskFilesystem())
+        with filesystems.using(filesystem):
+            filesystem.write_file(self.lesson_1_path / 'README.md',
+                                  "# Decorators\nThey are generators.")
+            self.assertEqual(
+                self.index.update_course(self.course_directory_path), 1)
+        self.assertEqual(self._uuids(self.index.search('generators')),
+                         ['aaaa574a-ac1b-4aa9-a964-c1feaa05c811'])
+
+    def test_lessons_copied_into_other_courses(self):
+        other_course_path = self.index_directory_path / 'python-course-copy'
+        shutil.copytree(str(self.course_directory_path),
+                        str(other_course_path))
+        with (other_course_path / '.rmotr').open('w') as fp:
+            fp.write("""
+uuid = "dddd574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Python Course Copy"
+track = "python"
+""")
+        self.assertEqual(self.index.update_course(other_course_path), 2)
+
+        self.assertEqual(
+            sorted(result['course'] for result in
+                   self.index.search('closure')),
+            ['Advanced Python Programming', 'Python Course Copy'])
+        # Neither course evicts the lessons of the other
+        self.assertEqual(
+            self.index.update_course(self.course_directory_path), 0)
+        self.assertEqual(self.index.update_course(other_course_path), 0)
+        self.assertEqual(len(self.index.search('closure')), 2)
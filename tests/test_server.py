@@ -0,0 +1,245 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import subprocess
+import tempfile
+import asyncio
+import tarfile
+import shutil
+import json
+import sys
+import os
+
+import pytest
+
+from test_io import BaseIOTestCase
+
+if sys.version_info < (3, 7):
+    pytest.skip('The server needs Python 3.7 or later',
+                allow_module_level=True)
+
+from rmotr_curriculum_tools import io, server, export  # noqa: E402
+
+COURSE_UUID = 'a7c2574a-a28b-4b19-bb64-c1feaa05dd52'
+UNIT_UUID = 'f4ed574a-a11b-4119-bb64-c1feaa05ea55'
+LESSON_UUID = 'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2'
+
+
+async def fetch(reader, writer, target, headers=None):
+    """GET over a kept alive connection, (status, headers, body)"""
+    writer.write('GET {} HTTP/1.1\r\nHost: localhost\r\n{}\r\n'.format(
+        target, ''.join('{}: {}\r\n'.format(name, value)
+                        for name, value in (headers or {}).items())
+    ).encode('latin-1'))
+    status = int((await reader.readline()).split()[1])
+    response_headers = {}
+    while True:
+        line = (await reader.readline()).decode('latin-1')
+        if line == '\r\n':
+            break
+        name, _, value = line.partition(':')
+        response_headers[name.lower()] = value.strip()
+    body = await reader.readexactly(
+        int(response_headers.get('content-length', 0)))
+    return status, response_headers, (body and json.loads(body.decode()))
+
+
+class ServerTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro', UNIT_UUID)
+        self._create_testing_reading_lesson(
+            self.unit_path, 'Interpreters', 'lesson-1-interpreters',
+            LESSON_UUID, "# Interpreters\n")
+        self._create_testing_reading_lesson(
+            self.unit_path, 'Variables', 'lesson-2-variables',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', "# Variables\n")
+        self.store = server.CourseStore([self.course_directory_path])
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def _run(self, client):
+        async def run():
+            course_server = server.CourseServer(self.store, poll_interval=0)
+            await course_server.start(port=0)
+            try:
+                reader, writer = await asyncio.open_connection(
+                    server.DEFAULT_HOST, course_server.port)
+                result = await client(reader, writer, course_server.port)
+                writer.close()
+                return result
+            finally:
+                await course_server.close()
+        return asyncio.run(run())
+
+    def test_routes(self):
+        async def client(reader, writer, port):
+            return [await fetch(reader, writer, target) for target in [
+                '/courses',
+                '/units/{}'.format(UNIT_UUID),
+                '/units/{}/lessons?per_page=1&page=2'.format(UNIT_UUID),
+                '/lessons/{}'.format(LESSON_UUID),
+                '/lessons/missing',
+                '/courses?per_page=0'
+            ]]
+
+        responses = self._run(client)
+        self.assertEqual([status for status, _, _ in responses],
+                         [200, 200, 200, 200, 404, 400])
+        self.assertEqual(responses[0][2]['items'][0]['name'],
+                         'Advanced Python Programming')
+        self.assertEqual([lesson['slug'] for lesson in
+                          responses[1][2]['lessons']],
+                         ['interpreters', 'variables'])
+        self.assertEqual(responses[2][2]['total'], 2)
+        self.assertEqual([lesson['name'] for lesson in
+                          responses[2][2]['items']], ['Variables'])
+        self.assertEqual(responses[3][2]['readme'], "# Interpreters\n")
+        self.assertNotIn('etag', responses[4][1])
+
+    def test_units_copied_into_other_courses(self):
+        other_course_path = Path(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, str(other_course_path))
+        other_course_path.rmdir()
+        shutil.copytree(str(self.course_directory_path),
+                        str(other_course_path))
+        (other_course_path / '.rmotr').write_text("""
+uuid = "dddd574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Python Course Copy"
+track = "python"
+""")
+        self.store = server.CourseStore(
+            [self.course_directory_path, other_course_path])
+
+        async def client(reader, writer, port):
+            return [await fetch(reader, writer, target) for target in [
+                '/lessons/{}'.format(LESSON_UUID),
+                '/lessons/{}?course={}'.format(LESSON_UUID, COURSE_UUID),
+                '/units/{}/lessons?course={}'.format(UNIT_UUID, COURSE_UUID),
+                '/units/{}/lessons?course=dddd574a-a28b-4b19-bb64-'
+                'c1feaa05dd52'.format(UNIT_UUID)
+            ]]
+
+        responses = self._run(client)
+        self.assertEqual([status for status, _, _ in responses],
+                         [400, 200, 200, 200])
+        self.assertEqual(responses[1][2]['path'], str(
+            self.unit_path / 'lesson-1-interpreters'))
+        self.assertEqual(
+            [responses[i][2]['items'][0]['course_uuid'] for i in [2, 3]],
+            [COURSE_UUID, 'dddd574a-a28b-4b19-bb64-c1feaa05dd52'])
+
+    def test_not_modified(self):
+        resource = self.store.snapshot.find(
+            server.LESSON, LESSON_UUID)[0].resource
+
+        async def client(reader, writer, port):
+            target = '/lessons/{}'.format(LESSON_UUID)
+            headers = {'If-None-Match': '"{}"'.format(resource.etag)}
+            return [await fetch(reader, writer, target, headers),
+                    await fetch(reader, writer, target)]
+
+        not_modified, modified = self._run(client)
+        self.assertEqual(not_modified[0], 304)
+        self.assertEqual(not_modified[1]['etag'], modified[1]['etag'])
+        self.assertEqual(modified[0], 200)
+
+    def test_incremental_refresh(self):
+        def resources():
+            return dict((key, entry.resource) for key, entry in
+                        self.store.snapshot.objects.items())
+
+        before = resources()
+        self.assertEqual(self.store.refresh(), 0)
+
+        readme_path = self.unit_path / 'lesson-1-interpreters' / 'README.md'
+        readme_path.write_text("# Interpreters, again\n")
+        os.utime(str(readme_path), (0, 1e9))
+        self.assertEqual(self.store.refresh(), 1)
+        after = resources()
+        changed = sorted(key for key in before
+                         if before[key] is not after[key])
+        # The unit only shows lesson summaries, which didn't change
+        self.assertEqual(changed, [(server.LESSON, COURSE_UUID, LESSON_UUID)])
+
+        io.add_lesson_to_unit(self.unit_path, 'Closures', 'reading')
+        self.assertEqual(self.store.refresh(), 1)
+        unit = self.store.snapshot.find(server.UNIT, UNIT_UUID)[0]
+        self.assertNotEqual(unit.resource.etag,
+                            after[(server.UNIT, COURSE_UUID, UNIT_UUID)].etag)
+        self.assertEqual(len(unit.children), 3)
+
+    def test_load(self):
+        clients = 16
+        requests_per_client = 200
+        targets = ['/courses', '/units/{}'.format(UNIT_UUID),
+                   '/lessons/{}'.format(LESSON_UUID)]
+
+        async def load(port, conditional):
+            etags = {}
+
+            async def one_client():
+                reader, writer = await asyncio.open_connection(
+                    server.DEFAULT_HOST, port)
+                for i in range(requests_per_client):
+                    target = targets[i % len(targets)]
+                    headers = (conditional and target in etags and
+                               {'If-None-Match': etags[target]}) or {}
+                    status, response_headers, _ = await fetch(
+                        reader, writer, target, headers)
+                    assert status in [200, 304]
+                    etags[target] = response_headers['etag']
+                writer.close()
+
+            await asyncio.gather(*[one_client() for _ in range(clients)])
+
+        async def client(reader, writer, port):
+            for conditional in [False, True]:
+                await load(port, conditional)
+
+        self._run(client)
+
+    def test_serve_archive(self):
+        archive_path = Path(tempfile.mkdtemp()) / 'python-course.tar.gz'
+        self.addCleanup(shutil.rmtree, str(archive_path.parent))
+        with tarfile.open(str(archive_path), 'w:gz') as archive:
+            archive.add(str(self.course_directory_path), '.')
+
+        store = server.CourseStore([archive_path])
+        lesson = store.snapshot.find(server.LESSON, LESSON_UUID)[0]
+        self.assertEqual(lesson.resource.data['readme'], "# Interpreters\n")
+        self.assertEqual(store.refresh(), 0)
+
+    def test_serve_exported_archive(self):
+        # Exports wrap the course in a top directory
+        archive_path = Path(tempfile.mkdtemp()) / 'python-course.tar.gz'
+        self.addCleanup(shutil.rmtree, str(archive_path.parent))
+        export.export_course(
+            self.course_directory_path, archive_path, processes=1)
+
+        store = server.CourseStore([archive_path])
+        course = store.snapshot.find(server.COURSE, COURSE_UUID)[0]
+        self.assertEqual([unit.uuid for unit in course.children],
+                         [UNIT_UUID])
+        self.assertEqual(len(course.children[0].children), 2)
+        self.assertIsNotNone(course.signature)
+        self.assertEqual(store.refresh(), 0)
+
+    def test_cli_does_not_import_the_server(self):
+        # The other commands run on Pythons without asyncio.run
+        output = subprocess.check_output([
+            sys.executable, '-c',
+            'import sys, main; '
+            'print("rmotr_curriculum_tools.server" in sys.modules)'
+        ], cwd=str(Path(__file__).absolute().parent.parent))
+        self.assertEqual(output.strip(), b'False')
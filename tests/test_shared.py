@@ -0,0 +1,97 @@
+from __future__ import unicode_literals
+
+from multiprocessing import Pool
+from pathlib import Path
+import tempfile
+import shutil
+
+import pytest
+
+from test_io import BaseIOTestCase
+
+# Shared memory needs Python 3.8 or later
+pytest.importorskip('multiprocessing.shared_memory')
+
+from rmotr_curriculum_tools import shared  # noqa: E402
+
+
+def readme_length(args):
+    catalog, index = args
+    lesson = catalog.get_lesson(index)
+    return lesson.uuid, len(lesson.readme_bytes)
+
+
+class SharedCatalogTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self._create_testing_unit(
+            "Empty", 'unit-2-empty', '7c2a3ef2-ff0c-4a7e-a6bb-6a4ed7b1e4c2')
+        self._create_testing_reading_lesson(
+            unit_1_path, 'Interpreters', 'lesson-1-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "# Intérpretes\n")
+        self._create_testing_assignment_lesson(
+            unit_1_path, 'Variables', 'lesson-2-variables',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', "Some *variables*\n",
+            "x = 1\n", "def test_x(): pass\n")
+        self.catalog = shared.SharedCatalog.build(
+            [self.course_directory_path])
+
+    def tearDown(self):
+        self.catalog.close()
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def test_views(self):
+        course, = self.catalog.iter_courses()
+        self.assertEqual(course.name, 'Advanced Python Programming')
+        self.assertEqual(course.track, 'python')
+        self.assertEqual(course.directory_path, self.course_directory_path)
+        units = list(course.iter_units())
+        self.assertEqual([(unit.name, unit.order, unit.lesson_count())
+                          for unit in units],
+                         [('Python Intro', 1, 2), ('Empty', 2, 0)])
+        lessons = list(units[0].iter_lessons())
+        self.assertEqual([(lesson.name, lesson.type, lesson.order)
+                          for lesson in lessons],
+                         [('Interpreters', 'reading', 1),
+                          ('Variables', 'assignment', 2)])
+        self.assertEqual(lessons[1].unit.course, course)
+        self.assertEqual(lessons[0].readme_content, "# Intérpretes\n")
+
+        readme_bytes = lessons[1].readme_bytes
+        self.assertIsInstance(readme_bytes, memoryview)
+        self.assertTrue(readme_bytes.readonly)
+        self.assertEqual(readme_bytes, b"Some *variables*\n")
+        readme_bytes.release()
+
+    def test_attach_from_workers(self):
+        pool = Pool(2)
+        try:
+            results = pool.map(readme_length, [
+                (self.catalog, index)
+                for index in range(self.catalog.lesson_count)])
+        finally:
+            pool.terminate()
+            pool.join()
+        self.assertEqual(results, [
+            ('bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', 15),
+            ('cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', 17)])
+        self.assertIs(shared.SharedCatalog.attach(self.catalog.name),
+                      self.catalog)
+
+    def test_close_removes_segment(self):
+        catalog = shared.SharedCatalog.build([self.course_directory_path])
+        name = catalog.name
+        catalog.close()
+        with self.assertRaises(FileNotFoundError):
+            shared.SharedCatalog.attach(name)
@@ -0,0 +1,102 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import tempfile
+import shutil
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import snippets
+
+README_CONTENT = """# Snippets
+
+```python
+x = [1, 2, 3]
+```
+
+```bash
+for i in 1 2 3 do
+```
+
+```python
+def broken(:
+    pass
+```
+
+```pycon
+>>> 1 + 1
+2
+>>> 'a' * 2
+'b'
+```
+"""
+
+
+class CheckSnippetsTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+        self.cache_directory_path = Path(tempfile.mkdtemp())
+        self.cache_path = self.cache_directory_path / 'cache.json'
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        self.lesson_path = self._create_testing_reading_lesson(
+            unit_1_path, 'Python Intro', 'lesson-1-python-intro',
+            'aaaa574a-ac1b-4aa9-a964-c1feaa05c811', README_CONTENT)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+        shutil.rmtree(str(self.cache_directory_path.absolute()))
+
+    def _check(self, run_doctests=False, **kwargs):
+        return snippets.check_course_snippets(
+            self.course_directory_path, run_doctests=run_doctests,
+            cache_path=self.cache_path, processes=2, **kwargs)
+
+    def test_syntax_check(self):
+        results = self._check()
+
+        self.assertEqual(
+            [(result['line'], result['status']) for result in results],
+            [(3, snippets.OK), (11, snippets.SYNTAX_ERROR),
+             (16, snippets.OK)])
+
+    def test_run_doctests(self):
+        results = self._check(run_doctests=True)
+
+        self.assertEqual(
+            [result['status'] for result in results],
+            [snippets.OK, snippets.SYNTAX_ERROR, snippets.FAILED])
+        self.assertIn("'b'", results[2]['message'])
+
+    def test_hanging_and_exiting_doctests(self):
+        # doctest catches the timeout of the first loop and goes on
+        (self.lesson_path / 'README.md').write_text(
+            "```pycon\n>>> while True: pass\n>>> while True: pass\n```\n\n"
+            "```pycon\n>>> import os; os._exit(0)\n```\n")
+
+        results = self._check(run_doctests=True, timeout=1)
+
+        self.assertEqual([result['status'] for result in results],
+                         [snippets.TIMEOUT, snippets.FAILED])
+        self.assertIn('exited with code 0', results[1]['message'])
+
+    def test_results_are_cached_by_snippet(self):
+        self._check()
+        self.assertFileExists(self.cache_path)
+
+        # A cached result is reused even if it'd be different now
+        cache_content = self.cache_path.read_text().replace(
+            'syntax_error', 'cached')
+        self.cache_path.write_text(cache_content)
+
+        results = self._check()
+        self.assertEqual(results[1]['status'], 'cached')
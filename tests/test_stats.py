@@ -0,0 +1,89 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import tempfile
+import shutil
+import json
+import markdown
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import stats
+
+
+class CourseStatsTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+        unit_2_path = self._create_testing_unit(
+            "Data Types", 'unit-2-data-types',
+            '8a22574a-a11b-4119-a964-c1feaa05c833')
+        self._create_testing_reading_lesson(
+            unit_1_path, 'Python Intro', 'lesson-1-python-intro',
+            'aaaa574a-ac1b-4aa9-a964-c1feaa05c811',
+            "# Intro\n\nHello world\n\n## Code\n\n    x = 1\n    y = 2\n")
+        lesson_path = self._create_testing_lesson(
+            unit_1_path, 'Interpreters', 'lesson-2-interpreters',
+            'bbbb574a-ac1b-4aa9-a964-c1feaa05cca2', "# Interpreters",
+            'assignment')
+        (lesson_path / 'tests').mkdir()
+        with (lesson_path / 'tests' / 'test_.py').open('w') as fp:
+            fp.write('# empty')
+        self._create_testing_reading_lesson(
+            unit_2_path, 'Numbers', 'lesson-1-numbers',
+            'cccc574a-ac1b-4aa9-8f64-c1feaa05c3bb', "Three small words")
+
+        self.records = list(stats.iter_course_stats(
+            self.course_directory_path, renderer=markdown.markdown,
+            processes=2))
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+
+    def test_records_are_streamed_in_course_order(self):
+        self.assertEqual(
+            [(record['level'], record['lesson'] or record['unit'] or
+              record['course']) for record in self.records],
+            [('lesson', 'Python Intro'), ('lesson', 'Interpreters'),
+             ('unit', 'Python Intro'), ('lesson', 'Numbers'),
+             ('unit', 'Data Types'),
+             ('course', 'Advanced Python Programming')])
+
+    def test_lesson_stats(self):
+        intro, interpreters = self.records[:2]
+        self.assertEqual(intro['words'], 4)
+        self.assertEqual(intro['headings'], 2)
+        self.assertEqual(intro['code_blocks'], 1)
+        self.assertEqual(intro['code_lines'], 2)
+        self.assertEqual(intro['type'], 'reading')
+        self.assertEqual(interpreters['type'], 'assignment')
+        self.assertEqual(interpreters['tests_size'], 7)
+        self.assertEqual(interpreters['solutions_size'], 0)
+
+    def test_aggregated_stats(self):
+        unit_1 = self.records[2]
+        self.assertEqual(unit_1['lessons'], 2)
+        self.assertEqual(unit_1['assignments'], 1)
+        self.assertEqual(unit_1['assignment_ratio'], 0.5)
+        self.assertEqual(unit_1['words'], 5)
+
+        course = self.records[-1]
+        self.assertEqual(course['lessons'], 3)
+        self.assertEqual(course['words'], 8)
+        self.assertEqual(course['assignment_ratio'], 0.33)
+
+    def test_write_json(self):
+        output = tempfile.TemporaryFile('w+')
+        stats.write_json(iter(self.records), output)
+        output.seek(0)
+        self.assertEqual(json.loads(output.read()), self.records)
@@ -0,0 +1,90 @@
+from __future__ import unicode_literals
+
+from pathlib import Path
+import tempfile
+import shutil
+import pytoml as toml
+
+from test_io import BaseIOTestCase
+from rmotr_curriculum_tools import io, templates
+
+
+class TemplatesTestCase(BaseIOTestCase):
+    def setUp(self):
+        self.course_directory_path = Path(
+            tempfile.mkdtemp(prefix='advanced-python-programming'))
+        self.templates_path = Path(tempfile.mkdtemp())
+
+        dot_rmotr_path = self.course_directory_path / '.rmotr'
+        with dot_rmotr_path.open(mode='w') as fp:
+            fp.write("""
+uuid = "a7c2574a-a28b-4b19-bb64-c1feaa05dd52"
+name = "Advanced Python Programming"
+track = "python"
+""")
+        self.unit_1_path = self._create_testing_unit(
+            "Python Intro", 'unit-1-python-intro',
+            'f4ed574a-a11b-4119-bb64-c1feaa05ea55')
+
+        assignment_path = self.templates_path / 'assignment'
+        (assignment_path / 'data').mkdir(parents=True)
+        (assignment_path / 'README.md.tmpl').write_text(
+            '# $name\n\nLesson $order ($type), $slug\n')
+        (assignment_path / 'main.py').write_text('# Price is $5\n')
+        (assignment_path / '.rmotr').write_text('uuid = "ignored"\n')
+        (assignment_path / 'data' / 'dataset.csv').write_bytes(
+            b'a,b\n' * 1024)
+
+    def tearDown(self):
+        shutil.rmtree(str(self.course_directory_path.absolute()))
+        shutil.rmtree(str(self.templates_path.absolute()))
+
+    def test_create_lesson_from_template(self):
+        lesson_path = io.add_lesson_to_unit(
+            self.unit_1_path, 'Sales Report', 'assignment',
+            templates_path=self.templates_path)
+
+        with (lesson_path / 'README.md').open() as fp:
+            self.assertEqual(
+                fp.read(),
+                '# Sales Report\n\nLesson 1 (assignment), '
+                'lesson-1-sales-report\n')
+        with (lesson_path / 'main.py').open() as fp:
+            self.assertEqual(fp.read(), '# Price is $5\n')
+        with (lesson_path / 'data' / 'dataset.csv').open('rb') as fp:
+            self.assertEqual(fp.read(), b'a,b\n' * 1024)
+        with (lesson_path / '.rmotr').open() as fp:
+            self.assertEqual(toml.loads(fp.read())['name'], 'Sales Report')
+
+        # The template replaces the default assignment scaffolding
+        self.assertDirectoryDoesntExist(lesson_path / 'tests')
+
+    def test_lesson_type_without_template_uses_defaults(self):
+        lesson_path = io.add_lesson_to_unit(
+            self.unit_1_path, 'Intro', 'reading',
+            templates_path=self.templates_path)
+
+        with (lesson_path / 'README.md').open() as fp:
+            self.assertEqual(fp.read(), '# Intro\n')
+
+    def test_place_large_file(self):
+        source_path = self.templates_path / 'assignment' / 'data' / (
+            'dataset.csv')
+        target_path = self.templates_path / 'copy.csv'
+
+        method = templates.place_file(
+            source_path, target_path, link_threshold=1024)
+
+        self.assertIn(method, [templates.REFLINK, templates.HARDLINK])
+        with target_path.open('rb') as fp:
+            self.assertEqual(fp.read(), b'a,b\n' * 1024)
+
+    def test_place_small_file_is_never_hardlinked(self):
+        source_path = self.templates_path / 'assignment' / 'main.py'
+        target_path = self.templates_path / 'copy.py'
+
+        method = templates.place_file(source_path, target_path)
+
+        self.assertIn(method, [templates.REFLINK, templates.COPY])
+        self.assertNotEqual(source_path.stat().st_ino,
+                            target_path.stat().st_ino)